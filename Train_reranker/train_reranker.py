@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+# 저장소 루트를 import 경로에 추가 (python Train_reranker/train_reranker.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.chunker import parent_record_id
+from app.utils.dedup import is_deleted_marker
+from app.utils.lexical_index import get_lexical_index
+from app.utils.reranker import DEFAULT_MAX_LENGTH, load_reranker, make_reranker
+from tuneDB import DEFAULT_LABELED_QUERIES, load_labeled_queries, relevant_rows
+
+# 리랭커 파인튜닝/증류 파이프라인 (CPU에서 실행 가능)
+#   1) 질의 세트: 라벨 질의(GROUND_TRUTH 형식)의 정답 조 + 선택적으로 조 제목으로 만든 합성 질의
+#   2) hard negative 수집: 우리 인덱스(활성 Chroma 버전, --embedding)에서 검색한 상위 후보 중 정답이 아닌 조
+#      (--embedding이 없거나 임베딩 서버를 쓸 수 없으면 BM25 상위 후보)
+#   3) 교사(큰 cross-encoder)가 모든 (질의, 후보) 쌍을 점수 매기고, 정답보다 높게 본 후보는
+#      라벨 누락(false negative)으로 보고 제외한 뒤, 교사 점수가 높은 순으로 negative를 고릅니다.
+#   4) 학생(작은 cross-encoder)을 그룹 [정답, negative...] 단위로 학습합니다.
+#      loss = alpha × KL(교사 softmax ‖ 학생 softmax, 온도 T) + (1 - alpha) × 정답 cross-entropy
+#   5) 학습에 쓰지 않은 질의로 기존 리랭커(RERANKER_MODEL), 교사, 학생의 MRR/hit@1과 질의당 지연 시간을 비교합니다.
+# 결과 모델은 --output에 저장되며 RERANKER_MODEL=<output> 으로 바로 사용할 수 있습니다.
+# (모델 디렉터리 수정 시각이 리랭커 버전에 들어가므로 다시 학습하면 리랭크 점수 캐시도 새로 계산됩니다.)
+DEFAULT_TEACHER = "BAAI/bge-reranker-v2-m3"
+DEFAULT_STUDENT = "monologg/koelectra-small-v3-discriminator"
+DEFAULT_OUTPUT = os.path.join("models", "reranker", "student")
+TITLE_TEMPLATES = ["{title}", "{title}에 관한 규정은?", "{title}은 어떻게 하나요?", "{title} 기준 알려줘"]
+PLACEHOLDER_TITLES = {"article"}  # 제목이 없는 조의 자리표시자 (삭제된 조의 "<삭 제>"는 dedup.is_deleted_marker)
+DEFAULT_FALSE_NEGATIVE_MARGIN = 1.0  # 교사 logit 차이
+
+_ARTICLE_TITLE = re.compile(r"조(?:의\d+)?\(([^)]+)\)")
+
+
+def build_queries(labeled_path: str, synthetic: int, seed: int) -> list:
+    """
+    [{"query", "positives": [조 레코드 ID]}]를 만듭니다. 라벨 질의가 먼저 오고, 합성 질의가 뒤에 붙습니다.
+    합성 질의에는 삭제/자리표시자 제목을 쓰지 않고, 여러 규정에 같은 제목이 있으면 규정 제목을 함께 넣습니다.
+    """
+    lexical = get_lexical_index()
+    queries = []
+    for query, chunk_ids in load_labeled_queries(labeled_path):
+        positives = sorted({lexical.ids[row] for row in relevant_rows(chunk_ids, lexical.ids)})
+        if positives:
+            queries.append({"query": query, "positives": positives, "source": "labeled"})
+    titled = [(row, _ARTICLE_TITLE.search(lexical.text(record_id))) for row, record_id in enumerate(lexical.ids)]
+    titled = [(row, m.group(1).strip()) for row, m in titled
+              if m and m.group(1).strip().lower() not in PLACEHOLDER_TITLES and not is_deleted_marker(m.group(1))]
+    title_counts = {}
+    for _, title in titled:
+        title_counts[title] = title_counts.get(title, 0) + 1
+    # 여러 규정에 있는 제목("목적", "정의" 등)은 규정 제목을 붙여 정답이 하나로 정해지게 합니다.
+    titled = [(lexical.ids[row], title if title_counts[title] == 1
+               else f"{lexical.metadatas[row].get('document_title', '')} {title}".strip())
+              for row, title in titled]
+    rng = random.Random(seed)
+    for i, (record_id, title) in enumerate(rng.sample(titled, min(synthetic, len(titled)))):
+        queries.append({"query": TITLE_TEMPLATES[i % len(TITLE_TEMPLATES)].format(title=title),
+                        "positives": [record_id], "source": "title"})
+    return queries
+
+
+def retrieve_candidates(queries: list, depth: int, embedding_model: str = None) -> list:
+    """
+    질의별 검색 후보(조 레코드 ID, 순위순)를 돌려줍니다. embedding_model이 있으면 그 모델의 활성 인덱스에서,
+    없거나 실패하면 BM25로 검색합니다.
+    """
+    texts = [q["query"] for q in queries]
+    if embedding_model:
+        try:
+            from app.utils import index_versions
+            from app.utils.embedders import get_embedder
+
+            vectors = get_embedder(embedding_model).embed(texts)
+            with index_versions.lease(embedding_model) as db_path:
+                results = index_versions.open_collection(db_path).query(query_embeddings=vectors,
+                                                                        n_results=depth * 2)
+            candidates = []
+            for ids in results["ids"]:
+                # 청크 결과는 조 단위로 합칩니다.
+                candidates.append(list(dict.fromkeys(parent_record_id(record_id) for record_id in ids))[:depth])
+            return candidates
+        except Exception as e:
+            print(f"[WARN] {embedding_model} 인덱스 검색 실패, BM25 후보를 사용합니다: {e}")
+    lexical = get_lexical_index()
+    return [[record_id for record_id, _ in lexical.search(text, depth)] for text in texts]
+
+
+def build_groups(queries: list, candidates: list, teacher, negatives_per_group: int,
+                 false_negative_margin: float, seed: int) -> list:
+    """
+    교사 점수로 라벨 누락 후보를 거르고 [정답, hard negative...] 학습 그룹을 만듭니다.
+    hard negative가 부족하면 코퍼스에서 무작위 조를 채워 그룹 크기를 맞춥니다.
+    """
+    lexical = get_lexical_index()
+    rng = random.Random(seed)
+    groups = []
+    for query, retrieved in zip(queries, candidates):
+        positives = set(query["positives"])
+        negatives = [record_id for record_id in retrieved if record_id not in positives]
+        ids = query["positives"] + negatives
+        scores = teacher.score([(query["query"], lexical.text(record_id)) for record_id in ids])
+        teacher_scores = dict(zip(ids, scores))
+        for positive in query["positives"]:
+            # 정답과 거의 같거나 더 높게 본 후보는 라벨이 빠진 정답일 가능성이 높아 negative로 쓰지 않습니다.
+            threshold = teacher_scores[positive] - false_negative_margin
+            hard = sorted((record_id for record_id in negatives if teacher_scores[record_id] < threshold),
+                          key=teacher_scores.get, reverse=True)[:negatives_per_group]
+            while len(hard) < negatives_per_group:
+                record_id = rng.choice(lexical.ids)
+                if record_id not in positives and record_id not in hard:
+                    hard.append(record_id)
+            extra = [record_id for record_id in hard if record_id not in teacher_scores]
+            if extra:
+                teacher_scores.update(zip(extra, teacher.score([(query["query"], lexical.text(record_id))
+                                                                for record_id in extra])))
+            group = [positive] + hard
+            groups.append({
+                "query": query["query"],
+                "ids": group,
+                "texts": [lexical.text(record_id) for record_id in group],
+                "teacher": [teacher_scores[record_id] for record_id in group],
+            })
+    return groups
+
+
+def train_student(groups: list, student: str, output_dir: str, epochs: int, batch_size: int,
+                  learning_rate: float, max_length: int, temperature: float, alpha: float, seed: int):
+    import torch
+    import torch.nn.functional as F
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, get_linear_schedule_with_warmup
+
+    torch.manual_seed(seed)
+    tokenizer = AutoTokenizer.from_pretrained(student)
+    # 관련성 점수 하나(logit)를 내는 회귀 헤드로 학습합니다. (Reranker는 logits[:, -1]을 점수로 사용)
+    model = AutoModelForSequenceClassification.from_pretrained(student, num_labels=1, ignore_mismatched_sizes=True)
+    model.train()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate, weight_decay=0.01)
+    steps = epochs * ((len(groups) + batch_size - 1) // batch_size)
+    scheduler = get_linear_schedule_with_warmup(optimizer, int(steps * 0.1), steps)
+    rng = random.Random(seed)
+    group_size = len(groups[0]["ids"])
+    for epoch in range(epochs):
+        order = list(range(len(groups)))
+        rng.shuffle(order)
+        total, started = 0.0, time.perf_counter()
+        for start in range(0, len(order), batch_size):
+            batch = [groups[i] for i in order[start:start + batch_size]]
+            encoded = tokenizer(
+                [group["query"] for group in batch for _ in group["texts"]],
+                [text for group in batch for text in group["texts"]],
+                truncation="only_second", max_length=max_length, padding=True, return_tensors="pt",
+            )
+            logits = model(**encoded).logits[:, -1].view(len(batch), group_size)
+            teacher = torch.tensor([group["teacher"] for group in batch], dtype=torch.float32)
+            distill = F.kl_div(F.log_softmax(logits / temperature, dim=-1), F.softmax(teacher / temperature, dim=-1),
+                               reduction="batchmean") * temperature ** 2
+            hard_label = F.cross_entropy(logits, torch.zeros(len(batch), dtype=torch.long))
+            loss = alpha * distill + (1 - alpha) * hard_label
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
+            optimizer.step()
+            scheduler.step()
+            optimizer.zero_grad()
+            total += loss.item() * len(batch)
+        print(f"epoch {epoch + 1}/{epochs}: loss {total / len(groups):.4f} ({time.perf_counter() - started:.0f}s)")
+    os.makedirs(output_dir, exist_ok=True)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+
+
+def evaluate(reranker, queries: list, candidates: list) -> dict:
+    """
+    검색 후보 순위를 리랭커로 다시 매겨 MRR, hit@1, 질의당 지연 시간(p50)을 계산합니다.
+    정답이 후보에 없는 질의는 리랭킹으로 바뀌지 않으므로 제외합니다.
+    """
+    lexical = get_lexical_index()
+    reciprocal_ranks, latencies = [], []
+    for query, retrieved in zip(queries, candidates):
+        positives = set(query["positives"])
+        if not positives & set(retrieved):
+            continue
+        started = time.perf_counter()
+        scores = reranker.score([(query["query"], lexical.text(record_id)) for record_id in retrieved])
+        latencies.append(time.perf_counter() - started)
+        ranked = [record_id for _, record_id in sorted(zip(scores, retrieved), key=lambda x: x[0], reverse=True)]
+        reciprocal_ranks.append(1 / next(rank for rank, record_id in enumerate(ranked, 1) if record_id in positives))
+    if not reciprocal_ranks:
+        return {"queries": 0}
+    latencies.sort()
+    return {
+        "queries": len(reciprocal_ranks),
+        "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks),
+        "hit@1": sum(rr == 1 for rr in reciprocal_ranks) / len(reciprocal_ranks),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="hard negative 수집 + 교사 증류로 작은 리랭커 학습")
+    parser.add_argument("--labeled", type=str, default=DEFAULT_LABELED_QUERIES,
+                        help="라벨 질의 세트 (GROUND_TRUTH 형식 .json 또는 .py)")
+    parser.add_argument("--synthetic", type=int, default=500, help="조 제목으로 만들 합성 질의 수 (0이면 라벨 질의만)")
+    parser.add_argument("--embedding", type=str, default=None,
+                        help="hard negative를 수집할 인덱스의 임베딩 모델 (없으면 BM25)")
+    parser.add_argument("--depth", type=int, default=15, help="질의당 검색 후보 수 (LLM 페이지와 같은 15)")
+    parser.add_argument("--negatives", type=int, default=7, help="학습 그룹당 hard negative 수")
+    parser.add_argument("--false-negative-margin", type=float, default=DEFAULT_FALSE_NEGATIVE_MARGIN,
+                        help="교사 점수가 (정답 점수 - margin) 이상인 후보는 negative에서 제외")
+    parser.add_argument("--teacher", type=str, default=DEFAULT_TEACHER)
+    parser.add_argument("--student", type=str, default=DEFAULT_STUDENT)
+    parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=4, help="스텝당 그룹 수 (그룹 = 정답 1 + negative)")
+    parser.add_argument("--lr", type=float, default=3e-5)
+    parser.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.7, help="증류 loss 비중 (나머지는 정답 cross-entropy)")
+    parser.add_argument("--eval-fraction", type=float, default=0.2, help="평가용으로 남길 질의 비율 (라벨 질의 우선)")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    import torch
+
+    torch.set_num_threads(args.threads)
+    queries = build_queries(args.labeled, args.synthetic, args.seed)
+    if not queries:
+        sys.exit("학습할 질의가 없습니다. --labeled 또는 --synthetic을 확인하세요.")
+    # 라벨 질의는 평가 쪽에 먼저 배정해 실제 질의에서의 품질을 봅니다.
+    labeled = [q for q in queries if q["source"] == "labeled"]
+    synthetic = [q for q in queries if q["source"] != "labeled"]
+    random.Random(args.seed).shuffle(synthetic)
+    num_eval = max(1, int(len(queries) * args.eval_fraction))
+    eval_queries = (labeled + synthetic)[:num_eval]
+    train_queries = (labeled + synthetic)[num_eval:]
+    print(f"질의 {len(queries)}개 (라벨 {len(labeled)}), 학습 {len(train_queries)} / 평가 {len(eval_queries)}")
+    if not train_queries:
+        sys.exit("학습 질의가 없습니다. --synthetic을 늘리거나 --eval-fraction을 줄이세요.")
+
+    started = time.perf_counter()
+    train_candidates = retrieve_candidates(train_queries, args.depth, args.embedding)
+    eval_candidates = retrieve_candidates(eval_queries, args.depth, args.embedding)
+    print(f"후보 검색 {time.perf_counter() - started:.1f}s")
+
+    teacher = make_reranker("torch", model=args.teacher, quantize=False, max_length=args.max_length,
+                            num_threads=args.threads)
+    started = time.perf_counter()
+    groups = build_groups(train_queries, train_candidates, teacher, args.negatives, args.false_negative_margin,
+                          args.seed)
+    print(f"학습 그룹 {len(groups)}개 (정답 1 + negative {args.negatives}), 교사 점수 {time.perf_counter() - started:.1f}s")
+
+    train_student(groups, args.student, args.output, args.epochs, args.batch_size, args.lr, args.max_length,
+                  args.temperature, args.alpha, args.seed)
+
+    report = {"args": vars(args), "train_groups": len(groups), "eval": {}}
+    student = make_reranker("torch", model=args.output, quantize=True, max_length=args.max_length,
+                            num_threads=args.threads)
+    for name, reranker in (("baseline", load_reranker()), ("teacher", teacher), ("student-int8", student)):
+        report["eval"][name] = evaluate(reranker, eval_queries, eval_candidates)
+    print(f"{'reranker':>14} {'queries':>8} {'MRR':>6} {'hit@1':>6} {'p50 ms':>8}")
+    for name, result in report["eval"].items():
+        if result["queries"]:
+            print(f"{name:>14} {result['queries']:8d} {result['mrr']:6.3f} {result['hit@1']:6.3f} "
+                  f"{result['p50_ms']:8.1f}")
+    with open(os.path.join(args.output, "training_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"저장: {args.output}  (사용: RERANKER_MODEL={args.output})")
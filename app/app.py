@@ -12,6 +12,7 @@ from app.pages.home_page import show_home
 from app.pages.upload_page import render_upload_page
 from app.pages.semantic_search_demo import render_query_page
 from app.pages.llm_query_demo import render_llm_query_page
+from app.pages.index_admin import render_index_admin_page
 
 def main():
     # 1) 세션 스테이트 초기화
@@ -26,8 +27,8 @@ def main():
     # 3) 새로운 멋진 네비게이션 바 (옵션 메뉴)
     selected = option_menu(
         menu_title=None,  # 메뉴 상단 타이틀 (None이면 숨김)
-        options=["홈", "파일 업로드", "의미검색 데모", "LLM 질의응답 데모"],
-        icons=["house", "cloud-upload", "search", "question"],  # Bootstrap 아이콘명
+        options=["홈", "파일 업로드", "의미검색 데모", "LLM 질의응답 데모", "인덱스 관리"],
+        icons=["house", "cloud-upload", "search", "question", "database"],  # Bootstrap 아이콘명
         menu_icon="cast",  # 전체 메뉴 아이콘 (왼쪽 상단 아이콘)
         default_index=0,  # 기본 선택 메뉴
         orientation="horizontal",  # 수평(horizontal) / 수직(vertical)
@@ -63,6 +64,8 @@ def main():
         render_query_page()
     elif selected == "LLM 질의응답 데모":
         render_llm_query_page()
+    elif selected == "인덱스 관리":
+        render_index_admin_page()
 
     # 5) 기타 필요한 로직...
     #    예: 오프라인 환경에서 사용할 로컬 번역 모델 초기화, 문서 처리 등
@@ -0,0 +1,75 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+from app.utils import index_versions
+
+EMBEDDING_MODELS = ["snowflake-arctic-embed2", "mxbai-embed-large"]
+REFRESH_INTERVAL = 1.0  # 재구축 진행 중 화면 갱신 간격(초)
+
+
+def _format_time(timestamp) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else "-"
+
+
+def render_index_admin_page():
+    st.header("🗄️ 인덱스 관리")
+    st.caption(
+        "재구축은 새 버전 디렉터리에 백그라운드로 적재하며, 그동안 검색은 현재 활성 버전을 계속 사용합니다. "
+        "적재가 끝나면 활성 버전이 원자적으로 교체되고, 이전 버전은 진행 중인 검색이 끝난 뒤 정리됩니다. "
+        "새 버전은 활성 버전의 HNSW 프로파일, 차원 축소, 샤드 설정을 그대로 사용합니다."
+    )
+
+    # 모델별 활성 버전/버전 목록
+    statuses = [index_versions.status(model) for model in EMBEDDING_MODELS]
+    st.table(pd.DataFrame([
+        {
+            "임베딩 모델": s["model"],
+            "활성 버전": s["active_version"] or "(기존 경로)",
+            "경로": s["active_path"],
+            "HNSW 프로파일": s["settings"]["hnsw_profile"],
+            "차원 축소": f"{s['settings']['reduction_method']} {s['settings']['reduction_dim']}"
+            if s["settings"]["reduction_method"] else "-",
+            "샤드 수": str(s["settings"]["num_shards"] or "-"),
+            "활성화 시각": _format_time(s["activated_at"]),
+            "버전 수": len(s["versions"]),
+            "진행 중 검색": sum(s["leases"].values()),
+        }
+        for s in statuses
+    ]))
+
+    # 재구축 실행
+    with st.form(key="rebuild_form"):
+        models = st.multiselect("재구축할 임베딩 모델:", options=EMBEDDING_MODELS, default=EMBEDDING_MODELS[:1])
+        submit_button = st.form_submit_button(label="🔄 인덱스 재구축")
+    if submit_button and models:
+        index_versions.start_rebuild(models)
+        st.rerun()
+
+    # 재구축 진행 상황
+    running = False
+    for model in EMBEDDING_MODELS:
+        job = index_versions.get_job(model)
+        if job is None:
+            continue
+        snapshot = job.snapshot()
+        progress = snapshot["progress"][model]
+        st.subheader(f"{model} 재구축: {snapshot['state']} ({snapshot['versions'].get(model, '-')})")
+        ratio = progress["done"] / progress["total"] if progress["total"] else 0.0
+        st.progress(min(ratio, 1.0) if snapshot["state"] != "done" else 1.0, text=progress["line"])
+        if snapshot["state"] == "failed":
+            st.error(f"재구축 실패 (활성 버전은 그대로 유지됩니다): {snapshot['error']}")
+        elif snapshot["state"] == "done":
+            st.success(f"{_format_time(snapshot['finished_at'])}에 활성 버전을 교체했습니다.")
+        running = running or job.running
+
+    if st.button("오래된 버전 정리"):
+        for model in EMBEDDING_MODELS:
+            removed = index_versions.collect_garbage(model)
+            if removed:
+                st.info(f"{model}: {', '.join(removed)} 삭제")
+
+    if running:
+        time.sleep(REFRESH_INTERVAL)
+        st.rerun()
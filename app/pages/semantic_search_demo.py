@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
 
+from app.utils.article_refs import get_article_index
+from app.utils.typeahead import get_typeahead_index
+
 
 def render_query_page():
     st.header("🔍 의미검색 데모")
@@ -26,10 +29,30 @@ def render_query_page():
         options=["전체 문서", "내 문서", "기술기획 관령 법령", "기타"]
     )
     st.write("선택한 검색 범위:", search_scope)
+
+    # 검색 방식 선택 (lexical은 임베딩 서버 없이 동작)
+    retrieval_labels = {"dense": "의미 검색 (임베딩)", "hybrid": "하이브리드 (임베딩 + BM25)", "lexical": "키워드 검색 (BM25)"}
+    retrieval = st.selectbox(
+        "검색 방식을 선택하세요:",
+        options=list(retrieval_labels),
+        format_func=retrieval_labels.get,
+    )
     
-    # 기본은 '기술기획 관령 법령'이지만, 나머지 범위에서는 파일 검색 데모가 구현되지 않았음을 안내
-    if search_scope in ["전체 문서", "내 문서", "기타"]:
-        st.info("사용자가 올린 파일 검색 데모는 아직 구현되지 않았습니다. 구현 후 이 메시지는 사라집니다.")
+    # 검색 범위는 레코드 메타데이터(source 등) 필터로 벡터 검색에 전달됩니다.
+    # 업로드 문서는 아직 인덱스에 적재되지 않으므로 '내 문서'/'기타' 범위는 결과가 없을 수 있음을 안내
+    if search_scope in ["내 문서", "기타"]:
+        st.info("사용자가 올린 파일은 아직 검색 인덱스에 적재되지 않습니다. 적재 기능 구현 후 이 메시지는 사라집니다.")
+
+    # 조문 바로가기: 입력할 때마다 자동완성 색인에서 제목을 찾아, 검색 파이프라인 없이 조문을 바로 보여줍니다.
+    st.subheader("⚡ 조문 바로가기")
+    typed = st.text_input("문서/장/절/조 제목을 입력하세요 (예: 관리규정 22조의2):", key="typeahead_query")
+    if typed:
+        suggestions = get_typeahead_index().suggest(typed)
+        if suggestions:
+            choice = st.selectbox("추천 항목:", options=suggestions, format_func=lambda s: s["label"])
+            st.text(get_article_index().text(choice["record_id"]))
+        else:
+            st.info("일치하는 제목이 없습니다.")
 
     # 폼(form) 구성
     with st.form(key="search_form"):
@@ -45,10 +68,15 @@ def render_query_page():
                 n_results=1,
                 response=False,
                 rerank=False,
-                embedding_model=st.session_state["embedding_model"]
+                embedding_model=st.session_state["embedding_model"],
+                scope=search_scope,
+                retrieval=retrieval,
             )
             st.session_state["search_result"] = result
-        st.text(result["retrieved_document"])
+        if result["retrieved_document"]:
+            st.text(result["retrieved_document"])
+        else:
+            st.info("선택한 검색 범위에서 검색된 문서가 없습니다.")
 
     # 선택한 검색 범위에 따른 문서 목록 표시
     st.subheader("📄 문서 목록")
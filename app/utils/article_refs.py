@@ -0,0 +1,149 @@
+# app/utils/article_refs.py
+
+import os
+import re
+import threading
+
+from app.utils.skeleton import JSON_FILE_PATH, get_skeleton_text_from_target_doc, load_documents, record_metadata
+
+# 질의에 들어 있는 조문 직접 참조("제80조", "방위사업관리규정 제22조의2", "doc_6_art_80조")를 찾아
+# 임베딩/벡터 검색 없이 조(article) 레코드로 바로 연결합니다.
+#   - 질의가 참조만으로 이루어져 있으면 해당 조를 그대로 결과로 돌려줍니다. (dense 검색 생략)
+#   - 참조와 함께 다른 질문이 있으면 dense 검색 결과의 1순위에 해당 조를 고정합니다.
+# 문서 제목이 없으면 모든 문서에서 해당 조번호를 찾습니다. 여러 규정에 같은 조번호가 있으면 바로 고정하지 않고
+# 후보(candidates)로 돌려주며, 검색 쪽에서 dense/BM25 순위로 하나를 고릅니다. (query_utils 참고)
+# 항 번호("제3항")는 참조의 일부로 인식만 하고, 고정하는 단위는 조 전체입니다.
+
+# "제22조의2", "제 80 조 제3항"
+_ARTICLE_REF = re.compile(r"제\s*(?P<num>\d+)\s*조(?:\s*의\s*(?P<sub>\d+))?(?:\s*제?\s*\d+\s*항)?")
+# "doc_6_art_80조", "doc_6_chap_2장_sec_default_art_80조"
+_RECORD_REF = re.compile(r"doc_(?P<doc>[^_\s]+)_(?:\S*?_)?art_(?P<num>\d+)조(?:의(?P<sub>\d+))?")
+_NON_WORD = re.compile(r"[\s·ㆍ∙•.\-_]+")
+# 참조를 지운 뒤 이 문자들만 남으면 질의 전체가 참조라고 봅니다.
+_LEFTOVER = re.compile(r"조문|조항|내용|원문|보여줘|알려줘|찾아줘|[\s,·ㆍ/및와과의은는을를이가에서(){}\[\]<>\"'?!.~-]+")
+
+
+def _normalize_title(title: str) -> str:
+    """
+    제목 비교용: 공백과 가운뎃점 등을 지웁니다. ("민ㆍ군기술협력사업 촉진법" == "민군기술협력사업촉진법")
+    """
+    return _NON_WORD.sub("", title)
+
+
+def _article_key(num: str, sub: str = None) -> str:
+    return f"{int(num)}조" + (f"의{int(sub)}" if sub else "")
+
+
+class ArticleIndex:
+    """
+    (문서 ID, 조번호) → 레코드 ID 목록과 정규화한 문서 제목 → 문서 ID 사전.
+    스켈레톤 텍스트는 처음 조회될 때 렌더링해 캐시합니다.
+    """
+
+    def __init__(self, documents: list):
+        self.documents = {str(doc.get("document_id", "")): doc for doc in documents}
+        self.titles = {}
+        self.articles = {}
+        self.subrecords = {}
+        for doc_id, doc in self.documents.items():
+            self.titles[_normalize_title(doc.get("document_title", ""))] = doc_id
+            for chapter in doc.get("chapters", []):
+                chapter_number = chapter.get("chapter_number", "unknown")
+                for section in chapter.get("sections", []):
+                    section_number = section.get("section_number", "default")
+                    for article in section.get("articles", []):
+                        article_number = article.get("article_number", "")
+                        subrecord_id = f"chap_{chapter_number}_sec_{section_number}_art_{article_number}"
+                        record_id = f"doc_{doc_id}_{subrecord_id}"
+                        if record_id in self.subrecords:
+                            continue
+                        self.subrecords[record_id] = (doc_id, subrecord_id)
+                        self.articles.setdefault((doc_id, article_number), []).append(record_id)
+        self.metadatas = record_metadata(documents)
+        # 긴 제목부터 찾아 "국방전력발전업무훈령"이 더 짧은 제목에 먼저 걸리지 않게 합니다.
+        self._titles_by_length = sorted(self.titles, key=len, reverse=True)
+        self._texts = {}
+
+    def text(self, record_id: str) -> str:
+        text = self._texts.get(record_id)
+        if text is None:
+            doc_id, subrecord_id = self.subrecords[record_id]
+            text = get_skeleton_text_from_target_doc(subrecord_id, self.documents[doc_id])
+            self._texts[record_id] = text
+        return text
+
+    def find_title(self, query: str):
+        """
+        질의에 들어 있는 문서 제목의 (문서 ID, 원래 질의에서의 (시작, 끝))을 돌려줍니다. 없으면 (None, None).
+        """
+        # 공백 등을 지운 질의에서 찾고, 위치는 원래 질의의 문자 위치로 되돌립니다.
+        kept = [i for i, ch in enumerate(query) if not _NON_WORD.fullmatch(ch)]
+        normalized = "".join(query[i] for i in kept)
+        for title in self._titles_by_length:
+            if not title:
+                continue
+            start = normalized.find(title)
+            if start >= 0:
+                return self.titles[title], (kept[start], kept[start + len(title) - 1] + 1)
+        return None, None
+
+    def resolve(self, query: str) -> dict:
+        """
+        질의의 조문 참조를 레코드로 해석합니다.
+
+        Returns:
+            dict: {"references": [{"doc_id", "article"}],
+                   "record_ids": 바로 고정할 조 (문서 제목이 있거나 조번호에 맞는 조가 하나뿐인 참조),
+                   "candidates": 제목 없이 여러 규정의 조에 맞는 참조별 후보 조 리스트,
+                   "reference_only": 질의가 참조만으로 이루어졌는지}. 참조가 없으면 None.
+        """
+        spans = []
+        references = []
+        for m in _RECORD_REF.finditer(query):
+            references.append({"doc_id": m.group("doc"), "article": _article_key(m.group("num"), m.group("sub"))})
+            spans.append(m.span())
+        if not references:
+            doc_id, title_span = self.find_title(query)
+            for m in _ARTICLE_REF.finditer(query):
+                references.append({"doc_id": doc_id, "article": _article_key(m.group("num"), m.group("sub"))})
+                spans.append(m.span())
+            if references and title_span:
+                spans.append(title_span)
+        if not references:
+            return None
+
+        record_ids = []
+        candidates = []
+        for ref in references:
+            doc_ids = [ref["doc_id"]] if ref["doc_id"] else list(self.documents)
+            matches = [record_id for doc_id in doc_ids for record_id in self.articles.get((doc_id, ref["article"]), [])]
+            if ref["doc_id"] or len(matches) == 1:
+                record_ids.extend(record_id for record_id in matches if record_id not in record_ids)
+            elif matches and matches not in candidates:
+                candidates.append(matches)
+
+        leftover = list(query)
+        for start, end in spans:
+            leftover[start:end] = [" "] * (end - start)
+        return {
+            "references": references,
+            "record_ids": record_ids,
+            "candidates": candidates,
+            "reference_only": not _LEFTOVER.sub("", "".join(leftover)).strip(),
+        }
+
+
+_lock = threading.Lock()
+_index = None  # (JSON 파일 mtime, ArticleIndex)
+
+
+def get_article_index(json_file_path: str = JSON_FILE_PATH) -> ArticleIndex:
+    """
+    코퍼스 JSON으로 만든 ArticleIndex를 재사용합니다. 파일이 바뀌면(mtime) 다시 만듭니다.
+    """
+    global _index
+    mtime = os.path.getmtime(json_file_path) if os.path.exists(json_file_path) else 0.0
+    with _lock:
+        if _index is None or _index[0] != mtime:
+            _index = (mtime, ArticleIndex(load_documents(json_file_path)))
+        return _index[1]
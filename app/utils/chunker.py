@@ -0,0 +1,205 @@
+# app/utils/chunker.py
+
+import hashlib
+from functools import lru_cache
+
+import ollama
+
+# 올라마 임베딩 모델 → 같은 어휘를 쓰는 HuggingFace 토크나이저
+TOKENIZER_REPOS = {
+    "mxbai-embed-large": "mixedbread-ai/mxbai-embed-large-v1",
+    "snowflake-arctic-embed2": "Snowflake/snowflake-arctic-embed-l-v2.0",
+}
+
+# ollama.show()로 확인하지 못할 때 사용할 컨텍스트 길이
+FALLBACK_CONTEXT_LENGTHS = {
+    "mxbai-embed-large": 512,
+    "snowflake-arctic-embed2": 8192,
+}
+
+RESERVED_TOKENS = 8     # [CLS]/[SEP] 등 특수 토큰 여유분
+OVERLAP_LINES = 1       # 청크 사이에 겹쳐 넣을 문단/항목 줄 수
+CHUNK_ID_SEPARATOR = "#chunk_"
+
+# (모델, 텍스트 SHA-256) → 토큰 수
+_token_counts = {}
+_TOKEN_COUNT_CACHE_SIZE = 100000
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model: str):
+    """
+    임베딩 모델에 대응하는 토크나이저를 한 번만 로드합니다. 없으면 None.
+    """
+    repo = TOKENIZER_REPOS.get(model)
+    if repo is None:
+        print(f"[WARN] '{model}'의 토크나이저가 등록되어 있지 않습니다. 글자 수로 토큰 수를 추정합니다.")
+        return None
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(repo)
+    except Exception as e:
+        print(f"[WARN] 토크나이저 로드 실패({repo}), 글자 수로 토큰 수를 추정합니다: {e}")
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_model_context_length(model: str) -> int:
+    """
+    ollama.show()로 모델의 최대 컨텍스트 길이(토큰)를 조회합니다. 모델당 한 번만 조회합니다.
+    """
+    try:
+        response = ollama.show(model)
+        model_info = response.get("modelinfo") or response.get("model_info") or {}
+        for key, value in model_info.items():
+            if key.endswith(".context_length"):
+                return int(value)
+    except Exception as e:
+        print(f"[WARN] '{model}' 정보 조회 실패: {e}")
+    if model in FALLBACK_CONTEXT_LENGTHS:
+        return FALLBACK_CONTEXT_LENGTHS[model]
+    raise ValueError(f"Cannot determine context length for model '{model}'.")
+
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    모델의 실제 토크나이저로 텍스트의 토큰 수를 셉니다. (특수 토큰 제외)
+    결과는 (모델, 텍스트 해시) 단위로 메모이즈됩니다.
+    """
+    key = (model, hashlib.sha256(text.encode("utf-8")).hexdigest())
+    count = _token_counts.get(key)
+    if count is None:
+        tokenizer = get_tokenizer(model)
+        if tokenizer is None:
+            count = len(text)
+        else:
+            count = len(tokenizer.encode(text, add_special_tokens=False))
+        if len(_token_counts) >= _TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.clear()
+        _token_counts[key] = count
+    return count
+
+
+def _split_long_line(line: str, model: str, budget: int) -> list:
+    """
+    예산을 넘는 한 줄을 문장 경계(". ", "다. ")에서 나누고, 그래도 넘으면 토큰 단위로 나눕니다.
+    어떤 경우에도 텍스트를 버리지 않습니다.
+    """
+    pieces = []
+    current = ""
+    for sentence in line.replace(". ", ".\n").split("\n"):
+        candidate = f"{current} {sentence}".strip() if current else sentence
+        if count_tokens(candidate, model) <= budget:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        if count_tokens(sentence, model) <= budget:
+            current = sentence
+        else:
+            pieces.extend(_split_by_tokens(sentence, model, budget))
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_by_tokens(text: str, model: str, budget: int) -> list:
+    """
+    토큰 오프셋 기준으로 텍스트를 budget 토큰씩 자릅니다. (최후의 수단)
+    """
+    tokenizer = get_tokenizer(model)
+    if tokenizer is None:
+        return [text[i:i + budget] for i in range(0, len(text), budget)]
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    pieces = []
+    for start in range(0, len(offsets), budget):
+        window = offsets[start:start + budget]
+        begin = window[0][0]
+        end = offsets[start + budget][0] if start + budget < len(offsets) else len(text)
+        pieces.append(text[begin:end].strip())
+    return [piece for piece in pieces if piece]
+
+
+def chunk_budget(model: str, max_length: int = None) -> int:
+    """
+    청크당 토큰 예산: 모델 컨텍스트 길이와 임베딩 백엔드의 최대 입력 길이(max_length) 중 작은 값에서
+    특수 토큰 여유분을 뺀 값. (예: ONNX 백엔드는 올라마 컨텍스트보다 짧은 입력만 받습니다.)
+    """
+    context_length = get_model_context_length(model)
+    if max_length:
+        context_length = min(context_length, max_length)
+    return context_length - RESERVED_TOKENS
+
+
+def chunk_skeleton(text: str, model: str, max_length: int = None) -> list:
+    """
+    스켈레톤 텍스트가 모델 컨텍스트(또는 백엔드의 max_length)를 넘으면 문단/항목 줄 경계에서 청크로 나눕니다.
+
+    각 청크 앞에는 문서·장·절·조 머리줄을 반복해서 붙이고, 인접 청크 사이에는
+    OVERLAP_LINES 줄을 겹쳐 넣습니다. 컨텍스트 안에 들어가면 [text]를 그대로 반환합니다.
+    """
+    budget = chunk_budget(model, max_length)
+    if count_tokens(text, model) <= budget:
+        return [text]
+
+    lines = text.split("\n")
+    # 문단(├─/└─ 가 조 줄보다 깊게 들여쓰기 된 줄) 앞까지를 머리줄로 봅니다.
+    header_end = len(lines)
+    for i, line in enumerate(lines):
+        if line.startswith("          "):
+            header_end = i
+            break
+    header = "\n".join(lines[:header_end])
+    body = lines[header_end:]
+    header_tokens = count_tokens(header, model)
+    if not body or header_tokens >= budget // 2:
+        # 조 본문 자체가 긴 경우: 머리줄 없이 줄 단위로 나눕니다.
+        header, header_tokens, body = "", 0, lines
+    line_budget = budget - header_tokens - 1
+
+    # 예산을 넘는 줄은 먼저 잘게 나눕니다.
+    units = []
+    for line in body:
+        if count_tokens(line, model) > line_budget:
+            units.extend(_split_long_line(line, model, line_budget))
+        else:
+            units.append(line)
+
+    chunks = []
+    current = []
+    for unit in units:
+        candidate = current + [unit]
+        if current and count_tokens("\n".join(candidate), model) > line_budget:
+            chunks.append(current)
+            overlap = current[-OVERLAP_LINES:] if OVERLAP_LINES else []
+            current = overlap + [unit]
+            if count_tokens("\n".join(current), model) > line_budget:
+                current = [unit]
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+
+    return ["\n".join(([header] if header else []) + chunk) for chunk in chunks]
+
+
+def chunk_records(records, model: str, max_length: int = None):
+    """
+    (record_id, 텍스트) 이터러블을 모델 컨텍스트(와 임베딩 백엔드의 max_length)에 맞게 청크로 나눕니다.
+    나뉘지 않은 레코드는 ID를 유지하고, 나뉜 레코드는 "<record_id>#chunk_<n>" ID를 받습니다.
+    """
+    for record_id, text in records:
+        chunks = chunk_skeleton(text, model, max_length)
+        if len(chunks) == 1:
+            yield record_id, chunks[0]
+            continue
+        for i, chunk in enumerate(chunks):
+            yield f"{record_id}{CHUNK_ID_SEPARATOR}{i}", chunk
+
+
+def parent_record_id(record_id: str) -> str:
+    """
+    청크 ID에서 원래 조(article) 레코드 ID를 돌려줍니다.
+    """
+    return record_id.split(CHUNK_ID_SEPARATOR, 1)[0]
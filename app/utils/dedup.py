@@ -0,0 +1,197 @@
+# app/utils/dedup.py
+
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+from app.utils.skeleton import document_key
+
+SHINGLE_SIZE = 5            # 문자 shingle 길이
+NUM_PERM = 64               # MinHash 해시 함수 수
+LSH_BANDS = 8               # LSH 밴드 수 (밴드당 NUM_PERM // LSH_BANDS 행)
+DEFAULT_THRESHOLD = 0.9     # 같은 클러스터로 묶을 추정 Jaccard 유사도 하한
+DEDUP_MAP_FILE_NAME = "dedup_map.json"
+
+# h(x) = ((a * x + b) mod p) & 0xffffffff 형태의 해시 함수군 (uint64 곱셈의 오버플로는 허용)
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(20240711)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+# 스켈레톤의 조 줄 ("      ├─ 제27조(삭제): ...")
+_ARTICLE_LINE = re.compile(r"^\s*├─ 제[^()]*\((?P<title>[^)]*)\):\s*(?P<text>.*)$")
+_TREE_PREFIX = re.compile(r"^\s*[├└]─\s*")
+_PARAGRAPH_SYMBOL = re.compile(r"^[①-⑳㉑-㉟]\s*")
+# 삭제 표시: "<삭 제>", "(삭제)", "[삭제]" 또는 줄/제목 전체가 "삭제" ("삭제된 자료는 ..." 같은 본문은 제외)
+_DELETED_MARKER = re.compile(r"[<(\[]\s*삭\s*제\s*[>)\]]|삭\s*제")
+_RENDER_FAILURE = "을(를) 찾지 못했습니다."
+
+
+def article_body(text: str) -> str:
+    """
+    스켈레톤 텍스트에서 문서/장/절 머리줄을 뺀 조 본문(조 본문, 문단, 항목)만 돌려줍니다.
+    형제 규정 간 제목이 달라도 같은 상용구 조는 같은 본문을 갖게 됩니다.
+    """
+    lines = text.split("\n")
+    for i, line in enumerate(lines):
+        m = _ARTICLE_LINE.match(line)
+        if m:
+            body = [m.group("text")]
+            for rest in lines[i + 1:]:
+                body.append(_TREE_PREFIX.sub("", rest))
+            return "\n".join(part for part in body if part.strip())
+    return ""
+
+
+def is_deleted_marker(text: str) -> bool:
+    """
+    text(문단 기호를 뗀 본문 줄 또는 조 제목) 전체가 삭제 표시이면 True. ("<삭 제>", "(삭제)", "삭제")
+    """
+    return bool(_DELETED_MARKER.fullmatch(text.strip()))
+
+
+def is_empty_or_deleted(text: str) -> bool:
+    """
+    삭제된 조("<삭 제>", "(삭제)")나 본문이 비어 있는 조, 렌더링에 실패한 조이면 True.
+    """
+    if _RENDER_FAILURE in text:
+        return True
+    content = []
+    for line in article_body(text).split("\n"):
+        # 문단 기호(①, ② ...)만 남은 줄이나 삭제 표시만 있는 줄은 내용으로 치지 않습니다.
+        line = _PARAGRAPH_SYMBOL.sub("", line).strip()
+        if line and not is_deleted_marker(line):
+            content.append(line)
+    return not re.sub(r"[\W_]+", "", "".join(content))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    문자 shingle 집합의 MinHash 서명(NUM_PERM개의 최솟값)을 계산합니다.
+    """
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    with np.errstate(over="ignore"):
+        permuted = ((hashes[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # 먼저 나온 레코드가 대표가 되도록 작은 인덱스를 루트로 둡니다.
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def cluster_near_duplicates(texts: list, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    MinHash/LSH로 후보 쌍을 찾고, 추정 Jaccard 유사도가 threshold 이상인 쌍을 묶습니다.
+
+    Returns:
+        list: 각 텍스트의 대표 인덱스 (대표 자신은 자기 인덱스).
+    """
+    signatures = [minhash_signature(text) for text in texts]
+    rows = NUM_PERM // LSH_BANDS
+    buckets = {}
+    for i, signature in enumerate(signatures):
+        for band in range(LSH_BANDS):
+            key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            buckets.setdefault(key, []).append(i)
+
+    union_find = _UnionFind(len(texts))
+    checked = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        first = members[0]
+        for other in members[1:]:
+            pair = (first, other)
+            if pair in checked:
+                continue
+            checked.add(pair)
+            similarity = float(np.mean(signatures[first] == signatures[other]))
+            if similarity >= threshold:
+                union_find.union(first, other)
+    return [union_find.find(i) for i in range(len(texts))]
+
+
+def filter_records(records: list, threshold: float = DEFAULT_THRESHOLD):
+    """
+    ingestion 전에 삭제/빈 조를 제거하고, 같은 문서(규정) 안에서 본문이 거의 같은 조는 대표 레코드 하나만 남깁니다.
+    서로 다른 규정의 같은 상용구 조는 각 규정의 조로 검색되어야 하므로 병합하지 않습니다.
+
+    Args:
+        records (list): (record_id, 스켈레톤 텍스트) 리스트.
+        threshold (float): 근사 중복으로 판단할 추정 Jaccard 유사도 하한.
+
+    Returns:
+        tuple: (남길 레코드 리스트, {중복 record_id: 대표 record_id}, 리포트 dict)
+    """
+    kept = []
+    dropped = 0
+    seen = set()
+    for record_id, text in records:
+        # 같은 ID가 반복되면 ingestion과 마찬가지로 처음 나온 레코드만 봅니다.
+        if record_id in seen:
+            continue
+        seen.add(record_id)
+        if is_empty_or_deleted(text):
+            dropped += 1
+        else:
+            kept.append((record_id, text))
+
+    by_document = {}
+    for i, (record_id, _) in enumerate(kept):
+        by_document.setdefault(document_key(record_id), []).append(i)
+    representatives = list(range(len(kept)))
+    for rows in by_document.values():
+        clusters = cluster_near_duplicates([article_body(kept[i][1]) for i in rows], threshold)
+        for i, representative in zip(rows, clusters):
+            representatives[i] = rows[representative]
+    unique = []
+    duplicate_map = {}
+    for i, (record_id, text) in enumerate(kept):
+        if representatives[i] == i:
+            unique.append((record_id, text))
+        else:
+            duplicate_map[record_id] = kept[representatives[i]][0]
+
+    total = len(seen)
+    report = {
+        "total": total,
+        "dropped_empty_or_deleted": dropped,
+        "near_duplicates": len(duplicate_map),
+        "clusters_with_duplicates": len(set(duplicate_map.values())),
+        "kept": len(unique),
+        "reduction": 1 - len(unique) / total if total else 0.0,
+    }
+    return unique, duplicate_map, report
+
+
+def save_duplicate_map(db_path: str, duplicate_map: dict):
+    """
+    {중복 record_id: 대표 record_id} 매핑을 DB 경로에 저장합니다.
+    """
+    os.makedirs(db_path, exist_ok=True)
+    with open(os.path.join(db_path, DEDUP_MAP_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump(duplicate_map, f, ensure_ascii=False, indent=2)
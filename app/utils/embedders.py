@@ -0,0 +1,191 @@
+# app/utils/embedders.py
+
+import asyncio
+import os
+import threading
+from functools import lru_cache
+
+from app.utils.ollama_pool import get_default_pool
+
+# 배포 환경별 임베딩 백엔드 선택
+#   EMBEDDING_BACKEND=ollama (기본) | onnx
+#   ONNX_MODEL_DIR=models/onnx      (모델별 하위 디렉터리: models/onnx/<model>/model.onnx)
+#   ONNX_QUANTIZE=1                 (int8 동적 양자화 모델 사용)
+BACKEND_ENV_VAR = "EMBEDDING_BACKEND"
+ONNX_DIR_ENV_VAR = "ONNX_MODEL_DIR"
+ONNX_QUANTIZE_ENV_VAR = "ONNX_QUANTIZE"
+DEFAULT_ONNX_DIR = os.path.join("models", "onnx")
+
+ONNX_MAX_BATCH_SIZE = 32       # 한 번의 추론에 넣을 최대 문장 수
+ONNX_MAX_BATCH_TOKENS = 16384  # 배치 크기 × 패딩 길이 상한 (긴 문서는 작은 배치로)
+ONNX_MAX_LENGTH = 512
+
+
+class Embedder:
+    """
+    임베딩 백엔드 인터페이스. embed()는 텍스트 리스트를 받아 벡터 리스트를 반환합니다.
+    cache_key는 임베딩 캐시에서 백엔드별 벡터가 섞이지 않도록 구분하는 이름입니다.
+    """
+
+    name = ""
+    cache_key = ""
+    max_length = None  # 백엔드가 받는 최대 입력 토큰 수 (None이면 모델 컨텍스트 길이, chunker 참고)
+
+    def embed(self, texts: list) -> list:
+        raise NotImplementedError
+
+    async def aembed(self, texts: list) -> list:
+        return await asyncio.to_thread(self.embed, texts)
+
+
+class OllamaEmbedder(Embedder):
+    """
+    올라마 HTTP API(풀을 통한 부하 분산 포함)로 임베딩을 생성하는 기본 백엔드.
+    """
+
+    def __init__(self, model: str, pool=None):
+        self.model = model
+        self.pool = pool or get_default_pool()
+        self.name = f"ollama:{model}"
+        # 기존 캐시 항목과 호환되도록 올라마 백엔드는 모델 이름을 그대로 캐시 키로 씁니다.
+        self.cache_key = model
+
+    def embed(self, texts: list) -> list:
+        # truncate=False: 컨텍스트를 넘는 입력은 잘라내지 않고 오류로 처리합니다.
+        return self.pool.embed(model=self.model, input=texts, truncate=False)["embeddings"]
+
+    async def aembed(self, texts: list) -> list:
+        response = await self.pool.acall("embed", model=self.model, input=texts, truncate=False)
+        return response["embeddings"]
+
+
+class OnnxEmbedder(Embedder):
+    """
+    ONNX Runtime으로 임베딩 모델을 프로세스 안에서 CPU 추론하는 백엔드.
+
+    모델 디렉터리에는 optimum으로 내보낸 model.onnx와 토크나이저 파일이 있어야 합니다.
+        optimum-cli export onnx --model mixedbread-ai/mxbai-embed-large-v1 models/onnx/mxbai-embed-large
+    quantize=True이면 int8 동적 양자화 모델(model_int8.onnx)을 처음 한 번 만들어 사용합니다.
+    입력은 길이순으로 정렬해 비슷한 길이끼리 배치를 구성하고, 배치 크기는 패딩 후 토큰 수가
+    max_batch_tokens를 넘지 않도록 동적으로 정합니다.
+    max_length(특수 토큰 포함)를 넘는 입력은 잘라내지 않고 오류로 처리합니다. (적재 시에는 chunker가
+    이 길이에 맞춰 청크를 나눕니다.)
+    """
+
+    def __init__(self, model: str, model_dir: str = None, quantize: bool = False,
+                 max_batch_size: int = ONNX_MAX_BATCH_SIZE,
+                 max_batch_tokens: int = ONNX_MAX_BATCH_TOKENS,
+                 max_length: int = ONNX_MAX_LENGTH,
+                 num_threads: int = None, pooling: str = "cls", normalize: bool = True):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("ONNX 백엔드를 사용하려면 onnxruntime을 설치하세요: pip install onnxruntime") from e
+        from transformers import AutoTokenizer
+
+        self.model = model
+        self.model_dir = model_dir or os.path.join(DEFAULT_ONNX_DIR, model)
+        self.quantize = quantize
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_length = max_length
+        self.pooling = pooling
+        self.normalize = normalize
+        self.name = f"onnx:{model}" + (":int8" if quantize else "")
+        self.cache_key = self.name
+
+        model_path = os.path.join(self.model_dir, "model.onnx")
+        if quantize:
+            model_path = self._quantized_model_path(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        # InferenceSession.run은 스레드 안전하지만, 토크나이저 호출과 함께 직렬화해 CPU 경합을 줄입니다.
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _quantized_model_path(model_path: str) -> str:
+        quantized_path = model_path.replace(".onnx", "_int8.onnx")
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            print(f"int8 동적 양자화 모델 생성 중: {quantized_path}")
+            quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        return quantized_path
+
+    def _batches(self, texts: list):
+        """
+        (원래 인덱스 리스트, 텍스트 리스트) 배치를 길이순으로 생성합니다.
+        """
+        lengths = [len(self.tokenizer.tokenize(text)) + 2 for text in texts]
+        too_long = [length for length in lengths if length > self.max_length]
+        if too_long:
+            raise ValueError(f"{self.name}: 입력 {len(too_long)}건이 최대 길이 {self.max_length} 토큰을 넘습니다 "
+                             f"(최대 {max(too_long)} 토큰). 청크로 나눈 뒤 임베딩하세요.")
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+        batch = []
+        for i in order:
+            padded = min(lengths[i], self.max_length)
+            if batch and (len(batch) + 1 > self.max_batch_size
+                          or (len(batch) + 1) * padded > self.max_batch_tokens):
+                yield batch, [texts[j] for j in batch]
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch, [texts[j] for j in batch]
+
+    def _run(self, batch_texts: list):
+        import numpy as np
+
+        inputs = self.tokenizer(
+            batch_texts, padding=True, truncation=False, return_tensors="np"
+        )
+        feeds = {name: inputs[name].astype(np.int64) for name in self.input_names if name in inputs}
+        hidden = self.session.run(None, feeds)[0]
+        if self.pooling == "mean":
+            mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+            vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        else:
+            vectors = hidden[:, 0]
+        if self.normalize:
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors
+
+    def embed(self, texts: list) -> list:
+        results = [None] * len(texts)
+        with self._lock:
+            for indices, batch_texts in self._batches(texts):
+                vectors = self._run(batch_texts)
+                for i, vector in zip(indices, vectors):
+                    results[i] = vector.tolist()
+        return results
+
+
+def make_embedder(model: str, backend: str = "ollama", pool=None,
+                  onnx_dir: str = None, quantize: bool = False) -> Embedder:
+    """
+    백엔드 이름("ollama" 또는 "onnx")에 맞는 임베더를 생성합니다.
+    """
+    if backend == "ollama":
+        return OllamaEmbedder(model, pool=pool)
+    if backend == "onnx":
+        model_dir = os.path.join(onnx_dir, model) if onnx_dir else None
+        return OnnxEmbedder(model, model_dir=model_dir, quantize=quantize)
+    raise ValueError(f"알 수 없는 임베딩 백엔드입니다: {backend}")
+
+
+@lru_cache(maxsize=None)
+def get_embedder(model: str) -> Embedder:
+    """
+    환경 변수(EMBEDDING_BACKEND 등)로 선택한 백엔드의 임베더를 모델별로 한 번만 생성합니다.
+    """
+    return make_embedder(
+        model,
+        backend=os.environ.get(BACKEND_ENV_VAR, "ollama"),
+        onnx_dir=os.environ.get(ONNX_DIR_ENV_VAR),
+        quantize=os.environ.get(ONNX_QUANTIZE_ENV_VAR, "") in ("1", "true", "yes"),
+    )
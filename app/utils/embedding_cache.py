@@ -0,0 +1,159 @@
+# app/utils/embedding_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# 캐시 파일 경로 및 크기 제한 (1024차원 float32 기준 항목당 약 4KB)
+DEFAULT_CACHE_PATH = os.path.join(".cache", "embedding_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 50000
+
+
+def text_sha256(text: str) -> str:
+    """
+    캐시 키로 사용할 텍스트의 SHA-256 해시를 반환합니다.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    (모델 이름, 텍스트 SHA-256) → float32 벡터를 저장하는 SQLite 기반 영구 캐시.
+    ingestion과 쿼리 임베딩이 같은 캐시 파일을 공유합니다.
+    항목 수가 max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 삭제합니다.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, texts: list) -> list:
+        """
+        텍스트 리스트에 대한 캐시된 벡터 리스트를 반환합니다. 없는 항목은 None입니다.
+        """
+        hashes = [text_sha256(text) for text in texts]
+        found = {}
+        with self._lock:
+            # SQLite 변수 개수 제한을 피하기 위해 나누어 조회합니다.
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found],
+                )
+                self._conn.commit()
+            results = []
+            for text_hash in hashes:
+                blob = found.get(text_hash)
+                if blob is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(np.frombuffer(blob, dtype=np.float32).tolist())
+        return results
+
+    def get(self, model: str, text: str):
+        """
+        단일 텍스트의 캐시된 벡터를 반환합니다. 없으면 None.
+        """
+        return self.get_many(model, [text])[0]
+
+    def put_many(self, model: str, texts: list, vectors: list):
+        """
+        텍스트-벡터 쌍을 캐시에 저장하고, 크기 제한을 넘으면 오래된 항목을 삭제합니다.
+        """
+        now = time.time()
+        rows = [
+            (model, text_sha256(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def put(self, model: str, text: str, vector: list):
+        """
+        단일 텍스트-벡터 쌍을 캐시에 저장합니다.
+        """
+        self.put_many(model, [text], [vector])
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self) -> dict:
+        """
+        현재 프로세스의 적중/미스 횟수와 캐시 크기를 반환합니다.
+        """
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+
+
+def get_default_cache() -> EmbeddingCache:
+    """
+    프로세스 전체에서 공유하는 기본 캐시 인스턴스를 반환합니다.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = EmbeddingCache()
+    return _default_cache
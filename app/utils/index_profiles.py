@@ -0,0 +1,152 @@
+# app/utils/index_profiles.py
+
+import json
+import os
+import time
+
+import numpy as np
+
+# Chroma HNSW 인덱스 파라미터 프로파일
+#   space:           거리 (l2 | cosine | ip), 컬렉션 생성 후에는 바꿀 수 없습니다.
+#   M:               노드당 연결 수 (메모리와 recall에 영향)
+#   construction_ef: 생성 시 탐색 폭 (적재 시간과 그래프 품질)
+#   search_ef:       검색 시 탐색 폭 (질의 지연시간과 recall)
+# "default"는 Chroma 기본값으로, 프로파일 도입 전에 만든 기존 DB가 이 설정입니다.
+HNSW_PROFILES = {
+    "default": {"space": "l2", "M": 16, "construction_ef": 100, "search_ef": 10},
+    "fast": {"space": "cosine", "M": 8, "construction_ef": 64, "search_ef": 16},
+    "balanced": {"space": "cosine", "M": 16, "construction_ef": 128, "search_ef": 64},
+    "accurate": {"space": "cosine", "M": 32, "construction_ef": 256, "search_ef": 128},
+}
+DEFAULT_PROFILE = "default"
+# tuneDB.py가 저장한 사용자 프로파일 (버전별 인덱스와 같은 indexes/ 아래)
+PROFILES_FILE = os.path.join("indexes", "hnsw_profiles.json")
+
+SWEEP_M = [8, 12, 16, 24, 32]
+SWEEP_CONSTRUCTION_EF = [64, 100, 200]
+SWEEP_SEARCH_EF = [10, 16, 32, 64, 128, 256]
+DEFAULT_RECALL_TARGET = 0.95
+
+
+def load_profiles() -> dict:
+    """
+    기본 프로파일과 저장된 사용자 프로파일을 합쳐 반환합니다. (같은 이름이면 사용자 프로파일 우선)
+    """
+    profiles = dict(HNSW_PROFILES)
+    if os.path.exists(PROFILES_FILE):
+        with open(PROFILES_FILE, "r", encoding="utf-8") as f:
+            profiles.update(json.load(f))
+    return profiles
+
+
+def get_profile(name: str) -> dict:
+    profiles = load_profiles()
+    if name not in profiles:
+        raise ValueError(f"알 수 없는 HNSW 프로파일입니다: {name} (사용 가능: {', '.join(profiles)})")
+    return dict(profiles[name])
+
+
+def save_profile(name: str, params: dict):
+    """
+    사용자 프로파일을 저장합니다. 이후 makeDB.py --hnsw-profile <name>으로 사용할 수 있습니다.
+    """
+    profiles = {}
+    if os.path.exists(PROFILES_FILE):
+        with open(PROFILES_FILE, "r", encoding="utf-8") as f:
+            profiles = json.load(f)
+    profiles[name] = {key: params[key] for key in ("space", "M", "construction_ef", "search_ef")}
+    os.makedirs(os.path.dirname(PROFILES_FILE), exist_ok=True)
+    with open(PROFILES_FILE + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(profiles, f, ensure_ascii=False, indent=2)
+    os.replace(PROFILES_FILE + ".tmp", PROFILES_FILE)
+
+
+def collection_metadata(params: dict) -> dict:
+    """
+    프로파일을 Chroma 컬렉션 생성 metadata("hnsw:*" 키)로 변환합니다.
+    """
+    return {
+        "hnsw:space": params["space"],
+        "hnsw:M": params["M"],
+        "hnsw:construction_ef": params["construction_ef"],
+        "hnsw:search_ef": params["search_ef"],
+    }
+
+
+def exact_neighbours(matrix: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """
+    brute force로 구한 질의별 정답 top-k 인덱스 (recall 기준).
+    """
+    if space == "l2":
+        scores = -(np.sum(queries ** 2, axis=1)[:, None] - 2 * queries @ matrix.T + np.sum(matrix ** 2, axis=1))
+    elif space == "cosine":
+        scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ (
+            matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).T
+    else:
+        scores = queries @ matrix.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def sweep(matrix: np.ndarray, queries: np.ndarray, k: int = 10, space: str = "cosine",
+          m_values=SWEEP_M, construction_efs=SWEEP_CONSTRUCTION_EF, search_efs=SWEEP_SEARCH_EF,
+          num_threads: int = 1, relevant: list = None) -> list:
+    """
+    (M, construction_ef, search_ef) 조합마다 HNSW 인덱스(Chroma와 같은 hnswlib)를 만들어
+    적재 시간, 질의 지연시간, 메모리, 정확 검색 대비 recall@k를 측정합니다.
+    relevant(질의별 정답 행 인덱스 집합, 없는 질의는 None)가 주어지면 정답 기준 hit@k도 함께 기록합니다.
+    """
+    import hnswlib
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    truth = exact_neighbours(matrix, queries, k, space)
+    results = []
+    for m in m_values:
+        for construction_ef in construction_efs:
+            index = hnswlib.Index(space=space, dim=matrix.shape[1])
+            started = time.perf_counter()
+            index.init_index(max_elements=len(matrix), ef_construction=construction_ef, M=m)
+            index.set_num_threads(num_threads)
+            index.add_items(matrix, np.arange(len(matrix)))
+            build_seconds = time.perf_counter() - started
+            # 벡터(float32) + 0층 연결(2M개) + 상위 층 연결의 근사 크기
+            memory_bytes = len(matrix) * (matrix.shape[1] * 4 + 2 * m * 4 + m * 4)
+            for search_ef in search_efs:
+                if search_ef < k:
+                    continue
+                index.set_ef(search_ef)
+                latencies = []
+                found = []
+                for query in queries:
+                    started = time.perf_counter()
+                    labels, _ = index.knn_query(query, k=k)
+                    latencies.append(time.perf_counter() - started)
+                    found.append(labels[0])
+                latencies.sort()
+                recall = np.mean([len(set(a.tolist()) & set(b.tolist())) / k for a, b in zip(truth, found)])
+                labeled = [(rows, set(b.tolist())) for rows, b in zip(relevant or [], found) if rows]
+                label_hit = np.mean([bool(rows & b) for rows, b in labeled]) if labeled else None
+                results.append({
+                    "space": space,
+                    "M": m,
+                    "construction_ef": construction_ef,
+                    "search_ef": search_ef,
+                    "recall_at_k": float(recall),
+                    "label_hit_at_k": None if label_hit is None else float(label_hit),
+                    "p50_ms": latencies[len(latencies) // 2] * 1000,
+                    "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+                    "build_seconds": build_seconds,
+                    "memory_bytes": memory_bytes,
+                })
+    return results
+
+
+def recommend(results: list, recall_target: float = DEFAULT_RECALL_TARGET):
+    """
+    recall 목표를 만족하는 설정 중 가장 싼 것(질의 p50 → 메모리 → 적재 시간 순)을 고릅니다.
+    만족하는 설정이 없으면 None.
+    """
+    passing = [r for r in results if r["recall_at_k"] >= recall_target]
+    if not passing:
+        return None
+    return min(passing, key=lambda r: (round(r["p50_ms"], 2), r["memory_bytes"], r["build_seconds"]))
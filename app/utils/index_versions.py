@@ -0,0 +1,397 @@
+# app/utils/index_versions.py
+
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+import chromadb
+from chromadb.config import DEFAULT_TENANT, DEFAULT_DATABASE, Settings
+
+from app.utils import ingest_pipeline, sharded_index
+from app.utils.embedders import get_embedder
+from app.utils.embedding_cache import get_default_cache
+from app.utils.index_profiles import DEFAULT_PROFILE, collection_metadata, get_profile
+from app.utils.ingest_telemetry import IngestTelemetry
+from app.utils.skeleton import JSON_FILE_PATH, iter_article_skeletons, load_documents, record_metadata
+from app.utils.vector_index import index_reduction
+
+# 버전별 인덱스 디렉터리 구성
+#   indexes/<model>/versions/<version>/   (Chroma PersistentClient 경로)
+#   indexes/<model>/current.json          (활성 버전 포인터, os.replace로 원자적으로 교체)
+# 포인터가 없는 모델은 기존 경로(chroma_db_<model>)를 그대로 사용합니다.
+# 각 인덱스 경로의 manifest.json에는 컬렉션을 만들 때 사용한 HNSW 프로파일이 기록됩니다.
+INDEX_ROOT = "indexes"
+POINTER_FILE_NAME = "current.json"
+MANIFEST_FILE_NAME = "manifest.json"
+COLLECTION_NAME = "docs"
+DEFAULT_GRACE_SECONDS = 60.0  # 교체된 버전을 삭제하기 전 다른 프로세스의 진행 중 쿼리를 기다리는 시간
+DEFAULT_KEEP_PREVIOUS = 1     # 롤백용으로 남겨 둘 직전 버전 수
+
+_lock = threading.Lock()
+_leases = {}  # 버전 경로 → 이 프로세스에서 진행 중인 쿼리 수
+_lease_paths = {}  # model → 이 프로세스가 마지막으로 점유한 활성 경로
+_jobs = {}    # model → 가장 최근 RebuildJob
+
+
+def legacy_path(model: str) -> str:
+    return f"chroma_db_{model}"
+
+
+def model_root(model: str) -> str:
+    return os.path.join(INDEX_ROOT, model)
+
+
+def version_path(model: str, version: str) -> str:
+    return os.path.join(model_root(model), "versions", version)
+
+
+def read_pointer(model: str) -> dict:
+    """
+    활성 버전 포인터 {"version", "path", "activated_at", "retired"}를 읽습니다. 없으면 빈 딕셔너리.
+    """
+    path = os.path.join(model_root(model), POINTER_FILE_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_pointer(model: str, pointer: dict):
+    path = os.path.join(model_root(model), POINTER_FILE_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pointer, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def active_path(model: str) -> str:
+    """
+    쿼리가 사용할 인덱스 경로를 반환합니다. 버전 포인터가 없으면 기존 chroma_db_<model>.
+    """
+    pointer = read_pointer(model)
+    return pointer.get("path") or legacy_path(model)
+
+
+def active_version(model: str) -> str:
+    """
+    활성 버전 이름을 반환합니다. 버전 포인터가 없으면 "legacy".
+    """
+    return read_pointer(model).get("version") or "legacy"
+
+
+def list_versions(model: str) -> list:
+    """
+    버전 디렉터리 이름을 오래된 순으로 반환합니다.
+    """
+    versions_dir = os.path.join(model_root(model), "versions")
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(os.listdir(versions_dir))
+
+
+def read_manifest(db_path: str) -> dict:
+    """
+    인덱스 경로의 manifest {"hnsw_profile", "hnsw", "created_at"}를 읽습니다. 없으면 빈 딕셔너리.
+    """
+    path = os.path.join(db_path, MANIFEST_FILE_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(db_path: str, manifest: dict):
+    os.makedirs(db_path, exist_ok=True)
+    path = os.path.join(db_path, MANIFEST_FILE_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def index_settings(db_path: str) -> dict:
+    """
+    인덱스 경로를 만들 때 사용한 설정 {"hnsw_profile", "reduction_method", "reduction_dim", "num_shards"}를 읽습니다.
+    (manifest의 HNSW 프로파일, 내보낸 numpy 인덱스의 차원 축소 설정, 샤드 맵의 샤드 수. 없으면 None)
+    """
+    reduction_method, reduction_dim = index_reduction(db_path)
+    return {
+        "hnsw_profile": read_manifest(db_path).get("hnsw_profile", DEFAULT_PROFILE),
+        "reduction_method": reduction_method,
+        "reduction_dim": reduction_dim,
+        "num_shards": sharded_index.shard_count(db_path),
+    }
+
+
+def open_collection(db_path: str, profile: str = None):
+    """
+    db_path의 Persistent ChromaDB "docs" 컬렉션을 반환합니다.
+    컬렉션이 없으면 HNSW 프로파일(없으면 "default" = Chroma 기본값)로 생성하고 manifest에 기록합니다.
+    이미 있는 컬렉션의 HNSW 설정은 바꿀 수 없으므로, 다른 프로파일이 요청되면 경고만 출력합니다.
+    (프로파일을 바꾸려면 makeDB.py --rebuild로 새 버전을 만드세요.)
+    """
+    client = chromadb.PersistentClient(
+        path=db_path,
+        settings=Settings(),
+        tenant=DEFAULT_TENANT,
+        database=DEFAULT_DATABASE,
+    )
+    try:
+        collection = client.get_collection(name=COLLECTION_NAME)
+    except Exception:
+        name = profile or DEFAULT_PROFILE
+        params = get_profile(name)
+        collection = client.create_collection(name=COLLECTION_NAME, metadata=collection_metadata(params))
+        write_manifest(db_path, dict(read_manifest(db_path), hnsw_profile=name, hnsw=params, created_at=time.time()))
+        return collection
+    current = read_manifest(db_path).get("hnsw_profile", DEFAULT_PROFILE)
+    if profile and profile != current:
+        print(f"[WARN] {db_path}의 컬렉션은 HNSW 프로파일 '{current}'로 생성되어 '{profile}'을(를) 적용하지 않습니다. "
+              f"프로파일을 바꾸려면 재구축하세요.")
+    return collection
+
+
+@contextmanager
+def lease(model: str):
+    """
+    활성 인덱스 경로를 쿼리가 끝날 때까지 점유합니다. 점유 중인 버전은 교체되더라도 삭제되지 않습니다.
+    교체된 경로의 마지막 점유가 끝나면 그 경로의 샤드 워커 프로세스를 종료합니다.
+
+        with index_versions.lease(model) as db_path:
+            results = index_versions.open_collection(db_path).query(...)
+    """
+    with _lock:
+        path = active_path(model)
+        previous = _lease_paths.get(model)
+        _lease_paths[model] = path
+        _leases[path] = _leases.get(path, 0) + 1
+        # 쿼리가 없는 동안 교체되었으면 이전 경로는 여기서 바로 정리합니다.
+        retired = previous if previous and previous != path and not _leases.get(previous) else None
+    if retired:
+        sharded_index.close_index(retired)
+    try:
+        yield path
+    finally:
+        with _lock:
+            _leases[path] -= 1
+            if not _leases[path]:
+                del _leases[path]
+            retired = path if path not in _leases and _lease_paths.get(model) != path else None
+        if retired:
+            sharded_index.close_index(retired)
+
+
+def create_version(model: str) -> tuple:
+    """
+    빈 새 버전 디렉터리를 만들고 (version, path)를 반환합니다.
+    """
+    version = time.strftime("v%Y%m%d_%H%M%S")
+    path = version_path(model, version)
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = version_path(model, f"{version}_{suffix}")
+    os.makedirs(path)
+    return os.path.basename(path), path
+
+
+def activate(model: str, version: str) -> dict:
+    """
+    포인터를 version으로 원자적으로 교체합니다. 이전 활성 버전은 retired 목록에 교체 시각과 함께 기록됩니다.
+    """
+    with _lock:
+        pointer = read_pointer(model)
+        retired = pointer.get("retired", {})
+        if pointer.get("version") and pointer["version"] != version:
+            retired[pointer["version"]] = time.time()
+        retired.pop(version, None)
+        new_pointer = {
+            "version": version,
+            "path": version_path(model, version),
+            "activated_at": time.time(),
+            "retired": retired,
+        }
+        _write_pointer(model, new_pointer)
+    return new_pointer
+
+
+def discard_version(model: str, version: str):
+    """
+    활성화되지 않은(실패한) 버전 디렉터리를 삭제합니다.
+    """
+    if read_pointer(model).get("version") == version:
+        raise ValueError(f"활성 버전은 삭제할 수 없습니다: {model} {version}")
+    shutil.rmtree(version_path(model, version), ignore_errors=True)
+
+
+def collect_garbage(model: str, grace_seconds: float = DEFAULT_GRACE_SECONDS,
+                    keep_previous: int = DEFAULT_KEEP_PREVIOUS) -> list:
+    """
+    교체된 지 grace_seconds가 지났고 이 프로세스에서 점유 중인 쿼리가 없는 이전 버전을 삭제합니다.
+    가장 최근에 교체된 keep_previous개 버전은 롤백용으로 남깁니다.
+
+    Returns:
+        list: 삭제한 버전 이름.
+    """
+    removed = []
+    now = time.time()
+    with _lock:
+        pointer = read_pointer(model)
+        retired = pointer.get("retired", {})
+        by_recency = sorted(retired, key=retired.get, reverse=True)
+        for version in by_recency[keep_previous:]:
+            path = version_path(model, version)
+            if now - retired[version] < grace_seconds or _leases.get(path):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            del retired[version]
+            removed.append(version)
+        if removed:
+            _write_pointer(model, dict(pointer, retired=retired))
+    return removed
+
+
+def status(model: str) -> dict:
+    """
+    모델의 활성 버전, 전체 버전 목록, 진행 중 쿼리 수, 최근 재구축 작업 상태를 반환합니다.
+    """
+    pointer = read_pointer(model)
+    with _lock:
+        leases = {os.path.basename(path): count for path, count in _leases.items()
+                  if path.startswith(model_root(model))}
+    job = _jobs.get(model)
+    return {
+        "model": model,
+        "active_version": pointer.get("version"),
+        "active_path": active_path(model),
+        "activated_at": pointer.get("activated_at"),
+        "versions": list_versions(model),
+        "settings": index_settings(active_path(model)),
+        "retired": pointer.get("retired", {}),
+        "leases": leases,
+        "job": job.snapshot() if job else None,
+    }
+
+
+class RebuildJob(threading.Thread):
+    """
+    새 버전 디렉터리에 인덱스를 처음부터 적재하고, 성공하면 포인터를 교체하는 백그라운드 작업.
+    적재하는 동안 쿼리는 기존 활성 버전을 계속 사용합니다. 실패하면 새 버전만 지우고 포인터는 그대로 둡니다.
+    임베딩 캐시를 사용하므로 바뀌지 않은 조는 다시 임베딩하지 않습니다.
+    HNSW 프로파일, 차원 축소, 샤드 수는 인자로 주지 않으면 모델의 활성 버전 설정(index_settings)을 그대로 씁니다.
+    """
+
+    def __init__(self, models: list, dedup_threshold: float = None,
+                 grace_seconds: float = DEFAULT_GRACE_SECONDS, hnsw_profile: str = None,
+                 reduction_method: str = None, reduction_dim: int = None, num_shards: int = None, **kwargs):
+        super().__init__(daemon=True, name=f"rebuild-{'-'.join(models)}")
+        self.models = list(models)
+        self.dedup_threshold = dedup_threshold
+        self.grace_seconds = grace_seconds
+        overrides = {"hnsw_profile": hnsw_profile, "reduction_method": reduction_method,
+                     "reduction_dim": reduction_dim, "num_shards": num_shards}
+        self.overrides = {key: value for key, value in overrides.items() if value is not None}
+        self.settings = {}  # model → 새 버전에 적용한 설정
+        self.kwargs = kwargs
+        self.state = "pending"  # pending → building → swapping → done | failed
+        self.versions = {}
+        self.telemetries = {model: IngestTelemetry(model, live=False) for model in self.models}
+        self.summaries = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    def run(self):
+        self.started_at = time.time()
+        try:
+            self.state = "building"
+            # numpy 인덱스 설정이 같은 모델끼리 한 번에 적재합니다. (렌더링을 공유)
+            groups = {}
+            for model in self.models:
+                settings = dict(index_settings(active_path(model)), **self.overrides)
+                self.settings[model] = settings
+                version, path = create_version(model)
+                self.versions[model] = version
+                key = (settings["reduction_method"], settings["reduction_dim"], settings["num_shards"])
+                groups.setdefault(key, []).append((model, open_collection(path, settings["hnsw_profile"]), path))
+
+            kwargs = dict(self.kwargs)
+            kwargs.setdefault("cache", get_default_cache())
+            kwargs.setdefault("embedders", {model: get_embedder(model) for model in self.models})
+            documents = load_documents(JSON_FILE_PATH)
+            self.summaries = {}
+            for (reduction_method, reduction_dim, num_shards), targets in groups.items():
+                self.summaries.update(ingest_pipeline.ingest_fanout(
+                    iter_article_skeletons(documents),
+                    targets,
+                    dedup_threshold=self.dedup_threshold,
+                    telemetries=self.telemetries,
+                    metadatas=record_metadata(documents),
+                    reduction_method=reduction_method,
+                    reduction_dim=reduction_dim,
+                    num_shards=num_shards,
+                    **kwargs,
+                ))
+
+            self.state = "swapping"
+            for model, version in self.versions.items():
+                activate(model, version)
+                collect_garbage(model, self.grace_seconds)
+            self.state = "done"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+            for model, version in self.versions.items():
+                if read_pointer(model).get("version") != version:
+                    discard_version(model, version)
+            self.state = "failed"
+        finally:
+            self.finished_at = time.time()
+
+    @property
+    def running(self) -> bool:
+        return self.state in ("pending", "building", "swapping")
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "models": self.models,
+            "versions": dict(self.versions),
+            "settings": dict(self.settings),
+            "progress": {
+                model: {"done": t.done, "total": t.total, "line": t.progress_line()}
+                for model, t in self.telemetries.items()
+            },
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def start_rebuild(models, **kwargs) -> RebuildJob:
+    """
+    models의 백그라운드 재구축을 시작합니다. 같은 모델의 재구축이 진행 중이면 그 작업을 반환합니다.
+    kwargs는 RebuildJob에 전달됩니다. (hnsw_profile, reduction_method, reduction_dim, num_shards를 주지 않으면
+    활성 버전 설정을 유지)
+    """
+    if isinstance(models, str):
+        models = [models]
+    with _lock:
+        for model in models:
+            job = _jobs.get(model)
+            if job is not None and job.running:
+                return job
+        job = RebuildJob(models, **kwargs)
+        for model in models:
+            _jobs[model] = job
+    job.start()
+    return job
+
+
+def get_job(model: str):
+    return _jobs.get(model)
@@ -0,0 +1,473 @@
+# app/utils/ingest_pipeline.py
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from app.utils.chunker import chunk_records, parent_record_id
+from app.utils.dedup import filter_records, save_duplicate_map
+from app.utils.vector_index import evaluate_quantization, export_collection, has_numpy_index, index_reduction
+from app.utils.sharded_index import export_collection_shards, shard_count
+from app.utils.embedders import OllamaEmbedder
+from app.utils.ingest_telemetry import IngestTelemetry
+from app.utils.ollama_pool import OllamaPool
+
+# 파이프라인 기본 설정값
+DEFAULT_CONCURRENCY = 4      # 동시에 임베딩을 요청하는 워커 수
+DEFAULT_BATCH_SIZE = 16      # 한 번의 임베딩 요청에 담는 레코드 수
+DEFAULT_QUEUE_SIZE = 8       # 단계 사이 큐에 쌓일 수 있는 최대 배치 수 (backpressure)
+DEFAULT_MAX_RETRIES = 3      # 실패한 임베딩 요청의 최대 재시도 횟수
+DEFAULT_RETRY_BACKOFF = 0.5  # 재시도 대기 시간(초), 시도마다 2배씩 증가
+
+CHECKPOINT_FILE_NAME = "ingest_checkpoint.json"
+HASH_METADATA_KEY = "content_hash"
+
+# 단계 종료를 알리는 센티널
+_DONE = None
+
+
+def content_hash(text: str) -> str:
+    """
+    레코드 텍스트의 SHA-256 해시를 반환합니다. 변경 여부 판단에 사용합니다.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def with_content_hash(records, metadatas: dict = None):
+    """
+    (record_id, 텍스트) 이터러블을 (record_id, 텍스트, 메타데이터) 이터러블로 변환합니다.
+    메타데이터에는 텍스트의 content_hash가 담깁니다.
+    metadatas({조 record_id: 메타데이터}, 예: skeleton.record_metadata)가 주어지면 청크에도 원래 조의
+    메타데이터를 붙이고, 해시에 메타데이터를 함께 넣어 메타데이터만 바뀐 레코드도 다시 업서트되게 합니다.
+    (임베딩은 텍스트 기준으로 캐시되므로 메타데이터만 바뀐 레코드는 임베딩 캐시에서 재사용됩니다.)
+    """
+    for record_id, text in records:
+        metadata = (metadatas or {}).get(parent_record_id(record_id))
+        if not metadata:
+            yield record_id, text, {HASH_METADATA_KEY: content_hash(text)}
+            continue
+        hashed = text + "\n" + json.dumps(metadata, ensure_ascii=False, sort_keys=True)
+        yield record_id, text, dict(metadata, **{HASH_METADATA_KEY: content_hash(hashed)})
+
+
+def get_stored_hashes(collection) -> dict:
+    """
+    컬렉션에 저장된 레코드들의 {record_id: content_hash}를 반환합니다.
+    해시가 없는 레코드(이전 버전으로 적재된 레코드)는 None으로 표시되어 다시 임베딩됩니다.
+    """
+    stored = collection.get(include=["metadatas"])
+    metadatas = stored.get("metadatas") or [None] * len(stored["ids"])
+    return {
+        record_id: (metadata or {}).get(HASH_METADATA_KEY)
+        for record_id, metadata in zip(stored["ids"], metadatas)
+    }
+
+
+def plan_incremental(records, stored_hashes: dict):
+    """
+    코퍼스 레코드와 저장된 해시를 비교하여 증분 적재 계획을 세웁니다.
+
+    Returns:
+        tuple: (임베딩/업서트할 레코드 리스트, 삭제할 record_id 리스트, 변경 없는 레코드 수)
+    """
+    to_upsert = []
+    corpus_ids = set()
+    unchanged = 0
+    for record_id, text, metadata in records:
+        if record_id in corpus_ids:
+            print(f"[WARN] 중복 ID를 건너뜁니다: {record_id}")
+            continue
+        corpus_ids.add(record_id)
+        if stored_hashes.get(record_id) == metadata[HASH_METADATA_KEY]:
+            unchanged += 1
+        else:
+            to_upsert.append((record_id, text, metadata))
+    to_delete = [record_id for record_id in stored_hashes if record_id not in corpus_ids]
+    return to_upsert, to_delete, unchanged
+
+
+def load_checkpoint(db_path: str) -> dict:
+    """
+    DB 경로의 ingestion 체크포인트를 읽습니다. 없으면 빈 딕셔너리를 반환합니다.
+    """
+    path = os.path.join(db_path, CHECKPOINT_FILE_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARN] 체크포인트 파일을 읽지 못했습니다: {e}")
+        return {}
+
+
+def save_checkpoint(db_path: str, checkpoint: dict):
+    """
+    ingestion 체크포인트를 임시 파일에 쓴 뒤 교체하여, 중간에 중단되어도 파일이 깨지지 않게 합니다.
+    """
+    os.makedirs(db_path, exist_ok=True)
+    path = os.path.join(db_path, CHECKPOINT_FILE_NAME)
+    checkpoint = dict(checkpoint, updated_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+async def _produce(records, embed_queue: asyncio.Queue, batch_size: int, num_workers: int):
+    """
+    (record_id, 텍스트, 메타데이터) 이터러블을 배치로 묶어 임베딩 큐에 넣습니다.
+    큐가 가득 차면 put()에서 대기하므로, 렌더링이 임베딩보다 앞서 나가지 않습니다.
+    같은 record_id가 반복되면 첫 레코드만 사용합니다. (Chroma는 한 배치 안의 중복 ID를 거부합니다.)
+    """
+    batch = []
+    seen_ids = set()
+    for record_id, text, metadata in records:
+        if record_id in seen_ids:
+            print(f"[WARN] 중복 ID를 건너뜁니다: {record_id}")
+            continue
+        seen_ids.add(record_id)
+        batch.append((record_id, text, metadata))
+        if len(batch) >= batch_size:
+            await embed_queue.put(batch)
+            batch = []
+    if batch:
+        await embed_queue.put(batch)
+    for _ in range(num_workers):
+        await embed_queue.put(_DONE)
+
+
+async def _embed_with_retry(embedder, texts: list,
+                            max_retries: int, retry_backoff: float, telemetry: IngestTelemetry) -> list:
+    """
+    임베더로 배치 임베딩을 요청합니다. 실패 시 지수 백오프로 재시도합니다.
+    요청마다 지연시간을 telemetry에 기록합니다.
+    """
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            embeddings = await embedder.aembed(texts)
+            latency = time.perf_counter() - started
+            telemetry.observe_latency(latency)
+            telemetry.add_stage("embed", latency, len(texts))
+            return embeddings
+        except Exception as e:
+            telemetry.incr("failed_requests")
+            if attempt >= max_retries:
+                raise RuntimeError(
+                    f"임베딩 요청이 {max_retries + 1}회 실패했습니다 ({embedder.name}): {e}"
+                ) from e
+            delay = retry_backoff * (2 ** attempt)
+            attempt += 1
+            telemetry.incr("retries")
+            print(f"[WARN] 임베딩 요청 실패, {delay:.1f}초 후 재시도합니다 ({attempt}/{max_retries}): {e}")
+            await asyncio.sleep(delay)
+
+
+async def _embed_cached(embedder, texts: list, cache,
+                        max_retries: int, retry_backoff: float, telemetry: IngestTelemetry) -> list:
+    """
+    캐시에 있는 벡터는 재사용하고, 없는 텍스트만 임베더에 요청한 뒤 캐시에 저장합니다.
+    캐시 키에는 임베더의 cache_key(백엔드+모델)를 사용합니다.
+    """
+    if cache is None:
+        return await _embed_with_retry(embedder, texts, max_retries, retry_backoff, telemetry)
+    with telemetry.stage("cache_lookup", len(texts)):
+        embeddings = await asyncio.to_thread(cache.get_many, embedder.cache_key, texts)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    telemetry.incr("cache_hits", len(texts) - len(missing))
+    telemetry.incr("cache_misses", len(missing))
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        fetched = await _embed_with_retry(embedder, missing_texts, max_retries, retry_backoff, telemetry)
+        with telemetry.stage("cache_store", len(missing_texts)):
+            await asyncio.to_thread(cache.put_many, embedder.cache_key, missing_texts, fetched)
+        for i, embedding in zip(missing, fetched):
+            embeddings[i] = embedding
+    return embeddings
+
+
+async def _embed_worker(embedder, embed_queue: asyncio.Queue, write_queue: asyncio.Queue,
+                        max_retries: int, retry_backoff: float, cache, telemetry: IngestTelemetry):
+    """
+    임베딩 큐에서 배치를 꺼내 임베딩을 생성하고, 결과를 쓰기 큐로 넘깁니다.
+    """
+    while True:
+        batch = await embed_queue.get()
+        if batch is _DONE:
+            await write_queue.put(_DONE)
+            return
+        ids = [record_id for record_id, _, _ in batch]
+        texts = [text for _, text, _ in batch]
+        metadatas = [metadata for _, _, metadata in batch]
+        embeddings = await _embed_cached(embedder, texts, cache, max_retries, retry_backoff, telemetry)
+        await write_queue.put((ids, embeddings, texts, metadatas))
+
+
+async def _write(collection, write_queue: asyncio.Queue, num_workers: int, on_commit,
+                 telemetry: IngestTelemetry) -> int:
+    """
+    단일 writer가 쓰기 큐의 결과를 Chroma 컬렉션에 upsert로 커밋합니다.
+    Chroma 호출은 동기이므로 별도 스레드에서 실행해 이벤트 루프를 막지 않습니다.
+    on_commit(ids, written)이 주어지면 커밋마다 호출합니다. (체크포인트 갱신 등)
+    """
+    finished_workers = 0
+    written = 0
+    while finished_workers < num_workers:
+        item = await write_queue.get()
+        if item is _DONE:
+            finished_workers += 1
+            continue
+        ids, embeddings, documents, metadatas = item
+        with telemetry.stage("write", len(ids)):
+            await asyncio.to_thread(
+                collection.upsert, ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas
+            )
+        written += len(ids)
+        if on_commit is not None:
+            on_commit(ids, written)
+        telemetry.advance(len(ids))
+    return written
+
+
+async def run_ingestion(records, collection, model: str = "mxbai-embed-large",
+                        concurrency: int = DEFAULT_CONCURRENCY,
+                        batch_size: int = DEFAULT_BATCH_SIZE,
+                        queue_size: int = DEFAULT_QUEUE_SIZE,
+                        max_retries: int = DEFAULT_MAX_RETRIES,
+                        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+                        host: str = None,
+                        pool=None,
+                        embedder=None,
+                        on_commit=None,
+                        cache=None,
+                        telemetry: IngestTelemetry = None) -> int:
+    """
+    producer → N개의 임베딩 워커 → 단일 writer 로 구성된 비동기 ingestion 파이프라인을 실행합니다.
+
+    Args:
+        records: (record_id, 텍스트, 메타데이터) 튜플의 이터러블 (예: with_content_hash).
+        collection: 결과를 저장할 Chroma 컬렉션.
+        model (str): 올라마 임베딩 모델.
+        concurrency (int): 동시 임베딩 워커 수. 임베딩 서버 처리량에 맞춰 조정합니다.
+        batch_size (int): 임베딩 요청 한 번에 담을 레코드 수.
+        queue_size (int): 단계 사이 큐의 최대 배치 수. 가득 차면 앞 단계가 대기합니다.
+        max_retries (int): 임베딩 요청 실패 시 최대 재시도 횟수.
+        retry_backoff (float): 첫 재시도 대기 시간(초).
+        host (str): 올라마 서버 주소 (None이면 기본값). pool이 주어지면 무시됩니다.
+        pool (OllamaPool): 여러 올라마 엔드포인트에 요청을 분산할 풀.
+        embedder (Embedder): 임베딩 백엔드. 없으면 model/pool로 올라마 임베더를 만듭니다.
+        on_commit: 커밋마다 호출할 콜백 (ids, 누적 기록 수).
+        cache (EmbeddingCache): 임베딩 캐시. 주어지면 캐시에 없는 텍스트만 올라마에 요청합니다.
+        telemetry (IngestTelemetry): 단계별 시간/진행률/지연시간 수집기 (없으면 새로 생성).
+
+    Returns:
+        int: 컬렉션에 기록된 레코드 수.
+    """
+    concurrency = max(1, concurrency)
+    if telemetry is None:
+        telemetry = IngestTelemetry(model)
+    if not telemetry.total:
+        telemetry.start(len(records) if hasattr(records, "__len__") else 0)
+    if embedder is None:
+        if pool is None:
+            pool = OllamaPool([host] if host else None)
+        embedder = OllamaEmbedder(model, pool=pool)
+    embed_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+
+    producer = asyncio.create_task(_produce(records, embed_queue, batch_size, concurrency))
+    workers = [
+        asyncio.create_task(
+            _embed_worker(embedder, embed_queue, write_queue, max_retries, retry_backoff, cache, telemetry)
+        )
+        for _ in range(concurrency)
+    ]
+    writer = asyncio.create_task(_write(collection, write_queue, concurrency, on_commit, telemetry))
+    tasks = [producer, *workers, writer]
+
+    # 어느 단계든 예외가 발생하면 나머지 단계를 취소합니다. (큐 대기 상태로 멈추지 않도록)
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    for task in done:
+        task.result()
+    return writer.result()
+
+
+def ingest(records, collection, model: str = "mxbai-embed-large", **kwargs) -> int:
+    """
+    run_ingestion()의 동기 래퍼입니다. 스크립트(makeDB.py 등)에서 호출합니다.
+    """
+    return asyncio.run(run_ingestion(records, collection, model=model, **kwargs))
+
+
+async def run_incremental(hashed_records: list, collection, db_path: str,
+                          model: str = "mxbai-embed-large", telemetry: IngestTelemetry = None,
+                          **kwargs) -> dict:
+    """
+    content_hash 비교로 새로 추가되거나 변경된 레코드만 임베딩/업서트하고,
+    코퍼스에서 사라진 레코드는 삭제합니다.
+
+    배치가 커밋될 때마다 해시가 함께 저장되므로, 중단 후 다시 실행하면 커밋되지 않은
+    레코드만 다시 처리됩니다. 진행 상황은 db_path의 체크포인트 파일에 기록됩니다.
+
+    Args:
+        hashed_records (list): (record_id, 텍스트, 메타데이터) 리스트 (with_content_hash 결과).
+        collection: 대상 Chroma 컬렉션.
+        db_path (str): 체크포인트를 저장할 DB 경로.
+        model (str): 올라마 임베딩 모델.
+        telemetry (IngestTelemetry): 단계별 계측기 (없으면 새로 생성).
+        **kwargs: run_ingestion()에 전달할 파이프라인 설정.
+
+    Returns:
+        dict: {"upserted", "deleted", "unchanged", "elapsed", "throughput", "telemetry"}.
+    """
+    if telemetry is None:
+        telemetry = IngestTelemetry(model)
+    previous = load_checkpoint(db_path)
+    if previous.get("status") == "in_progress":
+        print(f"[{model}] 이전 ingestion이 중단되었습니다 (커밋 {previous.get('committed', 0)}건). 이어서 진행합니다.")
+
+    with telemetry.stage("plan", len(hashed_records)):
+        stored_hashes = await asyncio.to_thread(get_stored_hashes, collection)
+        to_upsert, to_delete, unchanged = plan_incremental(hashed_records, stored_hashes)
+    print(f"[{model}] 증분 적재 계획: 추가/변경 {len(to_upsert)}건, 삭제 {len(to_delete)}건, 변경 없음 {unchanged}건")
+
+    if to_delete:
+        with telemetry.stage("delete", len(to_delete)):
+            await asyncio.to_thread(collection.delete, ids=to_delete)
+        print(f"[{model}] 코퍼스에서 사라진 레코드 {len(to_delete)}건 삭제 완료.")
+
+    checkpoint = {"status": "in_progress", "model": model, "pending": len(to_upsert), "committed": 0}
+    save_checkpoint(db_path, checkpoint)
+
+    def _on_commit(ids, written):
+        save_checkpoint(db_path, dict(checkpoint, committed=written, last_id=ids[-1]))
+
+    started = time.perf_counter()
+    upserted = 0
+    telemetry.start(len(to_upsert))
+    if to_upsert:
+        upserted = await run_ingestion(
+            to_upsert, collection, model=model, on_commit=_on_commit, telemetry=telemetry, **kwargs
+        )
+    elapsed = time.perf_counter() - started
+    save_checkpoint(db_path, dict(checkpoint, status="complete", committed=upserted))
+    return {
+        "upserted": upserted,
+        "deleted": len(to_delete),
+        "unchanged": unchanged,
+        "elapsed": elapsed,
+        "throughput": upserted / elapsed if elapsed > 0 else 0.0,
+        "telemetry": telemetry.summary(),
+    }
+
+
+async def run_fanout(records, targets: list, embedders: dict = None,
+                     dedup_threshold: float = None, telemetries: dict = None,
+                     numpy_index: bool = True, reduction_method: str = None, reduction_dim: int = None,
+                     num_shards: int = None, metadatas: dict = None, **kwargs) -> dict:
+    """
+    코퍼스를 한 번만 렌더링한 뒤, 여러 임베딩 모델의 증분 적재를 동시에 실행합니다.
+    모델을 추가해도 렌더링 비용은 늘어나지 않습니다. 모델마다 토크나이저와 컨텍스트 길이가
+    다르므로, 컨텍스트를 넘는 조의 청크 분할과 해싱만 모델별로 수행합니다.
+
+    Args:
+        records: (record_id, 텍스트) 튜플의 이터러블 (예: iter_article_skeletons).
+        targets (list): (model, collection, db_path) 튜플 리스트.
+        embedders (dict): {model: Embedder}. 없는 모델은 올라마 임베더를 사용합니다.
+        dedup_threshold (float): 주어지면 삭제/빈 조를 제외하고, 같은 문서 안에서 추정 Jaccard 유사도가
+            이 값 이상인 근사 중복 조는 대표 하나만 적재합니다. (중복 → 대표 매핑은 DB 경로에 저장)
+        telemetries (dict): {model: IngestTelemetry}. 진행률을 밖에서 확인하려면 미리 만들어
+            전달합니다. 없는 모델은 새로 생성합니다.
+        numpy_index (bool): 적재 후 컬렉션을 메모리 맵 numpy 인덱스(vector_index)로 내보내고
+            int8/binary 양자화 모드의 recall@k를 측정합니다. 변경분이 없고 같은 설정으로 내보낸
+            인덱스가 있으면 건너뜁니다.
+        reduction_method (str): numpy 인덱스에 저장할 벡터의 차원 축소 방법 ("truncate" 또는 "pca").
+        reduction_dim (int): 축소할 차원 수.
+        num_shards (int): 주어지면 numpy 인덱스를 문서 단위 샤드로도 내보냅니다. (sharded_index 참고)
+            문서가 추가되면 기존 배정을 유지한 채 가벼운 샤드에 넣고, 불균형이 커지면 전체를 재배정합니다.
+        metadatas (dict): {record_id: 메타데이터} (예: skeleton.record_metadata). 레코드와 함께 저장되어
+            query_document의 검색 범위(where) 필터에 사용됩니다.
+        **kwargs: 모델별 run_ingestion()에 전달할 파이프라인 설정.
+
+    Returns:
+        dict: {model: run_incremental() 결과 + "dedup" 리포트}. 렌더링과 중복 제거는 모델 간에
+        공유되므로 같은 render/dedup 시간이 각 모델의 telemetry에 기록됩니다.
+    """
+    render_started = time.perf_counter()
+    rendered = list(records)
+    render_seconds = time.perf_counter() - render_started
+
+    dedup_seconds = 0.0
+    duplicate_map, dedup_report = {}, None
+    if dedup_threshold is not None:
+        dedup_started = time.perf_counter()
+        total = len(rendered)
+        rendered, duplicate_map, dedup_report = filter_records(rendered, dedup_threshold)
+        dedup_seconds = time.perf_counter() - dedup_started
+        print(
+            f"중복 제거: 전체 {total}건 중 삭제/빈 조 {dedup_report['dropped_empty_or_deleted']}건 제외, "
+            f"근사 중복 {dedup_report['near_duplicates']}건을 대표 {dedup_report['clusters_with_duplicates']}건에 병합 "
+            f"→ {dedup_report['kept']}건 적재 (색인 {dedup_report['reduction']:.1%} 감소)"
+        )
+
+    async def _run_model(model, collection, db_path):
+        telemetry = (telemetries or {}).get(model) or IngestTelemetry(model)
+        telemetry.add_stage("render", render_seconds, len(rendered))
+        if dedup_report is not None:
+            telemetry.add_stage("dedup", dedup_seconds, dedup_report["total"])
+            save_duplicate_map(db_path, duplicate_map)
+        embedder = (embedders or {}).get(model)
+        # 청크 크기는 모델 컨텍스트와 임베딩 백엔드의 최대 입력 길이 중 작은 쪽에 맞춥니다. (ONNX는 512)
+        max_length = embedder.max_length if embedder is not None else None
+        with telemetry.stage("chunk", len(rendered)):
+            hashed_records = await asyncio.to_thread(
+                lambda: list(with_content_hash(chunk_records(rendered, model, max_length), metadatas))
+            )
+        summary = await run_incremental(
+            hashed_records, collection, db_path, model=model, telemetry=telemetry,
+            embedder=embedder, **kwargs
+        )
+        reduction = (reduction_method, reduction_dim) if reduction_method else (None, None)
+        stale = (not has_numpy_index(db_path) or index_reduction(db_path) != reduction
+                 or (num_shards and shard_count(db_path) != num_shards))
+        if numpy_index and (summary["upserted"] or summary["deleted"] or stale):
+            with telemetry.stage("export"):
+                exported = await asyncio.to_thread(export_collection, collection, db_path, *reduction)
+            telemetry.stages["export"]["items"] += exported
+            if num_shards:
+                with telemetry.stage("shard", exported):
+                    shard_map = await asyncio.to_thread(
+                        export_collection_shards, collection, db_path, num_shards, *reduction
+                    )
+                summary["shards"] = {"sizes": shard_map["sizes"], "rebalanced": shard_map["rebalanced"]}
+            summary["telemetry"] = telemetry.summary()
+            summary["quantization"] = await asyncio.to_thread(evaluate_quantization, db_path)
+        return summary
+
+    summaries = await asyncio.gather(*[
+        _run_model(model, collection, db_path) for model, collection, db_path in targets
+    ])
+    for summary in summaries:
+        summary["dedup"] = dedup_report
+    return {model: summary for (model, _, _), summary in zip(targets, summaries)}
+
+
+def ingest_fanout(records, targets: list, **kwargs) -> dict:
+    """
+    run_fanout()의 동기 래퍼입니다.
+    """
+    return asyncio.run(run_fanout(records, targets, **kwargs))
+
+
+def ingest_incremental(records, collection, db_path: str, model: str = "mxbai-embed-large", **kwargs) -> dict:
+    """
+    단일 모델에 대한 증분 적재를 실행합니다. (run_incremental() 참고)
+    """
+    return ingest_fanout(records, [(model, collection, db_path)], **kwargs)[model]
@@ -0,0 +1,169 @@
+# app/utils/ingest_telemetry.py
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# 임베딩 요청 지연시간 히스토그램 버킷 상한 (밀리초)
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+PROGRESS_BAR_WIDTH = 30
+PROGRESS_INTERVAL = 0.5  # 진행 표시 최소 갱신 간격(초)
+DEFAULT_REPORT_DIR = os.path.join(".cache", "ingest_reports")
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class IngestTelemetry:
+    """
+    ingestion 한 번(모델 하나)의 단계별 시간, 진행률, 임베딩 요청 지연시간을 수집합니다.
+    파이프라인의 여러 코루틴/스레드에서 호출되므로 내부 상태는 lock으로 보호합니다.
+    """
+
+    def __init__(self, label: str = "", total: int = 0, live: bool = None):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.stages = {}       # stage → {"seconds", "calls", "items"}
+        self.counters = {}     # 재시도 횟수 등
+        self.latencies = []    # 임베딩 요청 지연시간(초)
+        # 터미널이면 한 줄을 덮어쓰는 진행 막대, 아니면 주기적으로 새 줄 출력
+        self.live = sys.stdout.isatty() if live is None else live
+        self._started = time.perf_counter()
+        self._last_progress = 0.0
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float, items: int = 0):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0, "items": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+            entry["items"] += items
+
+    @contextmanager
+    def stage(self, stage: str, items: int = 0):
+        """
+        with 블록의 실행 시간을 stage에 누적합니다.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - started, items)
+
+    def incr(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def observe_latency(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def start(self, total: int):
+        """
+        진행률 측정을 시작합니다. (ETA 계산 기준 시각 초기화)
+        """
+        self.total = total
+        self.done = 0
+        self._started = time.perf_counter()
+
+    def advance(self, count: int):
+        """
+        커밋된 레코드 수를 더하고, 갱신 간격이 지났으면 진행 막대를 출력합니다.
+        """
+        with self._lock:
+            self.done += count
+            now = time.perf_counter()
+            finished = self.done >= self.total
+            if not finished and now - self._last_progress < PROGRESS_INTERVAL:
+                return
+            self._last_progress = now
+            line = self.progress_line()
+        if self.live:
+            print("\r" + line, end="\n" if finished else "", flush=True)
+        else:
+            print(line, flush=True)
+
+    def progress_line(self) -> str:
+        elapsed = time.perf_counter() - self._started
+        ratio = self.done / self.total if self.total else 1.0
+        filled = int(PROGRESS_BAR_WIDTH * ratio)
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else 0.0
+        bar = "#" * filled + "." * (PROGRESS_BAR_WIDTH - filled)
+        return (
+            f"[{self.label}] [{bar}] {self.done}/{self.total} {ratio:.0%} "
+            f"{rate:.1f}건/초 경과 {_format_duration(elapsed)} ETA {_format_duration(eta)}"
+        )
+
+    def latency_histogram(self) -> dict:
+        """
+        임베딩 요청 지연시간 분포 {"<=10ms": n, ..., ">10000ms": n}를 반환합니다.
+        """
+        histogram = {f"<={bound}ms": 0 for bound in LATENCY_BUCKETS_MS}
+        histogram[f">{LATENCY_BUCKETS_MS[-1]}ms"] = 0
+        for seconds in self.latencies:
+            ms = seconds * 1000
+            for bound in LATENCY_BUCKETS_MS:
+                if ms <= bound:
+                    histogram[f"<={bound}ms"] += 1
+                    break
+            else:
+                histogram[f">{LATENCY_BUCKETS_MS[-1]}ms"] += 1
+        return histogram
+
+    def summary(self) -> dict:
+        """
+        비교 가능한 형태의 요약(단계별 시간, 처리량, 지연시간 분포)을 반환합니다.
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stages = {
+                stage: dict(entry, items_per_second=entry["items"] / entry["seconds"] if entry["seconds"] > 0 else 0.0)
+                for stage, entry in self.stages.items()
+            }
+            counters = dict(self.counters)
+        elapsed = time.perf_counter() - self._started
+        return {
+            "label": self.label,
+            "records": self.done,
+            "elapsed": elapsed,
+            "throughput": self.done / elapsed if elapsed > 0 else 0.0,
+            "stages": stages,
+            "counters": counters,
+            "embed_latency": {
+                "requests": len(latencies),
+                "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+                "p50_ms": _percentile(latencies, 0.50) * 1000,
+                "p95_ms": _percentile(latencies, 0.95) * 1000,
+                "p99_ms": _percentile(latencies, 0.99) * 1000,
+                "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+                "histogram": self.latency_histogram(),
+            },
+        }
+
+
+def write_report(report: dict, path: str = None) -> str:
+    """
+    ingestion 요약 리포트를 JSON으로 저장하고 경로를 반환합니다.
+    path가 없으면 .cache/ingest_reports/ingest_<시각>.json 에 저장합니다.
+    """
+    if path is None:
+        path = os.path.join(DEFAULT_REPORT_DIR, f"ingest_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
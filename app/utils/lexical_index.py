@@ -0,0 +1,172 @@
+# app/utils/lexical_index.py
+
+import json
+import math
+import os
+import re
+import threading
+
+import numpy as np
+
+from app.utils.skeleton import JSON_FILE_PATH, iter_article_skeletons, load_documents, record_metadata
+from app.utils.vector_index import match_where
+
+# 조(article) 스켈레톤에 대한 메모리 BM25 색인 (임베딩 없이 동작하는 어휘 검색)
+# 한국어는 띄어쓰기와 조사 때문에 어절 단위로 맞지 않으므로 어절을 문자 bigram으로 나눠 색인합니다.
+# ("사업관리" → "사업", "업관", "관리") 숫자와 영문은 통째로 하나의 토큰입니다.
+# 용도:
+#   - lexical: 임베딩 서버 없이 검색 (올라마가 응답하지 않을 때의 대체 경로)
+#   - hybrid:  dense 결과와 reciprocal rank fusion(RRF)으로 합친 순위
+# RETRIEVAL_MODE=dense (기본) | hybrid | lexical 로 query_document의 기본 검색 방식을 고릅니다.
+RETRIEVAL_MODE_ENV_VAR = "RETRIEVAL_MODE"
+RETRIEVAL_MODES = ("dense", "hybrid", "lexical")
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # RRF 점수 = Σ 1 / (RRF_K + 순위)
+
+_TOKEN = re.compile(r"[가-힣]+|[A-Za-z]+|\d+")
+
+
+def tokenize(text: str) -> list:
+    """
+    텍스트를 BM25 토큰(한글 어절의 문자 bigram, 한 글자 어절은 그대로, 영문/숫자는 통째로)으로 나눕니다.
+    """
+    tokens = []
+    for word in _TOKEN.findall(text):
+        if len(word) < 2 or not ("가" <= word[0] <= "힣"):
+            tokens.append(word.lower())
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class LexicalIndex:
+    """
+    토큰 → (레코드 행 번호 배열, 출현 횟수 배열) 역색인으로 BM25 점수를 계산합니다.
+    질의 토큰의 posting만 훑으므로 코퍼스 전체 조 수와 관계없이 밀리초 미만으로 동작합니다.
+    """
+
+    def __init__(self, ids: list, texts: list, metadatas: list = None):
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.metadatas = list(metadatas) if metadatas else [{} for _ in self.ids]
+        postings = {}
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for row, text in enumerate(self.texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(row)
+                postings[token][1].append(count)
+        num_records = max(len(self.ids), 1)
+        self.average_length = max(float(lengths.mean()) if len(self.ids) else 1.0, 1e-6)
+        self.length_norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / self.average_length)
+        self.postings = {
+            token: (
+                np.asarray(rows, dtype=np.int32),
+                np.asarray(counts, dtype=np.float32),
+                # BM25 idf (음수가 되지 않도록 +1)
+                math.log(1 + (num_records - len(rows) + 0.5) / (len(rows) + 0.5)),
+            )
+            for token, (rows, counts) in postings.items()
+        }
+        self._where_rows = {}
+        self._rows = {record_id: row for row, record_id in enumerate(self.ids)}
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def text(self, record_id: str) -> str:
+        return self.texts[self._rows[record_id]]
+
+    def rows_matching(self, where: dict) -> np.ndarray:
+        key = json.dumps(where, ensure_ascii=False, sort_keys=True)
+        rows = self._where_rows.get(key)
+        if rows is None:
+            rows = np.array([i for i, metadata in enumerate(self.metadatas) if match_where(metadata, where)],
+                            dtype=np.int64)
+            self._where_rows[key] = rows
+        return rows
+
+    def search(self, query: str, k: int = 10, where: dict = None) -> list:
+        """
+        BM25 점수 상위 k개의 [(record_id, 점수)]를 돌려줍니다. 질의 토큰이 하나도 없는 레코드는 제외합니다.
+        """
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            rows, counts, idf = posting
+            scores[rows] += idf * counts * (BM25_K1 + 1) / (counts + self.length_norm[rows])
+        if where:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            mask[self.rows_matching(where)] = True
+            scores[~mask] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.ids[row], float(scores[row])) for row in candidates]
+
+    def score_texts(self, query: str, texts: list) -> list:
+        """
+        색인에 없는 임의의 텍스트(예: 검색된 청크)를 코퍼스 idf와 평균 길이로 BM25 점수를 매깁니다.
+        (리랭킹 cascade의 첫 단계에서 후보를 거를 때 사용)
+        """
+        idfs = {token: self.postings[token][2] for token in set(tokenize(query)) if token in self.postings}
+        scores = []
+        for text in texts:
+            tokens = tokenize(text)
+            length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / self.average_length)
+            counts = {}
+            for token in tokens:
+                if token in idfs:
+                    counts[token] = counts.get(token, 0) + 1
+            scores.append(sum(idfs[token] * count * (BM25_K1 + 1) / (count + length_norm)
+                              for token, count in counts.items()))
+        return scores
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = RRF_K) -> list:
+    """
+    여러 순위 목록([id, ...])을 RRF로 합쳐 [(id, 점수)]를 점수 내림차순으로 돌려줍니다.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+
+def get_retrieval_mode() -> str:
+    mode = os.environ.get(RETRIEVAL_MODE_ENV_VAR, "dense").lower()
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"{RETRIEVAL_MODE_ENV_VAR}는 {', '.join(RETRIEVAL_MODES)} 중 하나여야 합니다: {mode}")
+    return mode
+
+
+_lock = threading.Lock()
+_index = None  # (JSON 파일 mtime, LexicalIndex)
+
+
+def get_lexical_index(json_file_path: str = JSON_FILE_PATH) -> LexicalIndex:
+    """
+    코퍼스 JSON의 조 스켈레톤으로 만든 LexicalIndex를 재사용합니다. 파일이 바뀌면(mtime) 다시 만듭니다.
+    """
+    global _index
+    mtime = os.path.getmtime(json_file_path) if os.path.exists(json_file_path) else 0.0
+    with _lock:
+        if _index is None or _index[0] != mtime:
+            documents = load_documents(json_file_path)
+            records = {}
+            for record_id, text in iter_article_skeletons(documents):
+                records.setdefault(record_id, text)
+            metadata = record_metadata(documents)
+            _index = (mtime, LexicalIndex(list(records), list(records.values()),
+                                          [metadata.get(record_id, {}) for record_id in records]))
+        return _index[1]
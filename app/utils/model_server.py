@@ -0,0 +1,426 @@
+# app/utils/model_server.py
+
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import Client, Listener
+
+from app.utils import reranker as reranker_module
+from app.utils import translators
+
+# 로컬 모델 서버: 리랭커/번역 모델을 별도 워커 프로세스에 한 번만 올려 두고,
+# 모든 Streamlit 서버 프로세스와 세션의 요청을 로컬 IPC(multiprocessing.connection)로 받아 처리합니다.
+#   python modelServer.py --workers 4            (서버 실행)
+#   MODEL_SERVER=127.0.0.1:6399 streamlit run streamlit_app.py
+# MODEL_SERVER는 "호스트:포트" 또는 유닉스 소켓 경로입니다. 설정하지 않으면 모델을 각 프로세스에 로드합니다.
+# 서버는 같은 모델(리랭커 단계 / 번역 방법+언어)에 대한 요청을 batch_window 동안 모아(micro-batching)
+# 한 번에 워커로 보냅니다. 빈 워커가 없는 동안 들어온 요청은 계속 쌓이므로, 부하가 클수록 배치가 커집니다.
+# 워커마다 torch 스레드를 (코어 수 / 워커 수)로 나눠 동시 요청이 GIL이나 torch 스레드에서 경합하지 않게 합니다.
+# 서버에 연결할 수 없으면 경고를 출력하고 이 프로세스의 모델로 처리합니다. (RECONNECT_SECONDS 후 다시 연결 시도)
+# 서버의 워커가 비정상 종료되면 서버는 풀을 새로 띄우고, 그동안 실패한 요청은 클라이언트가 이 프로세스의 모델로 처리합니다.
+MODEL_SERVER_ENV_VAR = "MODEL_SERVER"
+AUTHKEY_ENV_VAR = "MODEL_SERVER_AUTHKEY"
+DEFAULT_ADDRESS = "127.0.0.1:6399"
+DEFAULT_AUTHKEY = "boilpr-model-server"
+DEFAULT_BATCH_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH = 64  # 배치당 항목 수 상한 ((질의, 문서) 쌍 또는 번역 문장)
+RECONNECT_SECONDS = 30.0
+REQUEST_TIMEOUT = 120.0
+
+
+class ModelServerError(RuntimeError):
+    """
+    모델 서버 워커에서 요청 처리에 실패했습니다. (연결 문제가 아니므로 로컬 모델로 대체하지 않음)
+    """
+
+
+def parse_address(address: str):
+    """
+    "호스트:포트" → (호스트, 포트), 그 밖의 문자열은 유닉스 소켓 경로로 그대로 돌려줍니다.
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def _authkey() -> bytes:
+    return os.environ.get(AUTHKEY_ENV_VAR, DEFAULT_AUTHKEY).encode("utf-8")
+
+
+# ---- 워커 프로세스 ----
+
+def _exit_with_parent(parent_pid: int):
+    # 서버가 강제 종료(SIGKILL)되어도 워커가 모델을 쥔 채 남지 않게 합니다.
+    while os.getppid() == parent_pid:
+        time.sleep(1.0)
+    os._exit(0)
+
+
+def _init_worker(num_threads: int, preload: list):
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+    # 워커 안에서는 모델을 직접 로드합니다. (워커가 다시 서버에 요청하지 않도록)
+    os.environ.pop(MODEL_SERVER_ENV_VAR, None)
+    os.environ[reranker_module.THREADS_ENV_VAR] = str(num_threads)
+    try:
+        import torch
+
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+    for kind, key in preload:
+        _load(kind, key)
+
+
+def _load(kind: str, key):
+    if kind == "rerank":
+        return reranker_module.load_reranker(key)
+    if kind == "translate":
+        return translators.get_translation_model(key[0])
+    raise ValueError(f"알 수 없는 요청 종류입니다: {kind}")
+
+
+def _run_batch(kind: str, key, items: list) -> list:
+    if kind == "rerank":
+        return _load(kind, key).score(items)
+    if kind == "translate":
+        method_name, source_lang, target_lang = key
+        return translators.translate(method_name, items, source_lang, target_lang)
+    raise ValueError(f"알 수 없는 요청 종류입니다: {kind}")
+
+
+def _ping() -> int:
+    time.sleep(0.2)
+    return os.getpid()
+
+
+# ---- 서버 ----
+
+class ModelServer:
+    """
+    요청을 (종류, 모델 키)별로 모아 워커 프로세스 풀에 배치로 보내는 서버.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, num_workers: int = None,
+                 batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS, max_batch: int = DEFAULT_MAX_BATCH,
+                 preload: list = ()):
+        self.address = address
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.num_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.preload = list(preload)
+        self.executor = self._new_executor()
+        self._executor_lock = threading.Lock()
+        self._slots = threading.Semaphore(self.num_workers)
+        self._cond = threading.Condition()
+        self._pending = {}  # (종류, 모델 키) → [(reply, request_id, items, 도착 시각)]
+        self._closed = False
+        self.stats = {"requests": 0, "batches": 0, "items": 0, "errors": 0}
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Streamlit과 같은 스레드가 있는 프로세스에서 fork하지 않도록 spawn으로 워커를 띄웁니다.
+        context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=self.num_workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(self.num_threads, self.preload))
+
+    def warm_up(self):
+        """
+        워커를 모두 띄우고 preload 모델을 로드할 때까지 기다립니다.
+        """
+        futures = [self.executor.submit(_ping) for _ in range(self.num_workers)]
+        return sorted({future.result() for future in futures})
+
+    def submit(self, reply, request_id, kind: str, key, items: list):
+        with self._cond:
+            self._pending.setdefault((kind, key), []).append((reply, request_id, items, time.monotonic()))
+            self.stats["requests"] += 1
+            self._cond.notify()
+
+    def _next_batch(self):
+        """
+        가장 오래 기다린 모델 그룹이 batch_window를 넘겼거나 max_batch만큼 찼으면 그 요청들을 꺼냅니다.
+        """
+        with self._cond:
+            while not self._closed:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                group, requests = min(self._pending.items(), key=lambda item: item[1][0][3])
+                size = sum(len(request[2]) for request in requests)
+                wait = requests[0][3] + self.batch_window - time.monotonic()
+                if size < self.max_batch and wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                taken, total = [], 0
+                # 요청은 나누지 않습니다. (max_batch보다 큰 요청은 혼자 한 배치)
+                while requests and (not taken or total + len(requests[0][2]) <= self.max_batch):
+                    total += len(requests[0][2])
+                    taken.append(requests.pop(0))
+                if not requests:
+                    del self._pending[group]
+                return group, taken
+        return None
+
+    def _batch_loop(self):
+        while True:
+            # 빈 워커가 생길 때까지 기다린 뒤 배치를 꺼내, 그동안 들어온 요청이 같은 배치에 합쳐지게 합니다.
+            self._slots.acquire()
+            batch = self._next_batch()
+            if batch is None:
+                return
+            (kind, key), requests = batch
+            items = [item for request in requests for item in request[2]]
+            with self._cond:
+                self.stats["batches"] += 1
+                self.stats["items"] += len(items)
+            executor = self.executor
+            try:
+                future = executor.submit(_run_batch, kind, key, items)
+            except BrokenProcessPool as e:
+                future = Future()
+                future.set_exception(e)
+            future.add_done_callback(lambda f, requests=requests, executor=executor: self._reply(f, requests, executor))
+
+    def _replace_executor(self, broken: ProcessPoolExecutor):
+        # 워커가 비정상 종료(OOM 등)되어 풀이 깨졌습니다. 같은 풀의 배치들이 함께 실패하므로 한 번만 새로 띄웁니다.
+        with self._executor_lock:
+            if self.executor is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._new_executor()
+
+    def _reply(self, future, requests: list, executor: ProcessPoolExecutor):
+        self._slots.release()
+        ok, results = True, None
+        try:
+            results = future.result()
+        except BrokenProcessPool as e:
+            # None: 요청이 아니라 워커 풀이 잘못된 것이므로 클라이언트가 연결 오류처럼 로컬 모델로 대체합니다.
+            ok, error = None, f"{type(e).__name__}: {e}"
+            self._replace_executor(executor)
+        except Exception as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+        if not ok:
+            with self._cond:
+                self.stats["errors"] += 1
+        offset = 0
+        for reply, request_id, items, _ in requests:
+            if ok:
+                reply(request_id, True, results[offset:offset + len(items)])
+                offset += len(items)
+            else:
+                reply(request_id, ok, error)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            stats = dict(self.stats)
+            stats["pending"] = sum(len(requests) for requests in self._pending.values())
+        stats["mean_batch"] = stats["items"] / stats["batches"] if stats["batches"] else 0.0
+        stats.update(workers=self.num_workers, threads_per_worker=self.num_threads,
+                     batch_window_ms=self.batch_window * 1000, max_batch=self.max_batch)
+        return stats
+
+    def _handle(self, conn):
+        send_lock = threading.Lock()
+
+        def reply(request_id, ok, payload):
+            with send_lock:
+                try:
+                    conn.send((request_id, ok, payload))
+                except (OSError, EOFError):
+                    pass
+
+        try:
+            while True:
+                request_id, kind, key, items = conn.recv()
+                if kind == "stats":
+                    reply(request_id, True, self.snapshot())
+                else:
+                    self.submit(reply, request_id, kind, key, items)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def serve_forever(self, on_ready=None):
+        """
+        연결을 받기 시작합니다. on_ready는 수신 소켓을 연 뒤 한 번 호출됩니다.
+        """
+        address = parse_address(self.address)
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)  # 이전 실행이 남긴 소켓 파일
+        listener = Listener(address, authkey=_authkey())
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        if on_ready:
+            on_ready()
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except multiprocessing.AuthenticationError:
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+            listener.close()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._slots.release()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+# ---- 클라이언트 ----
+
+class ModelClient:
+    """
+    프로세스당 하나의 서버 연결. 여러 스레드(세션)의 요청을 같은 연결로 보내고 요청 ID로 응답을 나눠 받습니다.
+    """
+
+    def __init__(self, address: str):
+        self.conn = Client(parse_address(address), authkey=_authkey())
+        self.closed = False
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._futures = {}
+        self._ids = itertools.count()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def request(self, kind: str, key, items: list, timeout: float = REQUEST_TIMEOUT):
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            if self.closed:
+                raise ConnectionError("모델 서버 연결이 끊겼습니다.")
+            self._futures[request_id] = future
+        try:
+            with self._send_lock:
+                self.conn.send((request_id, kind, key, list(items)))
+        except (OSError, EOFError) as e:
+            self._fail(e)
+        return future.result(timeout)
+
+    def stats(self) -> dict:
+        return self.request("stats", None, [])
+
+    def _read(self):
+        try:
+            while True:
+                request_id, ok, payload = self.conn.recv()
+                with self._lock:
+                    future = self._futures.pop(request_id, None)
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(payload)
+                elif ok is None:
+                    future.set_exception(ConnectionError(f"모델 서버 워커가 비정상 종료되었습니다: {payload}"))
+                else:
+                    future.set_exception(ModelServerError(payload))
+        except (EOFError, OSError) as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        with self._lock:
+            self.closed = True
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"모델 서버 연결이 끊겼습니다: {error}"))
+
+    def close(self):
+        self.conn.close()
+
+
+_client_lock = threading.Lock()
+_client = None
+_retry_at = 0.0
+
+
+def get_model_client():
+    """
+    MODEL_SERVER가 설정되어 있으면 이 프로세스의 서버 연결을 돌려줍니다.
+    설정되지 않았거나 연결할 수 없으면 None. (연결 실패 후 RECONNECT_SECONDS 동안은 다시 시도하지 않음)
+    """
+    global _client, _retry_at
+    address = os.environ.get(MODEL_SERVER_ENV_VAR)
+    if not address:
+        return None
+    with _client_lock:
+        if _client is not None and not _client.closed:
+            return _client
+        if time.monotonic() < _retry_at:
+            return None
+        try:
+            _client = ModelClient(address)
+        except (OSError, EOFError, multiprocessing.AuthenticationError) as e:
+            print(f"[WARN] 모델 서버({address})에 연결할 수 없어 이 프로세스의 모델을 사용합니다: {e}")
+            _client = None
+            _retry_at = time.monotonic() + RECONNECT_SECONDS
+        return _client
+
+
+def _remote_call(kind: str, key, items: list, fallback):
+    client = get_model_client()
+    if client is not None:
+        try:
+            return client.request(kind, key, items)
+        except (ConnectionError, OSError, EOFError) as e:
+            print(f"[WARN] 모델 서버 요청 실패, 이 프로세스의 모델을 사용합니다: {e}")
+    return fallback(items)
+
+
+class RemoteReranker:
+    """
+    리랭커 단계(stage, None이면 RERANKER_MODEL)의 점수를 모델 서버 워커에서 계산합니다.
+    """
+
+    def __init__(self, stage: str = None):
+        self.stage = stage
+        self.name = "remote:" + (reranker_module.stage_version(stage) if stage else reranker_module.reranker_version())
+
+    def score(self, pairs: list) -> list:
+        if not pairs:
+            return []
+        return _remote_call("rerank", self.stage, pairs,
+                            lambda items: reranker_module.load_reranker(self.stage).score(items))
+
+    def rank(self, prompts: list, documents_per_prompt: list) -> list:
+        pairs = [(prompt, doc) for prompt, documents in zip(prompts, documents_per_prompt) for doc in documents]
+        return reranker_module.order_by_scores(documents_per_prompt, self.score(pairs))
+
+
+class RemoteTranslator:
+    """
+    번역 방법(method_name)의 번역을 모델 서버 워커에서 실행합니다.
+    """
+
+    def __init__(self, method_name: str):
+        self.method_name = method_name
+
+    def translate(self, texts: list, source_lang: str = "ko", target_lang: str = "en") -> list:
+        return _remote_call(
+            "translate", (self.method_name, source_lang, target_lang), texts,
+            lambda items: translators.translate(self.method_name, items, source_lang, target_lang),
+        )
+
+
+def remote_reranker(stage: str = None):
+    """
+    MODEL_SERVER가 설정되어 있으면 RemoteReranker, 아니면 None.
+    """
+    return RemoteReranker(stage) if os.environ.get(MODEL_SERVER_ENV_VAR) else None
+
+
+def remote_translator(method_name: str):
+    """
+    MODEL_SERVER가 설정되어 있으면 RemoteTranslator, 아니면 None.
+    """
+    return RemoteTranslator(method_name) if os.environ.get(MODEL_SERVER_ENV_VAR) else None
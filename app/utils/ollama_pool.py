@@ -0,0 +1,223 @@
+# app/utils/ollama_pool.py
+
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+import ollama
+
+# 쉼표로 구분한 올라마 주소 목록 (예: "127.0.0.1:11434,127.0.0.1:11435")
+# 같은 서버에서 인스턴스마다 포트와 코어를 나눠 띄울 수 있습니다.
+#   OLLAMA_HOST=127.0.0.1:11435 taskset -c 8-15 ollama serve
+HOSTS_ENV_VAR = "OLLAMA_HOSTS"
+DEFAULT_MAX_FAILURES = 3   # 연속 실패가 이 횟수에 이르면 엔드포인트를 잠시 제외
+DEFAULT_COOLDOWN = 30.0    # 제외된 엔드포인트를 다시 시도하기까지의 시간(초)
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    다른 엔드포인트로 넘어가면 성공할 수 있는 오류인지 판단합니다. (연결 실패, 시간 초과, 5xx)
+    4xx 응답(없는 모델, 잘못된 요청)이나 TypeError/ValueError처럼 요청 자체가 잘못된 경우는 False입니다.
+    """
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500
+    return isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError))
+
+
+class Endpoint:
+    """
+    올라마 인스턴스 하나의 클라이언트와 상태(진행 중 요청 수, 연속 실패, 누적 통계).
+    """
+
+    def __init__(self, host: str = None):
+        self.host = host
+        self.client = ollama.Client(host=host)
+        self._async_client = None
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+
+    @property
+    def async_client(self):
+        # AsyncClient(httpx 연결 풀)는 생성된 이벤트 루프에 묶이므로, asyncio.run()이 반복되는
+        # 경우(앱에서 재구축을 여러 번 실행 등)를 위해 루프마다 새로 생성합니다.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client[0] is not loop:
+            self._async_client = (loop, ollama.AsyncClient(host=self.host))
+        return self._async_client[1]
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def stats(self) -> dict:
+        return {
+            "host": self.host or "default",
+            "healthy": self.is_healthy(time.time()),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.consecutive_failures,
+            "mean_latency_ms": self.total_latency / self.requests * 1000 if self.requests else 0.0,
+        }
+
+
+class OllamaPool:
+    """
+    여러 올라마 엔드포인트에 요청을 나눠 보내는 풀.
+
+    - 라우팅: 건강한 엔드포인트 중 진행 중인 요청이 가장 적은 곳(least outstanding requests)
+    - 헬스 체크: 연속 max_failures회 실패하면 cooldown초 동안 제외한 뒤 다시 시도
+    - 장애 조치: 일시적 오류(is_transient)로 실패하면 아직 시도하지 않은 다른 엔드포인트로 즉시 재요청
+      (그 밖의 오류는 엔드포인트 상태를 바꾸지 않고 바로 호출자에게 전달)
+    동기 호출(call)과 비동기 호출(acall)을 모두 지원합니다.
+    """
+
+    def __init__(self, hosts=None, max_failures: int = DEFAULT_MAX_FAILURES,
+                 cooldown: float = DEFAULT_COOLDOWN):
+        hosts = list(hosts) if hosts else [None]
+        self.endpoints = [Endpoint(host) for host in hosts]
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def _acquire(self, tried: set):
+        """
+        아직 시도하지 않은 엔드포인트 중 하나를 골라 진행 중 요청 수를 올립니다.
+        건강한 엔드포인트가 없으면 가장 먼저 복귀할 엔드포인트를 고릅니다.
+        """
+        now = time.time()
+        with self._lock:
+            candidates = [e for e in self.endpoints if id(e) not in tried]
+            if not candidates:
+                return None
+            healthy = [e for e in candidates if e.is_healthy(now)]
+            if healthy:
+                endpoint = min(healthy, key=lambda e: (e.outstanding, e.requests))
+            else:
+                endpoint = min(candidates, key=lambda e: e.unhealthy_until)
+            endpoint.outstanding += 1
+            return endpoint
+
+    def _release(self, endpoint: Endpoint, latency: float, error: Exception = None):
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.requests += 1
+            if error is None:
+                endpoint.total_latency += latency
+                endpoint.consecutive_failures = 0
+                endpoint.unhealthy_until = 0.0
+                return
+            endpoint.errors += 1
+            if not is_transient(error):
+                return
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.max_failures:
+                now = time.time()
+                was_healthy = endpoint.is_healthy(now)
+                endpoint.unhealthy_until = now + self.cooldown
+                if not was_healthy:
+                    return
+                print(
+                    f"[WARN] 올라마 엔드포인트 {endpoint.host or 'default'} 연속 "
+                    f"{endpoint.consecutive_failures}회 실패, {self.cooldown:.0f}초 동안 제외합니다: {error}"
+                )
+
+    def call(self, method: str, **kwargs):
+        """
+        ollama.Client의 method를 풀의 엔드포인트에 호출합니다. 일시적 오류로 실패하면 다른 엔드포인트로 넘어갑니다.
+        """
+        tried = set()
+        last_error = None
+        while True:
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                raise last_error
+            tried.add(id(endpoint))
+            started = time.perf_counter()
+            try:
+                result = getattr(endpoint.client, method)(**kwargs)
+            except Exception as e:
+                self._release(endpoint, time.perf_counter() - started, e)
+                if not is_transient(e):
+                    raise
+                last_error = e
+                continue
+            self._release(endpoint, time.perf_counter() - started)
+            return result
+
+    async def acall(self, method: str, **kwargs):
+        """
+        call()의 비동기 버전입니다. (ollama.AsyncClient 사용)
+        """
+        tried = set()
+        last_error = None
+        while True:
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                raise last_error
+            tried.add(id(endpoint))
+            started = time.perf_counter()
+            try:
+                result = await getattr(endpoint.async_client, method)(**kwargs)
+            except Exception as e:
+                self._release(endpoint, time.perf_counter() - started, e)
+                if not is_transient(e):
+                    raise
+                last_error = e
+                continue
+            self._release(endpoint, time.perf_counter() - started)
+            return result
+
+    def embed(self, **kwargs):
+        return self.call("embed", **kwargs)
+
+    def generate(self, **kwargs):
+        return self.call("generate", **kwargs)
+
+    def async_client(self):
+        """
+        ollama.AsyncClient처럼 embed()/generate()를 await할 수 있는 객체를 반환합니다.
+        (ingest_pipeline 등 AsyncClient를 받는 코드에 그대로 전달할 수 있습니다.)
+        """
+        return _AsyncPoolClient(self)
+
+    def stats(self) -> list:
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+
+class _AsyncPoolClient:
+    def __init__(self, pool: OllamaPool):
+        self._pool = pool
+
+    async def embed(self, **kwargs):
+        return await self._pool.acall("embed", **kwargs)
+
+    async def generate(self, **kwargs):
+        return await self._pool.acall("generate", **kwargs)
+
+
+def parse_hosts(value: str) -> list:
+    """
+    "host1,host2" 형식의 문자열을 주소 리스트로 변환합니다.
+    """
+    return [host.strip() for host in (value or "").split(",") if host.strip()]
+
+
+_default_pool = None
+
+
+def get_default_pool() -> OllamaPool:
+    """
+    OLLAMA_HOSTS 환경 변수로 구성한 프로세스 공용 풀을 반환합니다.
+    환경 변수가 없으면 기본 올라마 주소(OLLAMA_HOST) 하나로 구성됩니다.
+    """
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = OllamaPool(parse_hosts(os.environ.get(HOSTS_ENV_VAR)))
+    return _default_pool
@@ -1,240 +1,345 @@
-import json
-import os
-import ollama
-import chromadb
-import  re
-from chromadb.config import DEFAULT_TENANT, DEFAULT_DATABASE, Settings
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.article_refs import get_article_index
+from app.utils.chunker import parent_record_id
+from app.utils.embedding_cache import get_default_cache
+from app.utils.lexical_index import get_lexical_index, get_retrieval_mode, reciprocal_rank_fusion
+from app.utils.embedders import get_embedder
+from app.utils.ollama_pool import get_default_pool
+from app.utils.rerank_cache import get_default_rerank_cache
+from app.utils.reranker import (
+    LEXICAL_STAGE,
+    cascade_stages,
+    get_reranker,
+    get_stage_reranker,
+    order_by_scores,
+    reranker_version,
+    stage_version,
+)
+from app.utils import index_versions
+from app.utils import vector_index
+from app.utils import sharded_index
 
 
 
-# 모델과 토크나이저 로드
-model_name = "monologg/koelectra-base-v3-discriminator"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
+# 검색 범위(의미검색 데모의 search_scope) → 벡터 검색에 그대로 넘기는 메타데이터 where 필터
+# (메타데이터는 ingestion 시 skeleton.record_metadata로 붙습니다. None이면 전체 검색)
+SCOPE_FILTERS = {
+    "전체 문서": None,
+    "내 문서": {"source": "upload"},
+    "기술기획 관령 법령": {"source": "corpus"},
+    "기타": {"source": {"$nin": ["corpus", "upload"]}},
+}
 
 
-JSON_FILE_PATH = os.path.join("app", "data", "tech_regulations.json")
-# DB 및 데이터 파일 경로 설정
+def scope_filter(scope: str = None, where: dict = None):
+    """
+    검색 범위 이름과 추가 where 필터를 하나의 where 필터로 합칩니다. 둘 다 없으면 None.
+    """
+    if scope is not None and scope not in SCOPE_FILTERS:
+        raise ValueError(f"알 수 없는 검색 범위입니다: {scope}")
+    clauses = [clause for clause in (SCOPE_FILTERS.get(scope), where) if clause]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
 
 
-JSON_FILE_PATH = "app/data/tech_regulations.json"
+HYBRID_CANDIDATE_MULTIPLIER = 2  # hybrid 검색에서 dense/BM25 각각 n_results × 배수만큼 후보를 가져와 합침
 
-def build_skeleton_text(target_doc: dict, chap: str, sec: str, art: str) -> str:
+
+def generate_embeddings(texts: list, model: str = "mxbai-embed-large") -> list:
     """
-    대상 문서(target_doc)와 장(chap), 절(sec), 조(art) 정보를 바탕으로
-    스켈레톤 텍스트를 생성합니다.
+    여러 텍스트의 임베딩을 한 번에 생성합니다. 캐시에 없는 텍스트만 모아 백엔드에 한 번 요청합니다.
     """
-    lines = []
-    # 문서 레벨 정보
-    doc_title = target_doc.get("document_title", "")
-    promulgation = target_doc.get("promulgation_number", "")
-    lines.append(doc_title)
-    lines.append(promulgation)
-    
-    article_found = None
-    found_chapter = None
-    found_section = None
-
-    if art is not None:
-        # case 1: 장과 절 정보 모두 제공된 경우
-        if chap is not None and sec is not None:
-            for chapter in target_doc.get("chapters", []):
-                if chapter.get("chapter_number", "") == chap:
-                    found_chapter = chapter
-                    for section in chapter.get("sections", []):
-                        if section.get("section_number", "default") == sec:
-                            found_section = section
-                            for article in section.get("articles", []):
-                                if article.get("article_number", "") == art:
-                                    article_found = article
-                                    break
-                            break
-                    break
-        # case 2: 장 정보만 제공된 경우
-        elif chap is not None and sec is None:
-            for chapter in target_doc.get("chapters", []):
-                if chapter.get("chapter_number", "") == chap:
-                    found_chapter = chapter
-                    for section in chapter.get("sections", []):
-                        for article in section.get("articles", []):
-                            if article.get("article_number", "") == art:
-                                found_section = section
-                                article_found = article
-                                break
-                        if article_found:
-                            break
-                    break
-        # case 3: 장, 절 정보 모두 생략된 경우 (유일하다고 가정)
-        elif chap is None and sec is None:
-            for chapter in target_doc.get("chapters", []):
-                for section in chapter.get("sections", []):
-                    for article in section.get("articles", []):
-                        if article.get("article_number", "") == art:
-                            found_chapter = chapter
-                            found_section = section
-                            article_found = article
-                            break
-                    if article_found:
-                        break
-                if article_found:
-                    break
-
-    # art가 제공되지 않은 경우 -> 문서 또는 장 정보만 존재하는 경우
-    if art is None:
-        if chap is not None:
-            chapter_found = None
-            for chapter in target_doc.get("chapters", []):
-                if chapter.get("chapter_number", "") == chap:
-                    chapter_found = chapter
-                    break
-            if chapter_found is None:
-                return "\n".join(lines) + f"\n장(chapter) 번호 '{chap}'을(를) 찾지 못했습니다."
-            chap_num = chapter_found.get("chapter_number", "")
-            if not chap_num.startswith("제"):
-                chap_num = "제" + chap_num
-            chap_title = chapter_found.get("chapter_title", "")
-            lines.append(f"{chap_num} {chap_title}")
-            return "\n".join(lines)
-        else:
-            return "\n".join(lines)
-    
-    if article_found is None:
-        return "\n".join(lines) + f"\n조(article) 번호 '{art}'을(를) 찾지 못했습니다."
-    
-    # found_chapter, found_section 출력
-    if found_chapter is not None:
-        chap_num = found_chapter.get("chapter_number", "")
-        if not chap_num.startswith("제"):
-            chap_num = "제" + chap_num
-        chap_title = found_chapter.get("chapter_title", "")
-        lines.append(f"{chap_num} {chap_title}")
-    if found_section is not None:
-        sec_num = found_section.get("section_number", "")
-        sec_title = found_section.get("section_title", "")
-        if not sec_num.startswith("제"):
-            sec_num = "제" + sec_num
-        lines.append(f"  ├─ {sec_num} {sec_title}".rstrip())
-    
-    # 조(article) 레벨 출력
-    art_num = article_found.get("article_number", "")
-    art_title = article_found.get("article_title", "")
-    art_text = article_found.get("article_text", "").strip()
-    if not art_num.startswith("제"):
-        art_num = "제" + art_num
-    article_line = f"      ├─ {art_num}({art_title}): {art_text}".rstrip()
-    lines.append(article_line)
-    
-    # 문단 및 항목 출력
-    paragraphs = article_found.get("paragraphs", [])
-    for i, para in enumerate(paragraphs):
-        p_symbol = para.get("paragraph_symbol", "")
-        p_text = para.get("paragraph_text", "").strip()
-        branch = "├─" if i < len(paragraphs) - 1 else "└─"
-        lines.append(f"          {branch} {p_symbol} {p_text}".rstrip())
-        for item in para.get("items", []):
-            item_text = item.get("item_text", "").strip()
-            lines.append(f"              ├─ {item_text}".rstrip())
-    
-    return "\n".join(lines)
+    embedder = get_embedder(model)
+    cache = get_default_cache()
+    embeddings = cache.get_many(embedder.cache_key, texts)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        # 같은 텍스트가 여러 번 들어와도 백엔드에는 한 번만 요청합니다.
+        missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+        fetched = dict(zip(missing_texts, embedder.embed(missing_texts)))
+        cache.put_many(embedder.cache_key, missing_texts, [fetched[text] for text in missing_texts])
+        for i in missing:
+            embeddings[i] = fetched[texts[i]]
+    return embeddings
 
 
-def get_skeleton_text_from_target_doc(subrecord_id: str, target_doc: dict) -> str:
+def generate_embedding(text: str, model: str = "mxbai-embed-large") -> list:
     """
-    단일 문서(target_doc)에 대해, subrecord_id ("chap_..._sec_..._art_...") 형식의
-    장/절/조 정보를 이용하여 스켈레톤 텍스트를 생성합니다.
+    배포 환경에서 선택한 임베딩 백엔드(EMBEDDING_BACKEND: ollama/onnx)로
+    주어진 텍스트의 임베딩을 생성합니다.
+    (백엔드+모델, 텍스트 해시) 단위 영구 캐시에 있으면 백엔드를 호출하지 않습니다.
     """
-    # subrecord_id에서 chap, sec, art 정보 추출 (예: "chap_2_sec_8_art_80조")
-    pattern = r"(?:chap_(?P<chap>[^_]+))?(?:_sec_(?P<sec>[^_]+))?(?:_art_(?P<art>.+))?"
-    m = re.match(pattern, subrecord_id)
-    if not m:
-        return f"올바르지 않은 ID 형식: {subrecord_id}"
-    groups = m.groupdict()
-    chap = groups.get("chap")
-    sec = groups.get("sec")
-    art = groups.get("art")
-    
-    return build_skeleton_text(target_doc, chap, sec, art)
+    return generate_embeddings([text], model=model)[0]
+
+def __get_collection(db_path: str = None, embedding_model: str = "mxbai-embed-large"):
+    """
+    Persistent ChromaDB 클라이언트를 생성하고 "docs" 컬렉션을 반환합니다.
+    db_path가 없으면 embedding_model의 활성 인덱스 버전을 사용합니다.
+    VECTOR_BACKEND=numpy이고 내보낸 numpy 인덱스가 있으면, 같은 query() 인터페이스의
+    메모리 맵 정확 검색 인덱스를 반환합니다. VECTOR_BACKEND=sharded이면 샤드별 워커 프로세스에
+    scatter-gather로 검색하는 인덱스를 반환합니다.
+    """
+    DB_PATH = db_path or index_versions.active_path(embedding_model)
+    backend = vector_index.get_backend()
+    if backend == "numpy" and vector_index.has_numpy_index(DB_PATH):
+        return vector_index.load_numpy_index(DB_PATH)
+    if backend == "sharded" and sharded_index.has_sharded_index(DB_PATH):
+        return sharded_index.load_sharded_index(DB_PATH, vector_index.get_quantization())
+    # Persistent ChromaDB 클라이언트 연결 및 "docs" 컬렉션 로드 (없으면 기본 HNSW 프로파일로 생성)
+    return index_versions.open_collection(DB_PATH)
 
 
-def get_skeleton_text(record_id: str, json_file_path: str = JSON_FILE_PATH) -> str:
+def _cached_scores(version: str, get_scorer, prompts: list, documents_per_prompt: list, ids_per_prompt: list,
+                   index_name: str, index_version: str) -> list:
     """
-    JSON 파일에서 문서를 로드하여, record_id ("doc_{doc_id}_chap_..._sec_..._art_...") 형식에 따라
-    해당 문서의 스켈레톤 텍스트를 생성합니다.
+    모든 (질의, 문서) 쌍의 점수를 이어 붙인 순서로 반환합니다. 캐시에 없는 쌍만 get_scorer()의 리랭커로 계산합니다.
     """
-    # JSON 파일 로드
-    try:
-        with open(json_file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        return f"JSON 파일을 로드하는 데 실패했습니다: {e}"
-        
-    documents = data.get("documents", [])
-    
-    # record_id에서 doc_id 및 장/절/조 정보 추출
-    pattern = r"doc_(?P<doc_id>[^_]+)(?:_chap_(?P<chap>[^_]+))?(?:_sec_(?P<sec>[^_]+))?(?:_art_(?P<art>.+))?"
-    m = re.match(pattern, record_id)
-    if not m:
-        return f"올바르지 않은 ID 형식: {record_id}"
-    groups = m.groupdict()
-    doc_id = groups.get("doc_id")
-    chap = groups.get("chap")
-    sec = groups.get("sec")
-    art = groups.get("art")
-    
-    # 대상 문서 찾기
-    target_doc = None
-    for doc in documents:
-        if str(doc.get("document_id", "")) == doc_id:
-            target_doc = doc
-            break
-    if target_doc is None:
-        return f"문서(document) ID '{doc_id}'를 찾지 못했습니다."
-    
-    return build_skeleton_text(target_doc, chap, sec, art)
+    cache = get_default_rerank_cache()
+    flat_hashes = [
+        pair_hash
+        for prompt, ids, documents in zip(prompts, ids_per_prompt, documents_per_prompt)
+        for pair_hash in cache.pair_hashes(prompt, list(zip(ids, documents)))
+    ]
+    scores = cache.get_many(version, index_name, index_version, flat_hashes)
+    pairs = [(prompt, doc) for prompt, documents in zip(prompts, documents_per_prompt) for doc in documents]
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if missing:
+        # 같은 (질의, 문서) 쌍이 여러 번 들어와도 한 번만 계산합니다.
+        first = {}
+        for i in missing:
+            first.setdefault(flat_hashes[i], i)
+        computed = dict(zip(first, get_scorer().score([pairs[i] for i in first.values()])))
+        cache.put_many(version, index_name, index_version, list(computed), list(computed.values()))
+        for i in missing:
+            scores[i] = computed[flat_hashes[i]]
+    return scores
 
 
+def rerank_documents(prompts: list, documents_per_prompt: list, ids_per_prompt: list = None,
+                     index_name: str = "", index_version: str = "", cascade: str = None) -> list:
+    """
+    모든 (질의, 문서) 쌍의 관련성 점수를 리랭커로 한 번에 계산하고, 질의별로 문서를 점수 내림차순으로 정렬합니다.
+    cascade 단계(RERANKER_CASCADE, 예: "lexical:8")가 있으면 앞 단계가 후보를 단계별 개수로 줄이고,
+    마지막 리랭커(RERANKER_MODEL)는 남은 후보만 점수 매깁니다. 걸러진 후보는 걸러진 단계의 순서대로 뒤에 붙습니다.
+    모델 점수는 (리랭커 버전, 인덱스 버전, 정규화한 질의, 레코드 ID, 내용 해시) 단위로 캐시하며
+    (rerank_cache 참고), 캐시에 없는 쌍만 계산합니다. 모두 적중하면 리랭커를 로드하지 않습니다.
 
-def generate_embedding(text: str, model: str = "mxbai-embed-large") -> list:
+    Args:
+        ids_per_prompt (list): 문서별 레코드 ID. 없으면 내용 해시만으로 캐시합니다.
+        index_name, index_version (str): 검색한 인덱스 (활성 버전이 바뀌면 이전 점수는 무효).
+        cascade (str): RERANKER_CASCADE 대신 사용할 단계 설정. ""이면 단일 단계.
     """
-    올라마 임베딩 API를 사용하여 주어진 텍스트의 임베딩을 생성합니다.
+    ids_per_prompt = ids_per_prompt or [[""] * len(documents) for documents in documents_per_prompt]
+    candidates = [list(range(len(documents))) for documents in documents_per_prompt]
+    pruned = [[] for _ in prompts]
+    for stage, keep in cascade_stages(cascade) + [(None, None)]:
+        if keep is not None and all(len(rows) <= keep for rows in candidates):
+            continue
+        stage_documents = [[documents[i] for i in rows] for documents, rows in zip(documents_per_prompt, candidates)]
+        if stage == LEXICAL_STAGE:
+            # BM25는 캐시 조회보다 계산이 빠르므로 캐시하지 않습니다.
+            pairs = [(prompt, doc) for prompt, documents in zip(prompts, stage_documents) for doc in documents]
+            scores = get_stage_reranker(stage).score(pairs)
+        else:
+            scores = _cached_scores(
+                stage_version(stage) if stage else reranker_version(),
+                (lambda: get_stage_reranker(stage)) if stage else get_reranker,
+                prompts, stage_documents,
+                [[ids[i] for i in rows] for ids, rows in zip(ids_per_prompt, candidates)],
+                index_name, index_version,
+            )
+        candidates = order_by_scores(candidates, scores)
+        if keep is not None:
+            pruned = [rows[keep:] + rest for rows, rest in zip(candidates, pruned)]
+            candidates = [rows[:keep] for rows in candidates]
+    return [
+        [documents[i] for i in rows + rest]
+        for documents, rows, rest in zip(documents_per_prompt, candidates, pruned)
+    ]
+
+
+def _in_scope(record_ids: list, article_index, filters: dict) -> list:
+    return [
+        record_id for record_id in record_ids
+        if not filters or vector_index.match_where(article_index.metadatas.get(record_id), filters)
+    ]
+
+
+def _pick_reference(prompt: str, candidates: list, dense_ids: list, lexical, article_index) -> str:
+    """
+    제목 없이 여러 규정에 있는 조번호 참조의 후보 중, dense 검색 순위와 BM25 점수 순위를 RRF로 합쳐
+    가장 높은 조를 고릅니다. (dense 결과에 없는 후보는 BM25 순위만 반영, 동점이면 코퍼스 순서)
     """
-    response = ollama.embeddings(model=model, prompt=text)
-    return response["embedding"]
+    dense_rank = [record_id for record_id in dense_ids if record_id in candidates]
+    scores = lexical.score_texts(prompt, [article_index.text(record_id) for record_id in candidates])
+    lexical_rank = [record_id for _, record_id in sorted(zip(scores, candidates), key=lambda x: -x[0])]
+    return reciprocal_rank_fusion([dense_rank, lexical_rank])[0][0]
 
-def __get_collection():
+
+def query_documents(prompts: list, n_results: int = 1, response: bool = False, rerank: bool = False,
+                    embedding_model: str = "mxbai-embed-large",
+                    generation_model: str = "exaone3.5:32b",
+                    scope: str = None, where: dict = None, resolve_references: bool = True,
+                    retrieval: str = None) -> list:
     """
-    Persistent ChromaDB 클라이언트를 생성하고 "docs" 컬렉션을 반환합니다.
+    여러 질의를 한 번에 처리하는 배치 버전의 query_document입니다.
+    질의 임베딩은 한 번의 요청으로 만들고, 벡터 검색도 질의 벡터 전체로 한 번만 실행하며,
+    rerank가 True이면 모든 (질의, 문서) 쌍을 한 번에 리랭킹합니다. 답변 생성은 질의마다 올라마 풀의
+    엔드포인트 수만큼 동시에 요청합니다. 평가 실행이나 대량 질의응답에서 고정 비용을 질의 수만큼 나눠 냅니다.
+
+    Args:
+        prompts (list): 사용자 입력 쿼리 리스트.
+        resolve_references (bool): 조문 직접 참조를 조 인덱스로 해석할지 여부 (article_refs 참고).
+        retrieval (str): "dense" | "hybrid" | "lexical". 없으면 RETRIEVAL_MODE 환경 변수 (lexical_index 참고).
+            임베딩 생성에 실패하면 어느 방식이든 lexical로 대체합니다.
+        그 밖의 인자는 query_document와 같습니다.
+
+    Returns:
+        list: 질의 순서대로 query_document와 같은 형태의 dict 리스트.
     """
-    DB_PATH = "chroma_db_" + st.session_state["embedding_model"]
-    # Persistent ChromaDB 클라이언트 연결 및 "docs" 컬렉션 로드 (없으면 생성)
-    client = chromadb.PersistentClient(
-        path=DB_PATH,
-        settings=Settings(),
-        tenant=DEFAULT_TENANT,
-        database=DEFAULT_DATABASE,
-    )
-    try:
-        collection = client.get_collection(name="docs")
-    except Exception:
-        collection = client.create_collection(name="docs")
-    return collection
+    if not prompts:
+        return []
+    filters = scope_filter(scope, where)
+
+    # 조문 직접 참조("제80조", "방위사업관리규정 제22조의2" 등)는 조 인덱스에서 바로 찾습니다.
+    # 질의가 참조만으로 이루어져 있으면 임베딩/벡터 검색을 건너뛰고, 아니면 dense 결과 앞에 고정합니다.
+    # 제목 없이 여러 규정에 있는 조번호는 검색을 실행해 dense/BM25 순위가 가장 높은 후보 하나를 고정합니다.
+    pinned_ids = [[] for _ in prompts]
+    ambiguous = [[] for _ in prompts]  # 질의별 [후보 조 레코드 ID 리스트]
+    dense_prompts = list(range(len(prompts)))
+    if resolve_references:
+        article_index = get_article_index()
+        dense_prompts = []
+        for i, prompt in enumerate(prompts):
+            reference = article_index.resolve(prompt)
+            if reference:
+                pinned_ids[i] = _in_scope(reference["record_ids"], article_index, filters)
+                for candidates in reference["candidates"]:
+                    candidates = _in_scope(candidates, article_index, filters)
+                    if len(candidates) == 1:
+                        pinned_ids[i].extend(candidates)
+                    elif candidates:
+                        ambiguous[i].append(candidates)
+                pinned_ids[i] = pinned_ids[i][:n_results]
+            if not (reference and reference["reference_only"] and pinned_ids[i] and not ambiguous[i]):
+                dense_prompts.append(i)
+
+    mode = retrieval or get_retrieval_mode()
+    search_depth = n_results * HYBRID_CANDIDATE_MULTIPLIER if mode == "hybrid" else n_results
+    dense_hits = {}
+    if dense_prompts and mode != "lexical":
+        try:
+            # 쿼리 임베딩 생성 (캐시 적중 시 올라마 호출 생략, 캐시에 없는 질의만 한 번에 요청)
+            query_embeddings = generate_embeddings([prompts[i] for i in dense_prompts], model=embedding_model)
+        except Exception as e:
+            # 임베딩 서버를 쓸 수 없으면 어휘(BM25) 검색만으로 답합니다.
+            print(f"[WARN] 질의 임베딩 생성 실패, 어휘 검색으로 대체합니다: {e}")
+            mode = "lexical"
+        else:
+            # DB에서 유사한 레코드 검색 (검색하는 동안 활성 버전을 점유해 재구축 후 삭제되지 않도록 함)
+            with index_versions.lease(embedding_model) as db_path:
+                collection = __get_collection(db_path, embedding_model)
+                results = collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=search_depth,
+                    **({"where": filters} if filters else {})
+                )
+            for i, ids, documents in zip(dense_prompts, results["ids"], results["documents"] or []):
+                dense_hits[i] = list(zip(ids, documents))
+
+    lexical = get_lexical_index() if mode != "dense" else None
+    dense_per_prompt = [[] for _ in prompts]
+    dense_ids_per_prompt = [[] for _ in prompts]
+    for i in dense_prompts:
+        if ambiguous[i]:
+            dense_ids = list(dict.fromkeys(parent_record_id(record_id) for record_id, _ in dense_hits.get(i, [])))
+            for candidates in ambiguous[i]:
+                chosen = _pick_reference(prompts[i], candidates, dense_ids, lexical or get_lexical_index(),
+                                         article_index)
+                if chosen not in pinned_ids[i]:
+                    pinned_ids[i].append(chosen)
+            pinned_ids[i] = pinned_ids[i][:n_results]
+        # 고정한 조와 같은 조(또는 그 청크)는 검색 결과에서 뺍니다.
+        pinned = set(pinned_ids[i])
+        hits = [
+            (record_id, doc) for record_id, doc in dense_hits.get(i, []) if parent_record_id(record_id) not in pinned
+        ]
+        if lexical is None:
+            dense_ids_per_prompt[i] = [record_id for record_id, _ in hits]
+            dense_per_prompt[i] = [doc for _, doc in hits]
+            continue
+        lexical_ids = [record_id for record_id, _ in lexical.search(prompts[i], search_depth + len(pinned), filters)
+                       if record_id not in pinned]
+        if mode == "lexical":
+            dense_ids_per_prompt[i] = lexical_ids
+            dense_per_prompt[i] = [lexical.text(record_id) for record_id in lexical_ids]
+            continue
+        # hybrid: 조 단위로 dense 순위와 BM25 순위를 RRF로 합칩니다. (청크는 가장 높은 청크를 대표로 사용)
+        texts = {}
+        dense_ids = []
+        for record_id, doc in hits:
+            parent = parent_record_id(record_id)
+            if parent not in texts:
+                texts[parent] = doc
+                dense_ids.append(parent)
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids])
+        dense_ids_per_prompt[i] = [record_id for record_id, _ in fused]
+        dense_per_prompt[i] = [texts.get(record_id) or lexical.text(record_id) for record_id, _ in fused]
+
+    pinned_per_prompt = [[article_index.text(record_id) for record_id in ids] for ids in pinned_ids] \
+        if resolve_references else [[] for _ in prompts]
+
+    def _merge(pinned, dense):
+        return (pinned + dense)[:n_results]
+
+    if rerank:
+        # 고정한 조는 1순위를 유지하고 dense 결과만 리랭킹합니다. (답변 생성 여부와 관계없이)
+        # (자주 묻는 질문/후속 질문의 점수는 캐시에서 가져오고 새 쌍만 계산)
+        dense_per_prompt = rerank_documents(prompts, dense_per_prompt, dense_ids_per_prompt,
+                                            index_name=embedding_model,
+                                            index_version=index_versions.active_version(embedding_model))
+    retrieved = [" ".join(_merge(pinned, dense)) for pinned, dense in zip(pinned_per_prompt, dense_per_prompt)]
+    if response is False:
+        return [{"retrieved_document": retrieved_docs, "generated_response": ""} for retrieved_docs in retrieved]
+
+    # 검색된 콘텐츠를 기반으로 RAG 프롬프트 구성 후 답변 생성
+    pool = get_default_pool()
+
+    def _generate(prompt, retrieved_docs):
+        rag_prompt = f"Using this data: {retrieved_docs}. Respond in Korean to this prompt: {prompt}"
+        return pool.generate(model=generation_model, prompt=rag_prompt)["response"]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(prompts), len(pool.endpoints)))) as executor:
+        responses = list(executor.map(_generate, prompts, retrieved))
+    return [
+        {"retrieved_document": retrieved_docs, "generated_response": generated_response}
+        for retrieved_docs, generated_response in zip(retrieved, responses)
+    ]
 
 
 def query_document(prompt: str, n_results: int = 1,response:bool=False,rerank:bool=  False,
                    embedding_model: str = "mxbai-embed-large",
-                   generation_model: str = "exaone3.5:32b") -> dict:
+                   generation_model: str = "exaone3.5:32b",
+                   scope: str = None, where: dict = None, resolve_references: bool = True,
+                   retrieval: str = None) -> dict:
     """
     사용자 쿼리에 대해, 임베딩-콘텐츠 pair 중 유사도 검색을 통해 관련 레코드를 찾고,
     해당 레코드를 context로 하여 RAG 프롬프트를 구성한 후 답변을 생성합니다.
+    (질의가 여러 개면 query_documents를 사용하세요.)
     
     Args:
         prompt (str): 사용자 입력 쿼리.
         n_results (int): 검색할 레코드 개수 (기본값 1).
         embedding_model (str): 올라마 임베딩 모델.
         generation_model (str): 올라마 생성 모델.
+        scope (str): 검색 범위 (SCOPE_FILTERS의 키, 예: "기술기획 관령 법령"). None이면 전체 문서.
+        where (dict): 추가 메타데이터 필터 (Chroma where 문법, 예: {"document_type": "법률"}).
+            범위/필터는 벡터 검색에 함께 넘겨 해당 레코드만 검색합니다.
+        resolve_references (bool): "제80조", "방위사업관리규정 제22조의2" 같은 조문 직접 참조를 임베딩 없이
+            조 인덱스로 찾아 1순위에 고정합니다. 질의가 참조뿐이면 벡터 검색을 하지 않습니다.
+        retrieval (str): "dense"(벡터 검색) | "hybrid"(벡터 + BM25, RRF) | "lexical"(BM25만).
+            없으면 RETRIEVAL_MODE 환경 변수를 따르며, 임베딩 서버를 쓸 수 없으면 lexical로 대체합니다.
         
     Returns:
         dict: {
@@ -242,62 +347,18 @@ def query_document(prompt: str, n_results: int = 1,response:bool=False,rerank:bo
                   "generated_response": 생성된 답변
               }
     """
-    collection = __get_collection()
-
-
-    # 쿼리 임베딩 생성
-    embed_response = ollama.embeddings(model=embedding_model, prompt=prompt)
-    query_embedding = embed_response["embedding"]
-
-    # DB에서 유사한 레코드 검색
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=n_results
-    )
-    
-    if results["documents"] and results["documents"][0]:
-        documents = results["documents"][0]  # 상위 n_result 개 문서
-
-
-    if response is False:
-        generated_response = ""
-        retrieved_docs = " ".join([doc for doc in documents])
-        return {
-        "retrieved_document": retrieved_docs,
-        "generated_response": generated_response
-    }
-    if rerank is False:
-        retrieved_docs = " ".join([doc for doc in documents])
-    else:
-        inputs = tokenizer(
-        [f"{prompt} [SEP] {doc}" for doc in documents],
-        return_tensors="pt",
-        padding=True,
-        truncation=True)
-        # 모델을 사용하여 관련성 점수 계산
-        with torch.no_grad():
-            outputs = model(**inputs)
-            scores = outputs.logits.squeeze()
-
-        scores = scores.tolist()
-        # 점수와 문서를 함께 정렬
-        ranked_docs = sorted(zip(scores, documents), key=lambda x: x[0], reverse=True)
-        retrieved_docs = " ".join([doc for score, doc in ranked_docs])
-        # 검색된 콘텐츠를 기반으로 RAG 프롬프트 구성 후 답변 생성
-    rag_prompt = f"Using this data: {retrieved_docs}. Respond in Korean to this prompt: {prompt}"
-    gen_response = ollama.generate(model=generation_model, prompt=rag_prompt)
-    generated_response = gen_response["response"]
-    return {
-        "retrieved_document": retrieved_docs,
-        "generated_response": generated_response
-    }
+    return query_documents(
+        [prompt], n_results=n_results, response=response, rerank=rerank,
+        embedding_model=embedding_model, generation_model=generation_model, scope=scope, where=where,
+        resolve_references=resolve_references, retrieval=retrieval,
+    )[0]
 
 def llm_response(prompt:str,context:str,model:str="exaone3.5:32b"):
     """
     주어진 prompt와 context를 사용하여 LLM을 사용하여 답변을 생성합니다.
     """
     # LLM을 사용하여 답변 생성
-    response = ollama.generate(model=model, prompt=f"{context} {prompt}")
+    response = get_default_pool().generate(model=model, prompt=f"{context} {prompt}")
     return response["response"]
 
 
@@ -306,6 +367,6 @@ if __name__ == "__main__":
     
     # 예제 쿼리 실행
     user_prompt = "정보화업무 절차 알려줘."
-    result = query_document(user_prompt, n_results=10, respond=True)
+    result = query_document(user_prompt, n_results=10, response=True)
     print("Retrieved document:", result["retrieved_document"])
     print("Generated response:", result["generated_response"])
@@ -0,0 +1,186 @@
+# app/utils/rerank_cache.py
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from app.utils.embedding_cache import text_sha256
+
+# 리랭커(cross-encoder) 점수 캐시
+# 키: (리랭커 버전, 인덱스 이름, 인덱스 버전, 정규화한 질의 해시, 조 레코드 ID, 조 내용 해시)
+#   - 리랭커 버전: reranker.reranker_version() (모델/양자화/max_length가 바뀌면 다른 키)
+#   - 인덱스 버전: index_versions.active_version() (재구축으로 활성 버전이 바뀌면 그보다 오래된 버전의 점수를 삭제)
+#   - 내용 해시: 같은 레코드 ID라도 본문이 바뀌면 다시 점수를 매깁니다.
+# SQLite 파일 하나를 모든 세션/프로세스가 공유하며, max_entries를 넘으면 오래 사용되지 않은 점수부터 지웁니다.
+DEFAULT_CACHE_PATH = os.path.join(".cache", "rerank_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 200000  # 항목당 약 200바이트
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    캐시 키용 질의 정규화: 유니코드 NFKC, 소문자, 연속 공백 하나로, 앞뒤 공백과 끝 문장부호 제거.
+    ("제80조  내용은?" == "제80조 내용은")
+    """
+    query = _SPACES.sub(" ", unicodedata.normalize("NFKC", query)).strip().lower()
+    return query.rstrip("?.!~ ")
+
+
+def _pair_key(query_hash: str, record_id: str, content_hash: str) -> str:
+    return hashlib.sha256(f"{query_hash}\0{record_id}\0{content_hash}".encode("utf-8")).hexdigest()
+
+
+class RerankCache:
+    """
+    (질의, 조) 리랭크 점수를 저장하는 SQLite 기반 영구 캐시. (embedding_cache.EmbeddingCache와 같은 구조)
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index_versions = {}  # 인덱스 이름 → 이 프로세스가 마지막으로 본 버전
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rerank_scores (
+                reranker TEXT NOT NULL,
+                index_name TEXT NOT NULL,
+                index_version TEXT NOT NULL,
+                pair_hash TEXT NOT NULL,
+                score REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (reranker, index_name, index_version, pair_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rerank_scores_last_access ON rerank_scores (last_access)"
+        )
+        self._conn.commit()
+
+    def _check_index_version(self, index_name: str, index_version: str):
+        # 새 버전을 처음 본 프로세스가 현재 활성 버전보다 오래된 버전의 점수만 지웁니다.
+        # 교체 직전에 이전 버전을 점유한 쿼리(또는 아직 이전 버전을 쓰는 프로세스)가 새 버전 점수를 지우지 않도록
+        # 비교 기준은 호출자의 버전이 아니라 index_versions의 활성 버전입니다.
+        # 버전 이름(vYYYYMMDD_HHMMSS[_n])은 문자열 순서가 생성 순서이고, "legacy"는 어느 버전보다도 앞섭니다.
+        if self._index_versions.get(index_name) == index_version:
+            return
+        from app.utils import index_versions
+
+        active = index_versions.read_pointer(index_name).get("version") if index_name else None
+        if active:
+            self._conn.execute(
+                "DELETE FROM rerank_scores WHERE index_name = ? AND index_version < ?", (index_name, active)
+            )
+            self._conn.commit()
+        self._index_versions[index_name] = index_version
+
+    @staticmethod
+    def pair_hashes(query: str, items: list) -> list:
+        """
+        질의와 [(레코드 ID, 문서 텍스트)]로 캐시 키 해시 리스트를 만듭니다.
+        """
+        query_hash = text_sha256(normalize_query(query))
+        return [_pair_key(query_hash, record_id, text_sha256(text)) for record_id, text in items]
+
+    def get_many(self, reranker: str, index_name: str, index_version: str, pair_hashes: list) -> list:
+        """
+        키 해시 리스트에 대한 캐시된 점수 리스트를 반환합니다. 없는 항목은 None입니다.
+        """
+        found = {}
+        with self._lock:
+            self._check_index_version(index_name, index_version)
+            for start in range(0, len(pair_hashes), 500):
+                chunk = pair_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT pair_hash, score FROM rerank_scores WHERE reranker = ? AND index_name = ? "
+                    f"AND index_version = ? AND pair_hash IN ({placeholders})",
+                    [reranker, index_name, index_version, *chunk],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE rerank_scores SET last_access = ? WHERE reranker = ? AND index_name = ? "
+                    "AND index_version = ? AND pair_hash = ?",
+                    [(now, reranker, index_name, index_version, pair_hash) for pair_hash in found],
+                )
+                self._conn.commit()
+            scores = [found.get(pair_hash) for pair_hash in pair_hashes]
+            hits = sum(score is not None for score in scores)
+            self.hits += hits
+            self.misses += len(scores) - hits
+        return scores
+
+    def put_many(self, reranker: str, index_name: str, index_version: str, pair_hashes: list, scores: list):
+        """
+        키 해시-점수 쌍을 저장하고, 크기 제한을 넘으면 오래된 항목을 삭제합니다.
+        """
+        now = time.time()
+        rows = [
+            (reranker, index_name, index_version, pair_hash, float(score), now)
+            for pair_hash, score in zip(pair_hashes, scores)
+        ]
+        with self._lock:
+            self._check_index_version(index_name, index_version)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rerank_scores "
+                "(reranker, index_name, index_version, pair_hash, score, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM rerank_scores").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM rerank_scores WHERE rowid IN "
+                "(SELECT rowid FROM rerank_scores ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self) -> dict:
+        """
+        현재 프로세스의 적중/미스 횟수와 캐시 크기를 반환합니다.
+        """
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM rerank_scores").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+
+
+def get_default_rerank_cache() -> RerankCache:
+    """
+    프로세스 전체(모든 세션)에서 공유하는 기본 리랭크 점수 캐시를 반환합니다.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RerankCache()
+    return _default_cache
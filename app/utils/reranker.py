@@ -0,0 +1,315 @@
+# app/utils/reranker.py
+
+import os
+import threading
+from functools import lru_cache
+
+# 검색 결과 (질의, 문서) 쌍의 관련성 점수를 매기는 cross-encoder 리랭커
+# 모델은 처음 리랭킹할 때 로드합니다. (import 시점에 로드하지 않으므로 앱/스크립트 시작이 빠름)
+#   RERANKER_MODEL=monologg/koelectra-base-v3-discriminator  (HF 모델 이름 또는 로컬 디렉터리)
+#   RERANKER_BACKEND=torch (기본) | onnx
+#   RERANKER_QUANTIZE=1 (기본)     int8 동적 양자화 (torch: Linear 층, onnx: model_int8.onnx)
+#   RERANKER_MAX_LENGTH=512        (질의+문서) 토큰 상한. 질의는 자르지 않고 문서 쪽만 자릅니다.
+#   RERANKER_THREADS=4             추론 스레드 수 (tests/bench_reranker.py로 조정)
+#   MODEL_SERVER=                  설정하면 모델을 이 프로세스가 아닌 모델 서버 워커에서 실행 (model_server 참고)
+#   RERANKER_CASCADE=              앞 단계 리랭커와 남길 후보 수 ("단계:개수"를 쉼표로 구분, 기본 없음)
+#       예) "lexical:8"                                   BM25로 8개만 남긴 뒤 RERANKER_MODEL로 점수
+#           "lexical:10,cross-encoder/ms-marco-MiniLM-L-6-v2:5"  BM25 → 작은 cross-encoder → RERANKER_MODEL
+#       단계 이름은 "lexical" 또는 모델 이름/디렉터리입니다. (백엔드/양자화/max_length는 위 설정을 따름)
+# 입력은 토큰 길이순으로 정렬해 비슷한 길이끼리 배치를 만들고(length bucketing),
+# 배치 크기 × 패딩 길이가 max_batch_tokens를 넘지 않게 나눕니다.
+MODEL_ENV_VAR = "RERANKER_MODEL"
+BACKEND_ENV_VAR = "RERANKER_BACKEND"
+QUANTIZE_ENV_VAR = "RERANKER_QUANTIZE"
+MAX_LENGTH_ENV_VAR = "RERANKER_MAX_LENGTH"
+THREADS_ENV_VAR = "RERANKER_THREADS"
+CASCADE_ENV_VAR = "RERANKER_CASCADE"
+LEXICAL_STAGE = "lexical"
+DEFAULT_MODEL = "monologg/koelectra-base-v3-discriminator"
+DEFAULT_ONNX_DIR = os.path.join("models", "onnx", "reranker")
+DEFAULT_MAX_LENGTH = 512
+DEFAULT_THREADS = 4
+MAX_BATCH_SIZE = 32
+MAX_BATCH_TOKENS = 8192
+
+
+class Reranker:
+    """
+    리랭커 인터페이스. score()는 (질의, 문서) 쌍 리스트의 관련성 점수(클수록 관련)를 반환합니다.
+    """
+
+    name = ""
+
+    def __init__(self, tokenizer, max_length: int = DEFAULT_MAX_LENGTH,
+                 max_batch_size: int = MAX_BATCH_SIZE, max_batch_tokens: int = MAX_BATCH_TOKENS):
+        self.tokenizer = tokenizer
+        self.max_length = min(max_length, getattr(tokenizer, "model_max_length", max_length) or max_length)
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        # 토크나이저와 추론을 직렬화해 여러 세션이 동시에 리랭킹해도 스레드가 과다하게 경합하지 않게 합니다.
+        self._lock = threading.Lock()
+
+    def encode(self, pairs: list) -> list:
+        """
+        (질의, 문서) 쌍을 패딩 없이 토큰화합니다. 문서 쪽만 max_length에 맞춰 자릅니다.
+        """
+        encoded = self.tokenizer(
+            [query for query, _ in pairs], [doc for _, doc in pairs],
+            truncation="only_second", max_length=self.max_length,
+        )
+        return [{key: encoded[key][i] for key in encoded.keys()} for i in range(len(pairs))]
+
+    def _batches(self, features: list):
+        """
+        (원래 인덱스 리스트, 패딩한 배치) 를 토큰 길이순으로 생성합니다.
+        """
+        order = sorted(range(len(features)), key=lambda i: len(features[i]["input_ids"]))
+        batch = []
+        for i in order:
+            length = len(features[i]["input_ids"])
+            if batch and (len(batch) + 1 > self.max_batch_size or (len(batch) + 1) * length > self.max_batch_tokens):
+                yield batch, self._pad([features[j] for j in batch])
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch, self._pad([features[j] for j in batch])
+
+    def _pad(self, features: list):
+        raise NotImplementedError
+
+    def _run(self, batch) -> list:
+        raise NotImplementedError
+
+    def score(self, pairs: list) -> list:
+        if not pairs:
+            return []
+        scores = [0.0] * len(pairs)
+        with self._lock:
+            features = self.encode(pairs)
+            for indices, batch in self._batches(features):
+                for i, value in zip(indices, self._run(batch)):
+                    scores[i] = value
+        return scores
+
+    def rank(self, prompts: list, documents_per_prompt: list) -> list:
+        """
+        모든 질의의 (질의, 문서) 쌍을 한 번에 점수 매기고, 질의별로 문서를 점수 내림차순으로 정렬합니다.
+        """
+        pairs = [(prompt, doc) for prompt, documents in zip(prompts, documents_per_prompt) for doc in documents]
+        return order_by_scores(documents_per_prompt, self.score(pairs))
+
+
+def order_by_scores(documents_per_prompt: list, scores: list) -> list:
+    """
+    질의별 문서 리스트를 이어 붙인 순서의 점수 리스트로, 질의마다 문서를 점수 내림차순으로 정렬합니다.
+    """
+    ranked = []
+    offset = 0
+    for documents in documents_per_prompt:
+        doc_scores = scores[offset:offset + len(documents)]
+        offset += len(documents)
+        order = sorted(range(len(documents)), key=lambda i: doc_scores[i], reverse=True)
+        ranked.append([documents[i] for i in order])
+    return ranked
+
+
+class TorchReranker(Reranker):
+    """
+    transformers 시퀀스 분류 모델을 PyTorch로 CPU 추론합니다.
+    quantize=True이면 Linear 층을 int8 동적 양자화합니다. (가중치 메모리 약 1/4, CPU 추론 가속)
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, quantize: bool = True, num_threads: int = None, **kwargs):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.torch = torch
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        super().__init__(AutoTokenizer.from_pretrained(model_name), **kwargs)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.name = f"torch:{model_name}" + (":int8" if quantize else "")
+
+    def _pad(self, features: list):
+        return self.tokenizer.pad(features, return_tensors="pt")
+
+    def _run(self, batch) -> list:
+        with self.torch.inference_mode():
+            logits = self.model(**batch).logits
+        # 마지막 라벨 = 관련 있음
+        return logits[:, -1].tolist()
+
+
+class OnnxReranker(Reranker):
+    """
+    ONNX Runtime으로 내보낸 리랭커를 CPU 추론합니다.
+
+    모델 디렉터리에는 optimum으로 내보낸 model.onnx와 토크나이저 파일이 있어야 합니다.
+        optimum-cli export onnx --model monologg/koelectra-base-v3-discriminator \
+            --task text-classification models/onnx/reranker
+    quantize=True이면 int8 동적 양자화 모델(model_int8.onnx)을 처음 한 번 만들어 사용합니다.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, quantize: bool = True, num_threads: int = None,
+                 **kwargs):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("ONNX 리랭커를 사용하려면 onnxruntime을 설치하세요: pip install onnxruntime") from e
+        from transformers import AutoTokenizer
+
+        from app.utils.embedders import OnnxEmbedder
+
+        super().__init__(AutoTokenizer.from_pretrained(model_dir), **kwargs)
+        model_path = os.path.join(model_dir, "model.onnx")
+        if quantize:
+            model_path = OnnxEmbedder._quantized_model_path(model_path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.name = f"onnx:{model_dir}" + (":int8" if quantize else "")
+
+    def _pad(self, features: list):
+        return self.tokenizer.pad(features, return_tensors="np")
+
+    def _run(self, batch) -> list:
+        import numpy as np
+
+        feeds = {name: batch[name].astype(np.int64) for name in self.input_names if name in batch}
+        logits = self.session.run(None, feeds)[0]
+        return logits[:, -1].tolist()
+
+
+class LexicalReranker:
+    """
+    코퍼스 BM25 점수로 (질의, 문서) 쌍을 점수 매기는 모델 없는 리랭커. cascade의 첫 단계용입니다.
+    """
+
+    name = "lexical:bm25"
+
+    def score(self, pairs: list) -> list:
+        from app.utils.lexical_index import get_lexical_index
+
+        lexical = get_lexical_index()
+        by_query = {}
+        for i, (query, _) in enumerate(pairs):
+            by_query.setdefault(query, []).append(i)
+        scores = [0.0] * len(pairs)
+        for query, indices in by_query.items():
+            for i, value in zip(indices, lexical.score_texts(query, [pairs[i][1] for i in indices])):
+                scores[i] = value
+        return scores
+
+    def rank(self, prompts: list, documents_per_prompt: list) -> list:
+        pairs = [(prompt, doc) for prompt, documents in zip(prompts, documents_per_prompt) for doc in documents]
+        return order_by_scores(documents_per_prompt, self.score(pairs))
+
+
+def make_reranker(backend: str = "torch", model: str = None, quantize: bool = True,
+                  max_length: int = DEFAULT_MAX_LENGTH, num_threads: int = DEFAULT_THREADS) -> Reranker:
+    """
+    백엔드 이름("torch" 또는 "onnx")에 맞는 리랭커를 생성합니다.
+    """
+    num_threads = min(num_threads, os.cpu_count() or num_threads) if num_threads else None
+    if backend == "torch":
+        return TorchReranker(model or DEFAULT_MODEL, quantize=quantize, num_threads=num_threads,
+                             max_length=max_length)
+    if backend == "onnx":
+        return OnnxReranker(model or DEFAULT_ONNX_DIR, quantize=quantize, num_threads=num_threads,
+                            max_length=max_length)
+    raise ValueError(f"알 수 없는 리랭커 백엔드입니다: {backend}")
+
+
+def reranker_settings() -> dict:
+    """
+    환경 변수(RERANKER_BACKEND 등)로 정한 리랭커 설정을 make_reranker 인자 형태로 돌려줍니다.
+    """
+    return {
+        "backend": os.environ.get(BACKEND_ENV_VAR, "torch"),
+        "model": os.environ.get(MODEL_ENV_VAR) or None,
+        "quantize": os.environ.get(QUANTIZE_ENV_VAR, "1") in ("1", "true", "yes"),
+        "max_length": int(os.environ.get(MAX_LENGTH_ENV_VAR, DEFAULT_MAX_LENGTH)),
+        "num_threads": int(os.environ.get(THREADS_ENV_VAR, DEFAULT_THREADS)),
+    }
+
+
+def reranker_version(settings: dict = None) -> str:
+    """
+    리랭크 점수 캐시 키로 쓰는 리랭커 버전 문자열. 모델을 로드하지 않고 설정만으로 만듭니다.
+    점수에 영향을 주는 백엔드, 모델, 양자화, max_length를 포함하고, 로컬 모델 디렉터리면
+    파일 수정 시각도 넣어 같은 경로에 다시 학습한 모델을 저장하면 버전이 바뀌게 합니다.
+    """
+    settings = settings or reranker_settings()
+    backend = settings["backend"]
+    model = settings["model"] or (DEFAULT_ONNX_DIR if backend == "onnx" else DEFAULT_MODEL)
+    version = f"{backend}:{model}:{'int8' if settings['quantize'] else 'fp32'}:{settings['max_length']}"
+    if os.path.isdir(model):
+        mtimes = [entry.stat().st_mtime for entry in os.scandir(model) if entry.is_file()]
+        if mtimes:
+            version += f"@{int(max(mtimes))}"
+    return version
+
+
+def cascade_stages(spec: str = None) -> list:
+    """
+    cascade 설정("lexical:8,모델:4")을 [(단계 이름, 남길 후보 수)]로 바꿉니다. 마지막 단계(RERANKER_MODEL)는 포함하지 않습니다.
+    spec이 None이면 RERANKER_CASCADE 환경 변수를 읽습니다.
+    """
+    spec = os.environ.get(CASCADE_ENV_VAR, "") if spec is None else spec
+    stages = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, keep = item.rpartition(":")
+        if not sep or not name or not keep.isdigit() or int(keep) < 1:
+            raise ValueError(f"{CASCADE_ENV_VAR} 항목은 '단계:개수' 형식이어야 합니다: {item}")
+        stages.append((name, int(keep)))
+    return stages
+
+
+def stage_version(stage: str) -> str:
+    """
+    cascade 단계의 점수 캐시용 버전 문자열 (reranker_version과 같은 규칙).
+    """
+    if stage == LEXICAL_STAGE:
+        return LexicalReranker.name
+    return reranker_version(dict(reranker_settings(), model=stage))
+
+
+@lru_cache(maxsize=None)
+def load_reranker(stage: str = None):
+    """
+    리랭커를 이 프로세스에 처음 요청될 때 한 번만 로드합니다. stage가 None이면 RERANKER_MODEL입니다.
+    """
+    if stage == LEXICAL_STAGE:
+        return LexicalReranker()
+    settings = reranker_settings()
+    if stage:
+        settings["model"] = stage
+    return make_reranker(**settings)
+
+
+def get_stage_reranker(stage: str = None):
+    """
+    cascade 단계(stage)의 리랭커를 돌려줍니다. MODEL_SERVER가 설정되어 있으면 모델 서버 워커에서 점수를 매기는
+    RemoteReranker를, 아니면 이 프로세스에 로드한 리랭커를 돌려줍니다. (BM25 단계는 항상 이 프로세스에서 계산)
+    """
+    if stage != LEXICAL_STAGE:
+        from app.utils import model_server
+
+        remote = model_server.remote_reranker(stage)
+        if remote is not None:
+            return remote
+    return load_reranker(stage)
+
+
+def get_reranker():
+    """
+    환경 변수(RERANKER_BACKEND 등)로 선택한 마지막 단계 리랭커. 처음 점수를 매길 때 로드됩니다.
+    """
+    return get_stage_reranker(None)
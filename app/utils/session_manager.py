@@ -3,6 +3,7 @@
 import uuid
 import streamlit as st
 from app.utils.load_regulations import load_tech_regulations
+from app.utils.typeahead import get_typeahead_index
 
 def initialize_session_state():
     """오프라인 환경에서 사용할 세션 스테이트를 모두 초기화."""
@@ -24,3 +25,6 @@ def initialize_session_state():
     if "tech_regulations" not in st.session_state:
         # 기술기획 관령 법령 데이터를 로드합니다.
         st.session_state["tech_regulations"] = load_tech_regulations()
+
+    # 검색창 자동완성 색인은 앱 시작 시 프로세스당 한 번 만들어 모든 세션이 재사용합니다.
+    get_typeahead_index()
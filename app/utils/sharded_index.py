@@ -0,0 +1,264 @@
+# app/utils/sharded_index.py
+
+import heapq
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.utils.skeleton import document_key
+from app.utils.vector_index import NumpyIndex, Reduction, write_numpy_index
+
+# 문서 ID 단위로 나눈 numpy 인덱스 샤드와, 샤드마다 하나씩 띄운 검색 워커 프로세스
+#   <db_path>/shards/shards.json          샤드 수와 문서 → 샤드 배정
+#   <db_path>/shards/shard_<i>/numpy_index/  샤드별 numpy 인덱스 (vector_index 형식)
+# 질의는 모든 샤드 워커에 동시에 보내고(scatter), 샤드별 top-k를 k-way 병합(gather)합니다.
+# VECTOR_BACKEND=sharded이면 query_document가 이 인덱스를 사용합니다.
+SHARDS_DIR_NAME = "shards"
+SHARD_MAP_FILE_NAME = "shards.json"
+MAX_IMBALANCE = 1.25  # 가장 큰 샤드가 평균의 이 배수를 넘으면 전체 재배정
+
+def shards_dir(db_path: str) -> str:
+    return os.path.join(db_path, SHARDS_DIR_NAME)
+
+
+def shard_path(db_path: str, shard: int) -> str:
+    return os.path.join(shards_dir(db_path), f"shard_{shard}")
+
+
+def read_shard_map(db_path: str) -> dict:
+    path = os.path.join(shards_dir(db_path), SHARD_MAP_FILE_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def shard_count(db_path: str):
+    return read_shard_map(db_path).get("num_shards")
+
+
+def assign_shards(doc_sizes: dict, num_shards: int, previous: dict = None,
+                  max_imbalance: float = MAX_IMBALANCE) -> tuple:
+    """
+    문서를 샤드에 배정합니다. 기존 배정은 유지하고 새 문서만 레코드 수가 가장 적은 샤드에 넣되,
+    그 결과 가장 큰 샤드가 평균의 max_imbalance배를 넘거나 샤드 수가 바뀌면 전체를 다시 나눕니다.
+    (큰 문서부터 가장 가벼운 샤드에 넣는 greedy 배정)
+
+    Returns:
+        tuple: ({문서 ID: 샤드 번호}, 전체 재배정 여부)
+    """
+    def _place(docs, assignment, loads):
+        for doc in sorted(docs, key=lambda d: (-doc_sizes[d], d)):
+            shard = min(range(num_shards), key=lambda i: (loads[i], i))
+            assignment[doc] = shard
+            loads[shard] += doc_sizes[doc]
+
+    previous = previous or {}
+    kept = previous.get("assignment", {}) if previous.get("num_shards") == num_shards else {}
+    if kept:
+        assignment, loads = {}, [0] * num_shards
+        for doc, shard in kept.items():
+            if doc in doc_sizes:
+                assignment[doc] = shard
+                loads[shard] += doc_sizes[doc]
+        _place([doc for doc in doc_sizes if doc not in assignment], assignment, loads)
+        if max(loads) <= max_imbalance * sum(loads) / num_shards:
+            return assignment, False
+
+    assignment, loads = {}, [0] * num_shards
+    _place(list(doc_sizes), assignment, loads)
+    return assignment, True
+
+
+def write_shards(db_path: str, ids: list, embeddings, documents: list, metadatas: list,
+                 num_shards: int, reduction_method: str = None, reduction_dim: int = None) -> dict:
+    """
+    레코드를 문서 단위로 num_shards개 샤드에 나눠 샤드별 numpy 인덱스로 저장합니다.
+    차원 축소는 전체 코퍼스로 한 번 맞춰 모든 샤드에 같은 변환을 적용하므로 샤드 간 점수를 비교할 수 있습니다.
+
+    Returns:
+        dict: 저장한 샤드 맵 {"num_shards", "assignment", "sizes", "rebalanced"}
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1) if len(ids) else None
+    reduction = None
+    if reduction_method and len(ids):
+        reduction = Reduction.fit(matrix / np.linalg.norm(matrix, axis=1, keepdims=True),
+                                  reduction_method, reduction_dim)
+
+    doc_rows = {}
+    for row, record_id in enumerate(ids):
+        doc_rows.setdefault(document_key(record_id), []).append(row)
+    assignment, rebalanced = assign_shards(
+        {doc: len(rows) for doc, rows in doc_rows.items()}, num_shards, read_shard_map(db_path)
+    )
+
+    sizes = []
+    for shard in range(num_shards):
+        rows = [row for doc, doc_shard in sorted(assignment.items()) if doc_shard == shard for row in doc_rows[doc]]
+        write_numpy_index(
+            shard_path(db_path, shard),
+            [ids[row] for row in rows],
+            matrix[rows] if rows else [],
+            [documents[row] for row in rows],
+            [metadatas[row] for row in rows] if metadatas else None,
+            reduction=reduction,
+        )
+        sizes.append(len(rows))
+
+    # 샤드 수를 줄였으면 남은 샤드 디렉터리를 정리합니다.
+    stale = num_shards
+    while os.path.isdir(shard_path(db_path, stale)):
+        shutil.rmtree(shard_path(db_path, stale), ignore_errors=True)
+        stale += 1
+
+    shard_map = {"num_shards": num_shards, "assignment": assignment, "sizes": sizes, "rebalanced": rebalanced}
+    path = os.path.join(shards_dir(db_path), SHARD_MAP_FILE_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(shard_map, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+    return shard_map
+
+
+def export_collection_shards(collection, db_path: str, num_shards: int,
+                             reduction_method: str = None, reduction_dim: int = None) -> dict:
+    """
+    Chroma 컬렉션 전체를 샤드별 numpy 인덱스로 내보냅니다.
+    """
+    stored = collection.get(include=["embeddings", "documents", "metadatas"])
+    return write_shards(db_path, stored["ids"], stored["embeddings"], stored["documents"], stored["metadatas"],
+                        num_shards, reduction_method, reduction_dim)
+
+
+# ---- 샤드 워커 프로세스 ----
+
+_shard_index = None
+
+
+def _init_worker(path: str, quantization: str):
+    global _shard_index
+    _shard_index = NumpyIndex(path, quantization)
+
+
+def _search_shard(query_embeddings, n_results: int, where: dict = None) -> list:
+    """
+    워커 프로세스에서 실행: 질의별 [(점수, id, 문서, 메타데이터), ...] (점수 내림차순)
+    where가 주어지면 샤드 안에서 조건을 만족하는 행만 검색합니다.
+    """
+    index = _shard_index
+    subset = index.rows_matching(where) if where else None
+    if not index.count() or (subset is not None and not len(subset)):
+        return [[] for _ in query_embeddings]
+    top, scores = index.search(query_embeddings, n_results, subset)
+    return [
+        [(float(score), index.ids[i], index.documents[i], index.metadatas[i]) for i, score in zip(rows, row_scores)]
+        for rows, row_scores in zip(top.tolist(), scores.tolist())
+    ]
+
+
+class ShardedIndex:
+    """
+    샤드마다 워커 프로세스 하나(ProcessPoolExecutor(max_workers=1))를 두고 scatter-gather로 검색합니다.
+    query()는 NumpyIndex/Chroma 컬렉션과 같은 형태의 결과를 반환합니다.
+    """
+
+    def __init__(self, db_path: str, quantization: str = "none"):
+        shard_map = read_shard_map(db_path)
+        if not shard_map:
+            raise FileNotFoundError(f"샤드 인덱스가 없습니다: {shards_dir(db_path)}")
+        self.db_path = db_path
+        self.num_shards = shard_map["num_shards"]
+        self.sizes = shard_map["sizes"]
+        # Streamlit 등 스레드가 있는 프로세스에서 fork하지 않도록 spawn으로 워커를 띄웁니다.
+        context = multiprocessing.get_context("spawn")
+        self.executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_worker,
+                                initargs=(shard_path(db_path, shard), quantization))
+            for shard in range(self.num_shards)
+        ]
+        self._lock = threading.Lock()
+        self._in_flight = 0  # 진행 중인 query() 수
+        self._closing = False
+
+    def count(self) -> int:
+        return sum(self.sizes)
+
+    def query(self, query_embeddings, n_results: int = 1, include=("documents", "metadatas", "distances"),
+              where: dict = None, **kwargs) -> dict:
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            futures = [executor.submit(_search_shard, queries, n_results, where) for executor in self.executors]
+            per_shard = [future.result() for future in futures]
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                drained = self._closing and not self._in_flight
+            if drained:
+                self._shutdown()
+        merged = [
+            # 샤드별 결과는 이미 점수 내림차순이므로 k-way 병합 후 앞에서 n_results개만 취합니다.
+            list(heapq.merge(*[shard[q] for shard in per_shard], key=lambda hit: -hit[0]))[:n_results]
+            for q in range(len(queries))
+        ]
+        results = {"ids": [[hit[1] for hit in hits] for hits in merged]}
+        if "documents" in include:
+            results["documents"] = [[hit[2] for hit in hits] for hits in merged]
+        if "metadatas" in include:
+            results["metadatas"] = [[hit[3] for hit in hits] for hits in merged]
+        if "distances" in include:
+            results["distances"] = [[1.0 - hit[0] for hit in hits] for hits in merged]
+        return results
+
+    def close(self):
+        """
+        워커를 종료합니다. 진행 중인 query()가 있으면 마지막 검색이 끝난 뒤에 종료합니다.
+        """
+        with self._lock:
+            self._closing = True
+            drained = not self._in_flight
+        if drained:
+            self._shutdown()
+
+    def _shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False)
+
+
+_lock = threading.Lock()
+_open_indexes = {}  # (db_path, quantization) → (샤드 맵 mtime, ShardedIndex)
+
+
+def has_sharded_index(db_path: str) -> bool:
+    return os.path.exists(os.path.join(shards_dir(db_path), SHARD_MAP_FILE_NAME))
+
+
+def load_sharded_index(db_path: str, quantization: str = "none") -> ShardedIndex:
+    """
+    경로별 ShardedIndex(워커 프로세스)를 재사용합니다. 샤드 맵이 바뀌면 새 워커를 띄우고, 이전 워커는 진행 중인 검색이 끝난 뒤 종료합니다.
+    """
+    mtime = os.path.getmtime(os.path.join(shards_dir(db_path), SHARD_MAP_FILE_NAME))
+    with _lock:
+        cached = _open_indexes.get((db_path, quantization))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = ShardedIndex(db_path, quantization)
+        _open_indexes[(db_path, quantization)] = (mtime, index)
+    if cached:
+        cached[1].close()
+    return index
+
+
+def close_index(db_path: str):
+    """
+    db_path의 ShardedIndex 워커를 모두 종료합니다. (index_versions.lease가 교체된 버전의 점유가 끝나면 호출)
+    """
+    with _lock:
+        closing = [_open_indexes.pop(key)[1] for key in list(_open_indexes) if key[0] == db_path]
+    for index in closing:
+        index.close()
@@ -0,0 +1,265 @@
+# app/utils/skeleton.py
+
+import json
+import os
+import re
+
+# DB 및 데이터 파일 경로 설정
+JSON_FILE_PATH = os.path.join("app", "data", "tech_regulations.json")
+
+# 레코드 ID 앞부분의 문서 ID ("doc_6_chap_2장_sec_default_art_80조#chunk_1" → "doc_6")
+_DOC_ID = re.compile(r"^(doc_[^_#]+)")
+
+
+def build_skeleton_text(target_doc: dict, chap: str, sec: str, art: str) -> str:
+    """
+    대상 문서(target_doc)와 장(chap), 절(sec), 조(art) 정보를 바탕으로
+    스켈레톤 텍스트를 생성합니다.
+    """
+    lines = []
+    # 문서 레벨 정보
+    doc_title = target_doc.get("document_title", "")
+    promulgation = target_doc.get("promulgation_number", "")
+    lines.append(doc_title)
+    lines.append(promulgation)
+    
+    article_found = None
+    found_chapter = None
+    found_section = None
+
+    if art is not None:
+        # case 1: 장과 절 정보 모두 제공된 경우
+        if chap is not None and sec is not None:
+            for chapter in target_doc.get("chapters", []):
+                if chapter.get("chapter_number", "") == chap:
+                    found_chapter = chapter
+                    for section in chapter.get("sections", []):
+                        if section.get("section_number", "default") == sec:
+                            found_section = section
+                            for article in section.get("articles", []):
+                                if article.get("article_number", "") == art:
+                                    article_found = article
+                                    break
+                            break
+                    break
+        # case 2: 장 정보만 제공된 경우
+        elif chap is not None and sec is None:
+            for chapter in target_doc.get("chapters", []):
+                if chapter.get("chapter_number", "") == chap:
+                    found_chapter = chapter
+                    for section in chapter.get("sections", []):
+                        for article in section.get("articles", []):
+                            if article.get("article_number", "") == art:
+                                found_section = section
+                                article_found = article
+                                break
+                        if article_found:
+                            break
+                    break
+        # case 3: 장, 절 정보 모두 생략된 경우 (유일하다고 가정)
+        elif chap is None and sec is None:
+            for chapter in target_doc.get("chapters", []):
+                for section in chapter.get("sections", []):
+                    for article in section.get("articles", []):
+                        if article.get("article_number", "") == art:
+                            found_chapter = chapter
+                            found_section = section
+                            article_found = article
+                            break
+                    if article_found:
+                        break
+                if article_found:
+                    break
+
+    # art가 제공되지 않은 경우 -> 문서 또는 장 정보만 존재하는 경우
+    if art is None:
+        if chap is not None:
+            chapter_found = None
+            for chapter in target_doc.get("chapters", []):
+                if chapter.get("chapter_number", "") == chap:
+                    chapter_found = chapter
+                    break
+            if chapter_found is None:
+                return "\n".join(lines) + f"\n장(chapter) 번호 '{chap}'을(를) 찾지 못했습니다."
+            chap_num = chapter_found.get("chapter_number", "")
+            if not chap_num.startswith("제"):
+                chap_num = "제" + chap_num
+            chap_title = chapter_found.get("chapter_title", "")
+            lines.append(f"{chap_num} {chap_title}")
+            return "\n".join(lines)
+        else:
+            return "\n".join(lines)
+    
+    if article_found is None:
+        return "\n".join(lines) + f"\n조(article) 번호 '{art}'을(를) 찾지 못했습니다."
+    
+    # found_chapter, found_section 출력
+    if found_chapter is not None:
+        chap_num = found_chapter.get("chapter_number", "")
+        if not chap_num.startswith("제"):
+            chap_num = "제" + chap_num
+        chap_title = found_chapter.get("chapter_title", "")
+        lines.append(f"{chap_num} {chap_title}")
+    if found_section is not None:
+        sec_num = found_section.get("section_number", "")
+        sec_title = found_section.get("section_title", "")
+        if not sec_num.startswith("제"):
+            sec_num = "제" + sec_num
+        lines.append(f"  ├─ {sec_num} {sec_title}".rstrip())
+    
+    # 조(article) 레벨 출력
+    art_num = article_found.get("article_number", "")
+    art_title = article_found.get("article_title", "")
+    art_text = article_found.get("article_text", "").strip()
+    if not art_num.startswith("제"):
+        art_num = "제" + art_num
+    article_line = f"      ├─ {art_num}({art_title}): {art_text}".rstrip()
+    lines.append(article_line)
+    
+    # 문단 및 항목 출력
+    paragraphs = article_found.get("paragraphs", [])
+    for i, para in enumerate(paragraphs):
+        p_symbol = para.get("paragraph_symbol", "")
+        p_text = para.get("paragraph_text", "").strip()
+        branch = "├─" if i < len(paragraphs) - 1 else "└─"
+        lines.append(f"          {branch} {p_symbol} {p_text}".rstrip())
+        for item in para.get("items", []):
+            item_text = item.get("item_text", "").strip()
+            lines.append(f"              ├─ {item_text}".rstrip())
+    
+    return "\n".join(lines)
+
+
+def get_skeleton_text_from_target_doc(subrecord_id: str, target_doc: dict) -> str:
+    """
+    단일 문서(target_doc)에 대해, subrecord_id ("chap_..._sec_..._art_...") 형식의
+    장/절/조 정보를 이용하여 스켈레톤 텍스트를 생성합니다.
+    """
+    # subrecord_id에서 chap, sec, art 정보 추출 (예: "chap_2_sec_8_art_80조")
+    pattern = r"(?:chap_(?P<chap>[^_]+))?(?:_sec_(?P<sec>[^_]+))?(?:_art_(?P<art>.+))?"
+    m = re.match(pattern, subrecord_id)
+    if not m:
+        return f"올바르지 않은 ID 형식: {subrecord_id}"
+    groups = m.groupdict()
+    chap = groups.get("chap")
+    sec = groups.get("sec")
+    art = groups.get("art")
+    
+    return build_skeleton_text(target_doc, chap, sec, art)
+
+
+def get_skeleton_text(record_id: str, json_file_path: str = JSON_FILE_PATH) -> str:
+    """
+    JSON 파일에서 문서를 로드하여, record_id ("doc_{doc_id}_chap_..._sec_..._art_...") 형식에 따라
+    해당 문서의 스켈레톤 텍스트를 생성합니다.
+    """
+    # JSON 파일 로드
+    try:
+        with open(json_file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        return f"JSON 파일을 로드하는 데 실패했습니다: {e}"
+        
+    documents = data.get("documents", [])
+    
+    # record_id에서 doc_id 및 장/절/조 정보 추출
+    pattern = r"doc_(?P<doc_id>[^_]+)(?:_chap_(?P<chap>[^_]+))?(?:_sec_(?P<sec>[^_]+))?(?:_art_(?P<art>.+))?"
+    m = re.match(pattern, record_id)
+    if not m:
+        return f"올바르지 않은 ID 형식: {record_id}"
+    groups = m.groupdict()
+    doc_id = groups.get("doc_id")
+    chap = groups.get("chap")
+    sec = groups.get("sec")
+    art = groups.get("art")
+    
+    # 대상 문서 찾기
+    target_doc = None
+    for doc in documents:
+        if str(doc.get("document_id", "")) == doc_id:
+            target_doc = doc
+            break
+    if target_doc is None:
+        return f"문서(document) ID '{doc_id}'를 찾지 못했습니다."
+    
+    return build_skeleton_text(target_doc, chap, sec, art)
+
+
+def load_documents(json_file_path: str = JSON_FILE_PATH) -> list:
+    """
+    JSON 파일에서 "documents" 리스트를 로드합니다. 파일이 없으면 빈 리스트를 반환합니다.
+    """
+    if not os.path.exists(json_file_path):
+        print(f"JSON 파일을 찾을 수 없습니다: {json_file_path}")
+        return []
+    with open(json_file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("documents", [])
+
+
+def document_key(record_id: str) -> str:
+    """
+    레코드가 속한 문서 ID (예: "doc_6_chap_2장_..._art_80조#chunk_1" → "doc_6").
+    """
+    m = _DOC_ID.match(record_id)
+    return m.group(1) if m else record_id.split("#")[0]
+
+
+def iter_article_skeletons(documents: list):
+    """
+    문서 리스트를 순회하며 조(article) 단위로 (record_id, 스켈레톤 텍스트)를 생성합니다.
+    제너레이터이므로 스켈레톤 렌더링은 소비자가 다음 레코드를 요청할 때 수행됩니다.
+    (JSON 파일을 레코드마다 다시 읽지 않고, 이미 로드된 문서를 그대로 사용합니다.)
+    """
+    for doc in documents:
+        doc_id = doc.get("document_id", "")
+        for chapter in doc.get("chapters", []):
+            chapter_number = chapter.get("chapter_number", "unknown")
+            for section in chapter.get("sections", []):
+                section_number = section.get("section_number", "default")
+                for article in section.get("articles", []):
+                    article_number = article.get("article_number", "")
+                    subrecord_id = f"chap_{chapter_number}_sec_{section_number}_art_{article_number}"
+                    article_id = f"doc_{doc_id}_{subrecord_id}"
+                    yield article_id, get_skeleton_text_from_target_doc(subrecord_id, doc)
+
+
+def _enforcement_date(value) -> int:
+    """
+    "20250113" 형식의 시행일을 범위 필터($gte/$lt 등)에 쓸 수 있도록 정수로 바꿉니다. 없으면 0.
+    """
+    digits = re.sub(r"\D", "", str(value or ""))
+    return int(digits) if digits else 0
+
+
+def record_metadata(documents: list, source: str = "corpus") -> dict:
+    """
+    iter_article_skeletons와 같은 record_id별로 검색 범위 필터에 사용할 구조화된 메타데이터를 만듭니다.
+    (벡터 DB 메타데이터는 문자열/정수만 저장하므로 값은 모두 str 또는 int입니다.)
+
+    Args:
+        documents (list): 문서 리스트 (load_documents 결과).
+        source (str): 레코드 출처. 기술기획 관령 법령 코퍼스는 "corpus", 사용자 업로드 문서는 "upload".
+
+    Returns:
+        dict: {record_id: {"doc_id", "document_type", "document_title", "chapter", "enforcement_date", "source"}}
+    """
+    metadata = {}
+    for doc in documents:
+        doc_id = doc.get("document_id", "")
+        document_metadata = {
+            "doc_id": str(doc_id),
+            "document_type": doc.get("document_type", ""),
+            "document_title": doc.get("document_title", ""),
+            "enforcement_date": _enforcement_date(doc.get("enforcement_date")),
+            "source": source,
+        }
+        for chapter in doc.get("chapters", []):
+            chapter_number = chapter.get("chapter_number", "unknown")
+            for section in chapter.get("sections", []):
+                section_number = section.get("section_number", "default")
+                for article in section.get("articles", []):
+                    article_number = article.get("article_number", "")
+                    article_id = f"doc_{doc_id}_chap_{chapter_number}_sec_{section_number}_art_{article_number}"
+                    metadata.setdefault(article_id, dict(document_metadata, chapter=chapter_number))
+    return metadata
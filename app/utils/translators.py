@@ -0,0 +1,104 @@
+# app/utils/translators.py
+
+from functools import lru_cache
+
+# 사이드바에서 고르는 번역 모델 로더와 배치 번역 함수
+# 모델은 프로세스마다 현재 방법(method) 하나만 올려 두고 모든 세션이 공유합니다. (방법을 바꾸면 이전 모델은 해제)
+# MODEL_SERVER가 설정되어 있으면 get_translator()는 모델 서버 워커에서 번역하는 객체를 돌려줍니다. (model_server 참고)
+TRANSLATION_METHODS = ["Easy", "Mbart50", "MarianMT", "T5", "Pegasus", "Google Translate"]
+SEQ2SEQ_MODELS = {
+    "Mbart50": "facebook/mbart-large-50-many-to-many-mmt",
+    "MarianMT": "Helsinki-NLP/opus-mt-ko-en",  # ko -> en
+    "T5": "t5-small",
+    "Pegasus": "google/pegasus-xsum",
+}
+MBART_LANG_CODES = {"ko": "ko_KR", "en": "en_XX", "ja": "ja_XX", "zh": "zh_CN"}
+T5_LANG_NAMES = {"en": "English", "de": "German", "fr": "French", "ro": "Romanian"}
+MAX_NEW_TOKENS = 512
+
+
+def load_translation_model(method_name: str):
+    """
+    Loads a translation model or sets up an API-based method
+    based on the selected method_name.
+    Returns either a model object or a (tokenizer, model) tuple, depending on your approach.
+    """
+    import torch
+
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+    if method_name == "Easy":
+        from easynmt import EasyNMT
+
+        return EasyNMT('opus-mt', device=device)
+
+    if method_name in SEQ2SEQ_MODELS:
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(SEQ2SEQ_MODELS[method_name])
+        model = AutoModelForSeq2SeqLM.from_pretrained(SEQ2SEQ_MODELS[method_name]).to(device)
+        model.eval()
+        return (tokenizer, model)
+
+    # Google Translate might be an API-based solution (no local model)
+    return None
+
+
+@lru_cache(maxsize=1)
+def get_translation_model(method_name: str):
+    """
+    번역 모델을 프로세스에서 처음 요청될 때 한 번만 로드합니다.
+    마지막으로 쓴 방법 하나만 캐시하므로 방법을 바꾸면 이전 모델은 메모리에서 해제됩니다.
+    """
+    return load_translation_model(method_name)
+
+
+def translate(method_name: str, texts: list, source_lang: str = "ko", target_lang: str = "en") -> list:
+    """
+    texts를 한 번의 배치로 번역합니다. 로컬 모델이 없는 방법(Google Translate)은 원문을 그대로 돌려줍니다.
+    """
+    model = get_translation_model(method_name)
+    if model is None or not texts:
+        return list(texts)
+    if method_name == "Easy":
+        return model.translate(list(texts), source_lang=source_lang, target_lang=target_lang)
+
+    import torch
+
+    tokenizer, seq2seq = model
+    generate_kwargs = {"max_new_tokens": MAX_NEW_TOKENS}
+    if method_name == "Mbart50":
+        tokenizer.src_lang = MBART_LANG_CODES.get(source_lang, source_lang)
+        generate_kwargs["forced_bos_token_id"] = tokenizer.lang_code_to_id[MBART_LANG_CODES.get(target_lang,
+                                                                                                 target_lang)]
+    elif method_name == "T5":
+        prefix = f"translate {T5_LANG_NAMES.get(source_lang, source_lang)} to " \
+                 f"{T5_LANG_NAMES.get(target_lang, target_lang)}: "
+        texts = [prefix + text for text in texts]
+    inputs = tokenizer(list(texts), return_tensors="pt", padding=True, truncation=True).to(seq2seq.device)
+    with torch.inference_mode():
+        outputs = seq2seq.generate(**inputs, **generate_kwargs)
+    return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+
+class LocalTranslator:
+    """
+    이 프로세스에 로드한 모델로 번역합니다.
+    """
+
+    def __init__(self, method_name: str):
+        self.method_name = method_name
+        get_translation_model(method_name)
+
+    def translate(self, texts: list, source_lang: str = "ko", target_lang: str = "en") -> list:
+        return translate(self.method_name, texts, source_lang, target_lang)
+
+
+def get_translator(method_name: str):
+    """
+    번역 방법의 translate(texts, source_lang, target_lang) 객체를 돌려줍니다.
+    모델 서버가 설정되어 있으면 서버 워커에서 번역하고(모델을 이 프로세스에 로드하지 않음), 아니면 로컬 모델을 씁니다.
+    """
+    from app.utils import model_server
+
+    return model_server.remote_translator(method_name) or LocalTranslator(method_name)
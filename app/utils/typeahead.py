@@ -0,0 +1,139 @@
+# app/utils/typeahead.py
+
+import os
+import re
+import threading
+
+from app.utils.skeleton import JSON_FILE_PATH, load_documents
+
+# 검색창 자동완성: 문서 제목, 장/절 제목, 조 제목(article_title)에 대한 부분 문자열 색인
+# 항목마다 "문서 제목 + 번호 + 제목"을 공백 없이 이어 붙인 검색 문자열을 만들고,
+# 문자 bigram → 항목 번호 posting으로 후보를 좁힌 뒤 부분 문자열을 확인합니다.
+# 질의의 띄어쓰기로 나뉜 단어는 모두 포함되어야 합니다. ("관리규정 22조의2" → 방위사업관리규정 제22조의2)
+DEFAULT_LIMIT = 10
+KIND_ORDER = {"document": 0, "chapter": 1, "section": 2, "article": 3}
+
+_NON_WORD = re.compile(r"[\s·ㆍ∙•.\-_()]+")
+
+
+def _normalize(text: str) -> str:
+    return _NON_WORD.sub("", text).lower()
+
+
+def _grams(text: str) -> set:
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class TypeaheadIndex:
+    """
+    자동완성 항목 목록과 bigram/unigram posting.
+    suggest()는 질의 bigram의 posting 교집합과 후보의 부분 문자열 확인만 하므로 밀리초 미만으로 동작합니다.
+    """
+
+    def __init__(self, documents: list):
+        self.entries = []
+        for doc in documents:
+            doc_id = str(doc.get("document_id", ""))
+            doc_title = doc.get("document_title", "")
+            first_record = None
+            for chapter in doc.get("chapters", []):
+                chapter_number = chapter.get("chapter_number", "unknown")
+                chapter_first = None
+                for section in chapter.get("sections", []):
+                    section_number = section.get("section_number", "default")
+                    section_first = None
+                    for article in section.get("articles", []):
+                        article_number = article.get("article_number", "")
+                        record_id = f"doc_{doc_id}_chap_{chapter_number}_sec_{section_number}_art_{article_number}"
+                        section_first = section_first or record_id
+                        label = f"제{article_number}"
+                        if article.get("article_title"):
+                            label += f"({article['article_title']})"
+                        self._add("article", f"{doc_title} {label}", doc_title + label, doc_id, record_id)
+                    if section.get("section_title") and section_first:
+                        label = f"제{section_number} {section['section_title']}"
+                        self._add("section", f"{doc_title} {label}", doc_title + label, doc_id, section_first)
+                    chapter_first = chapter_first or section_first
+                if chapter.get("chapter_title") and chapter_first:
+                    label = f"제{chapter_number} {chapter['chapter_title']}"
+                    self._add("chapter", f"{doc_title} {label}", doc_title + label, doc_id, chapter_first)
+                first_record = first_record or chapter_first
+            if first_record:
+                self._add("document", doc_title, doc_title, doc_id, first_record)
+
+        self.postings = {}
+        for i, entry in enumerate(self.entries):
+            key = entry["key"]
+            for gram in _grams(key) | set(key):
+                self.postings.setdefault(gram, []).append(i)
+        self.postings = {gram: frozenset(rows) for gram, rows in self.postings.items()}
+
+    def _add(self, kind: str, label: str, searchable: str, doc_id: str, record_id: str):
+        self.entries.append({
+            "kind": kind,
+            "label": label,
+            "doc_id": doc_id,
+            "record_id": record_id,  # 선택 시 이동할 조 (장/절/문서는 첫 조)
+            "key": _normalize(searchable),
+        })
+
+    def _candidates(self, term: str) -> set:
+        grams = _grams(term)
+        rows = None
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return set()
+            rows = set(posting) if rows is None else rows & posting
+            if not rows:
+                return set()
+        return {i for i in rows if term in self.entries[i]["key"]}
+
+    def suggest(self, query: str, limit: int = DEFAULT_LIMIT) -> list:
+        """
+        질의에 맞는 자동완성 항목을 순위대로 돌려줍니다.
+        순위: 검색 문자열이 질의로 시작하는 항목 → 상위 단위(문서 → 장 → 절 → 조) → 짧은 항목 순.
+
+        Returns:
+            list: [{"kind", "label", "doc_id", "record_id"}]
+        """
+        terms = [_normalize(term) for term in query.split()]
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+        rows = None
+        for term in sorted(terms, key=len, reverse=True):
+            matched = self._candidates(term)
+            rows = matched if rows is None else rows & matched
+            if not rows:
+                return []
+        whole = "".join(terms)
+
+        def _rank(i):
+            entry = self.entries[i]
+            position = entry["key"].find(whole)
+            return (position != 0, position < 0, KIND_ORDER[entry["kind"]], len(entry["key"]), i)
+
+        return [
+            {key: self.entries[i][key] for key in ("kind", "label", "doc_id", "record_id")}
+            for i in sorted(rows, key=_rank)[:limit]
+        ]
+
+
+_lock = threading.Lock()
+_index = None  # (JSON 파일 mtime, TypeaheadIndex)
+
+
+def get_typeahead_index(json_file_path: str = JSON_FILE_PATH) -> TypeaheadIndex:
+    """
+    코퍼스 JSON으로 만든 TypeaheadIndex를 재사용합니다.
+    (앱 시작 후 첫 호출에 한 번 생성하고, 파일이 바뀌면 다시 생성)
+    """
+    global _index
+    mtime = os.path.getmtime(json_file_path) if os.path.exists(json_file_path) else 0.0
+    with _lock:
+        if _index is None or _index[0] != mtime:
+            _index = (mtime, TypeaheadIndex(load_documents(json_file_path)))
+        return _index[1]
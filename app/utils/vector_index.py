@@ -0,0 +1,428 @@
+# app/utils/vector_index.py
+
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# 검색 백엔드 선택
+#   VECTOR_BACKEND=chroma (기본) | numpy | sharded (sharded_index 참고)
+# numpy 백엔드는 인덱스 경로의 numpy_index/ 아래에 정규화된 float32 행렬(.npy)과 레코드 목록을 두고,
+# 메모리 맵으로 열어 행렬-벡터 곱 한 번과 argpartition으로 정확한(brute force) top-k를 찾습니다.
+# 메모리 맵은 OS 페이지 캐시를 통해 같은 파일을 여는 여러 프로세스가 공유합니다.
+#
+# 양자화 모드 (VECTOR_QUANTIZATION=none (기본) | int8 | binary)
+#   int8:   차원별 스케일의 대칭 스칼라 양자화 (벡터당 1024바이트, float32 대비 4배 작음)
+#   binary: 부호 비트만 남긴 1비트 양자화 (벡터당 128바이트, 32배 작음), 해밍 거리로 비교
+# 양자화 벡터만 메모리에 올려 전체 코퍼스를 1차로 훑고, 상위 후보(n_results × 배수)만
+# 메모리 맵 float32 행렬에서 읽어 정확한 코사인 유사도로 다시 정렬합니다.
+#
+# 차원 축소 (ingestion 시 선택, 인덱스와 함께 reduction.npz로 저장)
+#   truncate: 앞쪽 dim개 차원만 사용 (Matryoshka 학습 모델: snowflake-arctic-embed2, mxbai-embed-large)
+#   pca:      코퍼스로 학습한 PCA 투영
+# 저장되는 행렬과 양자화 벡터는 축소된 벡터이며, 질의 임베딩에는 검색 시 같은 변환을 적용합니다.
+BACKEND_ENV_VAR = "VECTOR_BACKEND"
+QUANTIZATION_ENV_VAR = "VECTOR_QUANTIZATION"
+NUMPY_INDEX_DIR_NAME = "numpy_index"
+EMBEDDINGS_FILE_NAME = "embeddings.npy"
+RECORDS_FILE_NAME = "records.json"
+INT8_FILE_NAME = "embeddings_int8.npy"
+INT8_SCALE_FILE_NAME = "int8_scale.npy"
+BINARY_FILE_NAME = "embeddings_binary.npy"
+REDUCTION_FILE_NAME = "reduction.npz"
+REDUCTION_METHODS = ("truncate", "pca")
+QUANTIZATION_REPORT_FILE_NAME = "quantization.json"
+QUANTIZATION_MODES = ("none", "int8", "binary")
+RESCORE_MULTIPLIERS = {"int8": 4, "binary": 10}  # 1차 후보 수 = n_results × 배수
+SCORE_BLOCK_ROWS = 1024  # int8 1차 점수를 계산할 때 한 번에 float로 바꾸는 행 수 (CPU 캐시에 들어가는 크기)
+RECALL_K = 10
+RECALL_SAMPLE = 200
+
+# 바이트별 1비트 개수 (해밍 거리 계산용, NumPy 2.0 미만에서는 조회 표 사용)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+_popcount = getattr(np, "bitwise_count", lambda codes: _POPCOUNT[codes])
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+def numpy_index_dir(db_path: str) -> str:
+    return os.path.join(db_path, NUMPY_INDEX_DIR_NAME)
+
+
+def has_numpy_index(db_path: str) -> bool:
+    return os.path.exists(os.path.join(numpy_index_dir(db_path), EMBEDDINGS_FILE_NAME))
+
+
+def index_reduction(db_path: str) -> tuple:
+    """
+    내보낸 인덱스의 차원 축소 설정 (method, dim). 축소하지 않았으면 (None, None).
+    """
+    path = os.path.join(numpy_index_dir(db_path), REDUCTION_FILE_NAME)
+    if not os.path.exists(path):
+        return None, None
+    reduction = Reduction.load(path)
+    return reduction.method, reduction.dim
+
+
+def quantize_int8(matrix: np.ndarray) -> tuple:
+    """
+    차원별 최대 절댓값을 127로 맞추는 대칭 int8 양자화. (int8 행렬, 차원별 float32 스케일)
+    """
+    scale = np.abs(matrix).max(axis=0) / 127.0 if len(matrix) else np.ones(matrix.shape[1], np.float32)
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+    return np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8), scale
+
+
+def quantize_binary(matrix: np.ndarray) -> np.ndarray:
+    """
+    부호 비트만 남겨 8차원씩 한 바이트로 묶습니다. (N × dim/8 uint8)
+    """
+    return np.packbits(matrix > 0, axis=1)
+
+
+class Reduction:
+    """
+    임베딩 차원 축소 변환. fit()으로 코퍼스에 맞춘 뒤 transform()으로 코퍼스/질의 벡터에 같이 적용합니다.
+    """
+
+    def __init__(self, method: str, dim: int, mean: np.ndarray = None, components: np.ndarray = None):
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"알 수 없는 차원 축소 방법입니다: {method}")
+        self.method = method
+        self.dim = dim
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def fit(cls, matrix: np.ndarray, method: str, dim: int) -> "Reduction":
+        if dim >= matrix.shape[1] or dim <= 0:
+            raise ValueError(f"축소 차원은 1 이상 {matrix.shape[1]} 미만이어야 합니다: {dim}")
+        if method == "truncate":
+            return cls(method, dim)
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"알 수 없는 차원 축소 방법입니다: {method}")
+        mean = matrix.mean(axis=0)
+        # 코퍼스 행렬의 SVD로 분산이 큰 dim개 주성분을 구합니다.
+        _, _, vt = np.linalg.svd(matrix - mean, full_matrices=False)
+        if len(vt) < dim:
+            raise ValueError(f"PCA 축소 차원({dim})은 레코드 수({len(vt)})보다 클 수 없습니다.")
+        return cls(method, dim, mean.astype(np.float32), vt[:dim].astype(np.float32))
+
+    def transform(self, matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if self.method == "truncate":
+            reduced = matrix[:, :self.dim]
+        else:
+            reduced = (matrix - self.mean) @ self.components.T
+        return _normalize(reduced).astype(np.float32)
+
+    def save(self, path: str):
+        arrays = {"method": np.array(self.method), "dim": np.array(self.dim)}
+        if self.components is not None:
+            arrays.update(mean=self.mean, components=self.components)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "Reduction":
+        with np.load(path) as data:
+            return cls(str(data["method"]), int(data["dim"]),
+                       data["mean"] if "mean" in data else None,
+                       data["components"] if "components" in data else None)
+
+
+def _save_atomic(path: str, array: np.ndarray):
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+
+
+_WHERE_OPERATORS = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+}
+
+
+def match_where(metadata: dict, where: dict) -> bool:
+    """
+    Chroma의 where 필터 문법({"필드": 값}, {"필드": {"$in": [...]}}, {"$and"/"$or": [...]})으로
+    레코드 메타데이터가 조건을 만족하는지 판단합니다.
+    """
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(match_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(match_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator not in _WHERE_OPERATORS:
+                    raise ValueError(f"지원하지 않는 where 연산자입니다: {operator}")
+                if not _WHERE_OPERATORS[operator](metadata.get(key), operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def _top_k(scores: np.ndarray, k: int) -> tuple:
+    """
+    행마다 점수가 큰 k개의 (인덱스, 점수)를 내림차순으로 반환합니다.
+    """
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), (len(scores), scores.shape[1]))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def write_numpy_index(db_path: str, ids: list, embeddings, documents: list, metadatas: list = None,
+                      reduction_method: str = None, reduction_dim: int = None,
+                      reduction: Reduction = None) -> str:
+    """
+    임베딩을 정규화된 float32 행렬로 저장합니다. 파일은 임시 이름으로 쓴 뒤 os.replace로 교체하므로
+    이미 메모리 맵으로 열어 둔 프로세스는 이전 파일을 계속 읽을 수 있습니다.
+    reduction_method/reduction_dim이 주어지면 코퍼스로 차원 축소를 맞춰 축소된 벡터를 저장합니다.
+    이미 맞춘 reduction을 주면 그대로 적용합니다. (샤드들이 같은 투영 공간을 쓰도록 할 때)
+    """
+    index_dir = numpy_index_dir(db_path)
+    os.makedirs(index_dir, exist_ok=True)
+    reduction_path = os.path.join(index_dir, REDUCTION_FILE_NAME)
+    if len(ids):
+        matrix = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+    if reduction_method and reduction is None and len(ids):
+        reduction = Reduction.fit(matrix, reduction_method, reduction_dim)
+    if reduction is not None and len(ids):
+        matrix = reduction.transform(matrix)
+        reduction.save(reduction_path)
+    elif os.path.exists(reduction_path):
+        os.remove(reduction_path)
+
+    records_path = os.path.join(index_dir, RECORDS_FILE_NAME)
+    with open(records_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(
+            {"ids": list(ids), "documents": list(documents), "metadatas": list(metadatas or [None] * len(ids))},
+            f, ensure_ascii=False,
+        )
+    int8_matrix, int8_scale = quantize_int8(matrix)
+    # 레코드 → 양자화 벡터 → float 행렬 순서로 교체 (로더는 float 행렬 파일의 mtime을 기준으로 다시 엽니다)
+    os.replace(records_path + ".tmp", records_path)
+    _save_atomic(os.path.join(index_dir, INT8_FILE_NAME), int8_matrix)
+    _save_atomic(os.path.join(index_dir, INT8_SCALE_FILE_NAME), int8_scale)
+    _save_atomic(os.path.join(index_dir, BINARY_FILE_NAME), quantize_binary(matrix))
+    _save_atomic(os.path.join(index_dir, EMBEDDINGS_FILE_NAME), matrix)
+    return index_dir
+
+
+def export_collection(collection, db_path: str, reduction_method: str = None, reduction_dim: int = None) -> int:
+    """
+    Chroma 컬렉션의 임베딩/문서/메타데이터 전체를 numpy 인덱스로 내보냅니다.
+
+    Returns:
+        int: 내보낸 레코드 수.
+    """
+    stored = collection.get(include=["embeddings", "documents", "metadatas"])
+    ids = stored["ids"]
+    write_numpy_index(db_path, ids, stored["embeddings"], stored["documents"], stored["metadatas"],
+                      reduction_method=reduction_method, reduction_dim=reduction_dim)
+    return len(ids)
+
+
+class NumpyIndex:
+    """
+    메모리 맵 float32 행렬에 대한 코사인 유사도 검색.
+    Chroma 컬렉션의 query()와 같은 형태의 결과를 돌려주므로 query_document에서 그대로 바꿔 쓸 수 있습니다.
+    distances는 코사인 거리(1 - 코사인 유사도)입니다.
+
+    quantization이 "none"이면 전체 float 행렬로 정확 검색하고, "int8"/"binary"이면 메모리에 올린
+    양자화 벡터로 1차 후보를 고른 뒤 후보만 float 행렬에서 읽어 다시 점수를 매깁니다.
+    """
+
+    def __init__(self, db_path: str, quantization: str = "none", rescore_multiplier: int = None):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"알 수 없는 양자화 모드입니다: {quantization}")
+        index_dir = numpy_index_dir(db_path)
+        self.db_path = db_path
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier or RESCORE_MULTIPLIERS.get(quantization, 1)
+        self.matrix = np.load(os.path.join(index_dir, EMBEDDINGS_FILE_NAME), mmap_mode="r")
+        reduction_path = os.path.join(index_dir, REDUCTION_FILE_NAME)
+        self.reduction = Reduction.load(reduction_path) if os.path.exists(reduction_path) else None
+        self.codes = None
+        if quantization == "int8":
+            self.codes = np.load(os.path.join(index_dir, INT8_FILE_NAME))
+            self.int8_scale = np.load(os.path.join(index_dir, INT8_SCALE_FILE_NAME))
+        elif quantization == "binary":
+            self.codes = np.load(os.path.join(index_dir, BINARY_FILE_NAME))
+        with open(os.path.join(index_dir, RECORDS_FILE_NAME), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        self.ids = records["ids"]
+        self.documents = records["documents"]
+        self.metadatas = records["metadatas"]
+        self._where_rows = {}
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def bytes_per_vector(self) -> int:
+        """
+        1차 검색에서 메모리에 상주하는 벡터당 바이트 수.
+        """
+        matrix = self.codes if self.codes is not None else self.matrix
+        return matrix.shape[1] * matrix.dtype.itemsize
+
+    def rows_matching(self, where: dict) -> np.ndarray:
+        """
+        where 필터를 만족하는 행 번호 배열. 필터별로 한 번만 계산해 캐시합니다.
+        """
+        key = json.dumps(where, ensure_ascii=False, sort_keys=True)
+        rows = self._where_rows.get(key)
+        if rows is None:
+            rows = np.array([i for i, metadata in enumerate(self.metadatas) if match_where(metadata, where)],
+                            dtype=np.int64)
+            self._where_rows[key] = rows
+        return rows
+
+    def _approximate_scores(self, queries: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.quantization == "int8":
+            weighted = queries * self.int8_scale
+            scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+            for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+                block = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+                scores[:, start:start + len(block)] = weighted @ block.T
+            return scores
+        # binary: 해밍 거리가 작을수록 가까우므로 음수를 점수로 사용
+        query_codes = quantize_binary(queries)
+        distances = np.stack([
+            _popcount(np.bitwise_xor(codes, code)).sum(axis=1, dtype=np.int32) for code in query_codes
+        ])
+        return -distances.astype(np.float32)
+
+    def prepare_queries(self, query_embeddings) -> np.ndarray:
+        """
+        질의 임베딩을 정규화하고, 인덱스에 차원 축소가 있으면 같은 변환을 적용합니다.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries.reshape(len(queries) if queries.ndim > 1 else 1, -1)
+        if self.reduction is not None and queries.shape[1] != self.matrix.shape[1]:
+            return self.reduction.transform(_normalize(queries))
+        return _normalize(queries)
+
+    def search(self, query_embeddings, n_results: int = 1, rows: np.ndarray = None) -> tuple:
+        """
+        (top-k 인덱스 행렬, 코사인 유사도 행렬)을 반환합니다. 각 행은 유사도 내림차순입니다.
+        rows(행 번호 배열, 예: rows_matching 결과)가 주어지면 그 행들만 점수를 매깁니다.
+        """
+        queries = self.prepare_queries(query_embeddings)
+        subset = None if rows is None else np.sort(rows)
+        if self.codes is None:
+            if subset is None:
+                return _top_k(queries @ self.matrix.T, n_results)
+            top, scores = _top_k(queries @ np.asarray(self.matrix[subset]).T, n_results)
+            return subset[top], scores
+
+        candidates, _ = _top_k(self._approximate_scores(queries, subset), n_results * self.rescore_multiplier)
+        if subset is not None:
+            candidates = subset[candidates]
+        tops, top_scores = [], []
+        for query, rows in zip(queries, candidates):
+            # 후보 행만 메모리 맵에서 읽어 정확한 점수로 다시 정렬
+            rows = np.sort(rows)
+            exact = np.asarray(self.matrix[rows]) @ query
+            top, scores = _top_k(exact[None, :], n_results)
+            tops.append(rows[top[0]])
+            top_scores.append(scores[0])
+        return np.stack(tops), np.stack(top_scores)
+
+    def query(self, query_embeddings, n_results: int = 1, include=("documents", "metadatas", "distances"),
+              where: dict = None, **kwargs) -> dict:
+        """
+        where(Chroma where 문법)가 주어지면 조건을 만족하는 행만 검색합니다. (사후 필터링이 아닌 검색 범위 제한)
+        """
+        rows = self.rows_matching(where) if where else None
+        if not self.ids or (rows is not None and not len(rows)):
+            empty = [[] for _ in query_embeddings]
+            return {"ids": empty, "documents": empty, "metadatas": empty, "distances": empty}
+        top, top_scores = self.search(query_embeddings, n_results, rows)
+        results = {"ids": [[self.ids[i] for i in row] for row in top]}
+        if "documents" in include:
+            results["documents"] = [[self.documents[i] for i in row] for row in top]
+        if "metadatas" in include:
+            results["metadatas"] = [[self.metadatas[i] for i in row] for row in top]
+        if "distances" in include:
+            results["distances"] = (1.0 - top_scores).tolist()
+        return results
+
+
+@lru_cache(maxsize=8)
+def _load_numpy_index(db_path: str, quantization: str, mtime: float) -> NumpyIndex:
+    return NumpyIndex(db_path, quantization)
+
+
+def load_numpy_index(db_path: str, quantization: str = None) -> NumpyIndex:
+    """
+    경로/양자화 모드별 NumpyIndex를 재사용합니다. 인덱스 파일이 바뀌면(mtime) 다시 엽니다.
+    quantization이 없으면 VECTOR_QUANTIZATION 환경 변수를 따릅니다.
+    """
+    mtime = os.path.getmtime(os.path.join(numpy_index_dir(db_path), EMBEDDINGS_FILE_NAME))
+    return _load_numpy_index(db_path, quantization or get_quantization(), mtime)
+
+
+def evaluate_quantization(db_path: str, k: int = RECALL_K, sample: int = RECALL_SAMPLE) -> dict:
+    """
+    양자화 모드별 벡터당 메모리와 전체 정밀도 대비 recall@k를 측정해 quantization.json에 저장합니다.
+    질의로는 코퍼스 벡터 표본에 작은 잡음을 더한 벡터를 사용합니다.
+
+    Returns:
+        dict: {mode: {"bytes_per_vector", "compression", "rescore_multiplier", "recall_at_k"}, "k", "queries"}
+    """
+    exact = NumpyIndex(db_path)
+    report = {"k": k, "queries": 0}
+    if not exact.count():
+        return report
+    rng = np.random.default_rng(0)
+    rows = rng.choice(exact.count(), size=min(sample, exact.count()), replace=False)
+    queries = np.asarray(exact.matrix[np.sort(rows)])
+    queries = queries + 0.02 * rng.standard_normal(queries.shape).astype(np.float32)
+    truth, _ = exact.search(queries, k)
+    report["queries"] = len(queries)
+    for mode in QUANTIZATION_MODES:
+        index = exact if mode == "none" else NumpyIndex(db_path, mode)
+        found, _ = index.search(queries, k)
+        recall = np.mean([len(set(a) & set(b)) / truth.shape[1] for a, b in zip(truth.tolist(), found.tolist())])
+        report[mode] = {
+            "bytes_per_vector": index.bytes_per_vector(),
+            "compression": exact.bytes_per_vector() / index.bytes_per_vector(),
+            "rescore_multiplier": index.rescore_multiplier if mode != "none" else None,
+            "recall_at_k": float(recall),
+        }
+    with open(os.path.join(numpy_index_dir(db_path), QUANTIZATION_REPORT_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def get_backend() -> str:
+    return os.environ.get(BACKEND_ENV_VAR, "chroma")
+
+
+def get_quantization() -> str:
+    return os.environ.get(QUANTIZATION_ENV_VAR, "none")
@@ -1,213 +1,229 @@
 import argparse
-import json
 import os
-import ollama
-import chromadb
-import re
-from chromadb.config import DEFAULT_TENANT, DEFAULT_DATABASE, Settings
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+import time
+from app.utils import ingest_pipeline
+from app.utils.embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from app.utils.ingest_telemetry import write_report
+from app.utils.ollama_pool import OllamaPool, get_default_pool, parse_hosts
+from app.utils.embedders import make_embedder
+from app.utils.dedup import DEFAULT_THRESHOLD
+from app.utils import index_versions
+from app.utils.skeleton import JSON_FILE_PATH, load_documents, iter_article_skeletons, record_metadata
 
-# 모델과 토크나이저 로드
-model_name = "monologg/koelectra-base-v3-discriminator"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
 
-# DB 및 데이터 파일 경로 설정
-JSON_FILE_PATH = os.path.join("app", "data", "tech_regulations.json")
+def get_model_collection(model: str, hnsw_profile: str = None):
+    """
+    모델의 활성 인덱스 경로(버전 포인터가 없으면 chroma_db_<model>)의 "docs" 컬렉션을 반환합니다.
+    기존 컬렉션이 있으면 그대로 사용하고, 저장된 content_hash와 비교해 변경분만 적재합니다.
+    새로 만드는 컬렉션은 hnsw_profile(없으면 Chroma 기본값)로 생성됩니다.
+    """
+    db_path = index_versions.active_path(model)
+    return index_versions.open_collection(db_path, hnsw_profile), db_path
 
-def get_skeleton_text(record_id: str, json_file_path: str = JSON_FILE_PATH) -> str:
-    # ... (생략: 기존 코드와 동일)
-    try:
-        with open(json_file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        return f"JSON 파일을 로드하는 데 실패했습니다: {e}"
-        
-    documents = data.get("documents", [])
-    pattern = r"doc_(?P<doc_id>[^_]+)(?:_chap_(?P<chap>[^_]+))?(?:_sec_(?P<sec>[^_]+))?(?:_art_(?P<art>.+))?"
-    m = re.match(pattern, record_id)
-    if not m:
-        return f"올바르지 않은 ID 형식: {record_id}"
-    
-    groups = m.groupdict()
-    doc_id = groups.get("doc_id")
-    chap = groups.get("chap")
-    sec = groups.get("sec")
-    art = groups.get("art")
-    
-    target_doc = None
-    for doc in documents:
-        if str(doc.get("document_id", "")) == doc_id:
-            target_doc = doc
-            break
-    if target_doc is None:
-        return f"문서(document) ID '{doc_id}'를 찾지 못했습니다."
-    
-    lines = []
-    doc_title = target_doc.get("document_title", "")
-    promulgation = target_doc.get("promulgation_number", "")
-    lines.append(doc_title)
-    lines.append(promulgation)
-    
-    article_found = None
-    found_chapter = None
-    found_section = None
-
-    if art is not None:
-        if chap is not None and sec is not None:
-            for chapter in target_doc.get("chapters", []):
-                if chapter.get("chapter_number", "") == chap:
-                    found_chapter = chapter
-                    for section in chapter.get("sections", []):
-                        if section.get("section_number", "default") == sec:
-                            found_section = section
-                            for article in section.get("articles", []):
-                                if article.get("article_number", "") == art:
-                                    article_found = article
-                                    break
-                            break
-                    break
-        elif chap is not None and sec is None:
-            for chapter in target_doc.get("chapters", []):
-                if chapter.get("chapter_number", "") == chap:
-                    found_chapter = chapter
-                    for section in chapter.get("sections", []):
-                        for article in section.get("articles", []):
-                            if article.get("article_number", "") == art:
-                                found_section = section
-                                article_found = article
-                                break
-                        if article_found:
-                            break
-                    break
-        elif chap is None and sec is None:
-            for chapter in target_doc.get("chapters", []):
-                for section in chapter.get("sections", []):
-                    for article in section.get("articles", []):
-                        if article.get("article_number", "") == art:
-                            found_chapter = chapter
-                            found_section = section
-                            article_found = article
-                            break
-                    if article_found:
-                        break
-                if article_found:
-                    break
-
-    if art is None:
-        if chap is not None:
-            chapter_found = None
-            for chapter in target_doc.get("chapters", []):
-                if chapter.get("chapter_number", "") == chap:
-                    chapter_found = chapter
-                    break
-            if chapter_found is None:
-                return "\n".join(lines) + f"\n장(chapter) 번호 '{chap}'을(를) 찾지 못했습니다."
-            chap_num = chapter_found.get("chapter_number", "")
-            if not chap_num.startswith("제"):
-                chap_num = "제" + chap_num
-            chap_title = chapter_found.get("chapter_title", "")
-            lines.append(f"{chap_num} {chap_title}")
-            return "\n".join(lines)
-        else:
-            return "\n".join(lines)
-    
-    if article_found is None:
-        return "\n".join(lines) + f"\n조(article) 번호 '{art}'을(를) 찾지 못했습니다."
-    
-    if found_chapter is not None:
-        chap_num = found_chapter.get("chapter_number", "")
-        if not chap_num.startswith("제"):
-            chap_num = "제" + chap_num
-        chap_title = found_chapter.get("chapter_title", "")
-        lines.append(f"{chap_num} {chap_title}")
-    if found_section is not None:
-        sec_num = found_section.get("section_number", "")
-        sec_title = found_section.get("section_title", "")
-        if not sec_num.startswith("제"):
-            sec_num = "제" + sec_num
-        lines.append(f"  ├─ {sec_num} {sec_title}".rstrip())
-    
-    art_num = article_found.get("article_number", "")
-    art_title = article_found.get("article_title", "")
-    art_text = article_found.get("article_text", "").strip()
-    if not art_num.startswith("제"):
-        art_num = "제" + art_num
-    article_line = f"      ├─ {art_num}({art_title}): {art_text}".rstrip()
-    lines.append(article_line)
-    
-    paragraphs = article_found.get("paragraphs", [])
-    for i, para in enumerate(paragraphs):
-        p_symbol = para.get("paragraph_symbol", "")
-        p_text = para.get("paragraph_text", "").strip()
-        branch = "├─" if i < len(paragraphs) - 1 else "└─"
-        lines.append(f"          {branch} {p_symbol} {p_text}".rstrip())
-        items = para.get("items", [])
-        for item in items:
-            item_text = item.get("item_text", "").strip()
-            lines.append(f"              ├─ {item_text}".rstrip())
-    
-    return "\n".join(lines)
-
-def generate_embedding(text: str, model: str = "mxbai-embed-large") -> list:
-    response = ollama.embeddings(model=model, prompt=text)
-    return response["embedding"]
-
-def ingest_documents(model: str = "mxbai-embed-large"):
-    # 모델별 DB 경로 지정
-    db_path = f"chroma_db_{model}"
-    
-    client = chromadb.PersistentClient(
-        path=db_path,
-        settings=Settings(),
-        tenant=DEFAULT_TENANT,
-        database=DEFAULT_DATABASE,
-    )
-    
-    # 컬렉션이 이미 존재하면 건너뛰도록 처리 (단순하게 client의 컬렉션 리스트 길이로 판단)
-    existing_collections = client.list_collections()
-    if len(existing_collections) > 0:
-        print(f"DB 경로 '{db_path}'에 이미 컬렉션이 존재합니다. Ingestion을 건너뜁니다.")
-        return
+def ingest_documents(models=("mxbai-embed-large",),
+                     concurrency: int = ingest_pipeline.DEFAULT_CONCURRENCY,
+                     batch_size: int = ingest_pipeline.DEFAULT_BATCH_SIZE,
+                     queue_size: int = ingest_pipeline.DEFAULT_QUEUE_SIZE,
+                     max_retries: int = ingest_pipeline.DEFAULT_MAX_RETRIES,
+                     cache_path: str = DEFAULT_CACHE_PATH,
+                     report_path: str = None,
+                     hosts=None,
+                     backend: str = "ollama",
+                     onnx_dir: str = None,
+                     quantize: bool = False,
+                     dedup_threshold: float = None,
+                     rebuild: bool = False,
+                     reduction_method: str = None,
+                     reduction_dim: int = None,
+                     hnsw_profile: str = None,
+                     num_shards: int = None):
+    """
+    코퍼스를 한 번만 렌더링하여 여러 임베딩 모델의 컬렉션에 동시에 적재합니다.
+    models에는 모델 이름 하나 또는 리스트를 줄 수 있습니다.
+    실행이 끝나면 단계별 시간/처리량/지연시간 요약 리포트(JSON)를 저장합니다.
+    hosts가 주어지면 임베딩 요청을 해당 올라마 엔드포인트들에 분산합니다.
+    (없으면 OLLAMA_HOSTS 환경 변수 또는 기본 올라마 주소를 사용합니다.)
+    backend가 "onnx"이면 올라마 대신 ONNX Runtime으로 프로세스 안에서 임베딩합니다.
+    dedup_threshold가 주어지면 삭제/빈 조를 제외하고 같은 문서 안의 근사 중복 조는 대표 하나만 적재합니다.
+    rebuild가 True이면 활성 인덱스를 건드리지 않고 새 버전 디렉터리에 처음부터 적재한 뒤,
+    성공하면 활성 버전 포인터를 원자적으로 교체합니다. (앱은 중단 없이 계속 조회 가능)
+    reduction_method("truncate"/"pca")가 주어지면 numpy 인덱스에 reduction_dim차원으로 축소한 벡터를 저장합니다.
+    hnsw_profile은 새로 만드는 컬렉션의 HNSW 파라미터 프로파일입니다. (index_profiles, tuneDB.py 참고)
+    num_shards가 주어지면 numpy 인덱스를 문서 단위 샤드로도 내보냅니다. (VECTOR_BACKEND=sharded)
+    """
+    if isinstance(models, str):
+        models = [models]
 
-    # 컬렉션이 없으면 새로 생성
-    collection = client.create_collection(name="docs")
-    
     if not os.path.exists(JSON_FILE_PATH):
         print(f"JSON 파일을 찾을 수 없습니다: {JSON_FILE_PATH}")
         return
 
-    with open(JSON_FILE_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    targets = []
+    versions = {}
+    for model in models:
+        if rebuild:
+            versions[model], db_path = index_versions.create_version(model)
+            collection = index_versions.open_collection(db_path, hnsw_profile)
+        else:
+            collection, db_path = get_model_collection(model, hnsw_profile)
+        targets.append((model, collection, db_path))
+
+    documents = load_documents(JSON_FILE_PATH)
+    # 모델/텍스트 해시 단위 임베딩 캐시 (cache_path가 None이면 사용하지 않음)
+    cache = EmbeddingCache(cache_path) if cache_path else None
+    pool = OllamaPool(hosts) if hosts else get_default_pool()
+    embedders = {
+        model: make_embedder(model, backend=backend, pool=pool, onnx_dir=onnx_dir, quantize=quantize)
+        for model in models
+    }
+    # 모델마다 producer → 임베딩 워커 N개 → 단일 writer 비동기 파이프라인을 동시에 실행
+    try:
+        summaries = ingest_pipeline.ingest_fanout(
+            iter_article_skeletons(documents),
+            targets,
+            concurrency=concurrency,
+            batch_size=batch_size,
+            queue_size=queue_size,
+            max_retries=max_retries,
+            cache=cache,
+            embedders=embedders,
+            dedup_threshold=dedup_threshold,
+            reduction_method=reduction_method,
+            reduction_dim=reduction_dim,
+            num_shards=num_shards,
+            metadatas=record_metadata(documents),
+        )
+    except BaseException:
+        for model, version in versions.items():
+            index_versions.discard_version(model, version)
+        raise
+    for model, version in versions.items():
+        index_versions.activate(model, version)
+        removed = index_versions.collect_garbage(model)
+        print(
+            f"[{model}] 활성 인덱스를 {version}으로 교체했습니다."
+            + (f" (이전 버전 삭제: {', '.join(removed)})" if removed else "")
+        )
+    for endpoint in pool.stats():
+        print(
+            f"올라마 {endpoint['host']}: 요청 {endpoint['requests']}회, 오류 {endpoint['errors']}회, "
+            f"평균 {endpoint['mean_latency_ms']:.0f}ms"
+        )
+    if cache is not None:
+        stats = cache.stats()
+        print(
+            f"임베딩 캐시: 적중 {stats['hits']}건, 미스 {stats['misses']}건 "
+            f"(적중률 {stats['hit_rate']:.1%}, 저장 {stats['entries']}건)"
+        )
+    for model, summary in summaries.items():
+        print(
+            f"[{model}] 임베딩 삽입 완료. (추가/변경 {summary['upserted']}건, "
+            f"삭제 {summary['deleted']}건, 변경 없음 {summary['unchanged']}건, "
+            f"{summary['elapsed']:.1f}초, {summary['throughput']:.1f}건/초)"
+        )
+        for stage, entry in summary["telemetry"]["stages"].items():
+            print(f"    {stage:<12} {entry['seconds']:8.2f}초  {entry['items']:6d}건  {entry['items_per_second']:10.1f}건/초")
+        latency = summary["telemetry"]["embed_latency"]
+        print(
+            f"    임베딩 요청 {latency['requests']}회: p50 {latency['p50_ms']:.0f}ms, "
+            f"p95 {latency['p95_ms']:.0f}ms, p99 {latency['p99_ms']:.0f}ms"
+        )
+        if summary.get("shards"):
+            print(
+                f"    샤드 {len(summary['shards']['sizes'])}개: 레코드 수 {summary['shards']['sizes']}"
+                + (" (재배정)" if summary["shards"]["rebalanced"] else "")
+            )
+        quantization = summary.get("quantization")
+        if quantization and quantization["queries"]:
+            for mode in ("none", "int8", "binary"):
+                entry = quantization[mode]
+                print(
+                    f"    {mode:<7} 벡터당 {entry['bytes_per_vector']:5d}바이트 ({entry['compression']:4.0f}배 압축), "
+                    f"recall@{quantization['k']} {entry['recall_at_k']:.3f}"
+                )
 
-    documents = data.get("documents", [])
-    for doc in documents:
-        doc_id = doc.get("document_id", "")
-        chapters = doc.get("chapters", [])
-        for chapter in chapters:
-            chapter_number = chapter.get("chapter_number", "unknown")
-            sections = chapter.get("sections", [])
-            for section in sections:
-                section_number = section.get("section_number", "default")
-                articles = section.get("articles", [])
-                for article in articles:
-                    article_number = article.get("article_number", "")
-                    article_id = f"doc_{doc_id}_chap_{chapter_number}_sec_{section_number}_art_{article_number}"
-                    article_content = get_skeleton_text(article_id)
-                    article_embedding = generate_embedding(article_content, model=model)
-                    collection.add(
-                        ids=[article_id],
-                        embeddings=[article_embedding],
-                        documents=[article_content]
-                    )
-                    print(f"조 레벨 {article_id} 삽입 완료.")
-    print("모든 레벨의 임베딩 삽입 완료.")
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "corpus": {"path": JSON_FILE_PATH, "documents": len(documents)},
+        "params": {
+            "models": list(models),
+            "concurrency": concurrency,
+            "batch_size": batch_size,
+            "queue_size": queue_size,
+            "max_retries": max_retries,
+            "cache": bool(cache_path),
+            "backend": backend,
+            "quantize": quantize,
+            "dedup_threshold": dedup_threshold,
+            "rebuild": rebuild,
+            "reduction_method": reduction_method,
+            "reduction_dim": reduction_dim,
+            "hnsw_profile": hnsw_profile,
+            "num_shards": num_shards,
+        },
+        "cache": cache.stats() if cache is not None else None,
+        "endpoints": pool.stats(),
+        "models": summaries,
+        "versions": versions,
+    }
+    print(f"ingestion 리포트 저장: {write_report(report, report_path)}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="임베딩 기법 이름을 인자로 받아 문서 임베딩 삽입 실행")
-    parser.add_argument("--embedding", type=str, required=True, help="사용할 임베딩 기법 이름 (예: mxbai-embed-large)")
+    parser.add_argument("--embedding", type=str, nargs="+", required=True,
+                        help="사용할 임베딩 기법 이름, 여러 개 지정 가능 (예: mxbai-embed-large snowflake-arctic-embed2)")
+    parser.add_argument("--concurrency", type=int, default=ingest_pipeline.DEFAULT_CONCURRENCY,
+                        help="모델별로 동시에 임베딩을 요청하는 워커 수")
+    parser.add_argument("--batch-size", type=int, default=ingest_pipeline.DEFAULT_BATCH_SIZE,
+                        help="임베딩 요청 한 번에 담을 조(article) 수")
+    parser.add_argument("--queue-size", type=int, default=ingest_pipeline.DEFAULT_QUEUE_SIZE,
+                        help="단계 사이 큐의 최대 배치 수 (backpressure)")
+    parser.add_argument("--max-retries", type=int, default=ingest_pipeline.DEFAULT_MAX_RETRIES,
+                        help="실패한 임베딩 요청의 최대 재시도 횟수")
+    parser.add_argument("--cache-path", type=str, default=DEFAULT_CACHE_PATH,
+                        help="임베딩 캐시(SQLite) 파일 경로")
+    parser.add_argument("--no-cache", action="store_true", help="임베딩 캐시를 사용하지 않음")
+    parser.add_argument("--hosts", type=str, default=None,
+                        help="임베딩 요청을 분산할 올라마 주소 목록, 쉼표로 구분 (예: 127.0.0.1:11434,127.0.0.1:11435)")
+    parser.add_argument("--backend", type=str, choices=["ollama", "onnx"], default="ollama",
+                        help="임베딩 백엔드 (ollama: HTTP API, onnx: 프로세스 내 ONNX Runtime CPU 추론)")
+    parser.add_argument("--onnx-dir", type=str, default=None,
+                        help="ONNX 모델 상위 디렉터리 (기본: models/onnx, 모델별 하위 디렉터리 사용)")
+    parser.add_argument("--quantize", action="store_true", help="ONNX 백엔드에서 int8 동적 양자화 모델 사용")
+    parser.add_argument("--dedup", action="store_true",
+                        help="삭제/빈 조를 제외하고 같은 문서 안의 근사 중복 조를 병합 (서로 다른 규정의 조는 병합하지 않음)")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="--dedup에서 근사 중복으로 병합할 추정 Jaccard 유사도 하한 (MinHash/LSH)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="새 버전 디렉터리에 처음부터 적재한 뒤 활성 인덱스를 원자적으로 교체 (blue/green)")
+    parser.add_argument("--reduce", type=str, choices=["truncate", "pca"], default=None,
+                        help="numpy 인덱스 벡터의 차원 축소 방법 (truncate: Matryoshka 절단, pca: 코퍼스로 학습한 PCA)")
+    parser.add_argument("--reduce-dim", type=int, default=256, help="차원 축소 후 차원 수")
+    parser.add_argument("--hnsw-profile", type=str, default=None,
+                        help="새로 만드는 컬렉션의 HNSW 프로파일 (default, fast, balanced, accurate 또는 tuneDB.py로 저장한 이름)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="numpy 인덱스를 문서 단위로 나눌 샤드 수 (VECTOR_BACKEND=sharded로 검색)")
+    parser.add_argument("--report", type=str, default=None,
+                        help="요약 리포트(JSON) 저장 경로 (기본: .cache/ingest_reports/ingest_<시각>.json)")
     args = parser.parse_args()
 
     # 입력받은 임베딩 기법 이름에 따라 ingest_documents 실행
-    ingest_documents(model=args.embedding)
+    ingest_documents(
+        models=args.embedding,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        queue_size=args.queue_size,
+        max_retries=args.max_retries,
+        cache_path=None if args.no_cache else args.cache_path,
+        report_path=args.report,
+        hosts=parse_hosts(args.hosts),
+        backend=args.backend,
+        onnx_dir=args.onnx_dir,
+        quantize=args.quantize,
+        dedup_threshold=args.dedup_threshold if args.dedup else None,
+        rebuild=args.rebuild,
+        reduction_method=args.reduce,
+        reduction_dim=args.reduce_dim if args.reduce else None,
+        hnsw_profile=args.hnsw_profile,
+        num_shards=args.shards,
+    )
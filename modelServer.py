@@ -0,0 +1,46 @@
+import argparse
+import os
+import signal
+import sys
+
+from app.utils import model_server
+from app.utils.reranker import LEXICAL_STAGE, cascade_stages
+from app.utils.translators import TRANSLATION_METHODS
+
+# 리랭커/번역 모델을 워커 프로세스에 올려 두고 모든 Streamlit 프로세스의 요청을 받는 로컬 모델 서버
+# 앱은 MODEL_SERVER 환경 변수(이 서버의 --address)를 설정해 실행합니다.
+#   python modelServer.py --workers 4 --translation MarianMT
+#   MODEL_SERVER=127.0.0.1:6399 streamlit run streamlit_app.py
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="리랭커/번역 모델 서버 (워커 프로세스 풀 + micro-batching)")
+    parser.add_argument("--address", type=str,
+                        default=os.environ.get(model_server.MODEL_SERVER_ENV_VAR) or model_server.DEFAULT_ADDRESS,
+                        help="수신 주소, \"호스트:포트\" 또는 유닉스 소켓 경로 (앱의 MODEL_SERVER와 같아야 함)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="모델 워커 프로세스 수 (워커당 torch 스레드 = 코어 수 / 워커 수)")
+    parser.add_argument("--batch-window-ms", type=float, default=model_server.DEFAULT_BATCH_WINDOW_MS,
+                        help="같은 모델 요청을 모으는 최대 대기 시간 (ms)")
+    parser.add_argument("--max-batch", type=int, default=model_server.DEFAULT_MAX_BATCH,
+                        help="배치당 최대 항목 수 ((질의, 문서) 쌍 또는 번역 문장)")
+    parser.add_argument("--translation", type=str, default=None, choices=TRANSLATION_METHODS,
+                        help="워커 시작 시 미리 로드할 번역 방법 (워커는 번역 모델을 하나만 올려 둠)")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="리랭커(RERANKER_MODEL과 RERANKER_CASCADE 모델 단계)를 미리 로드하지 않음")
+    args = parser.parse_args()
+
+    preload = []
+    if not args.no_preload:
+        preload.append(("rerank", None))
+        preload.extend(("rerank", stage) for stage, _ in cascade_stages() if stage != LEXICAL_STAGE)
+    if args.translation:
+        preload.append(("translate", (args.translation, None, None)))
+
+    server = model_server.ModelServer(args.address, num_workers=args.workers, batch_window_ms=args.batch_window_ms,
+                                      max_batch=args.max_batch, preload=preload)
+    print(f"워커 {server.num_workers}개 시작 중 (워커당 스레드 {server.num_threads}), 모델 로드 중...")
+    # SIGTERM에도 워커 프로세스를 정리하고 종료합니다. (serve_forever의 finally)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    pids = server.warm_up()
+    server.serve_forever(on_ready=lambda: print(f"모델 서버 준비 완료: {args.address} (워커 PID {pids})",
+                                                flush=True))
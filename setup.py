@@ -4,16 +4,12 @@ import ollama
 import chromadb
 import  re
 from chromadb.config import DEFAULT_TENANT, DEFAULT_DATABASE, Settings
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+from app.utils.reranker import get_reranker
 
 
 
 
-# 모델과 토크나이저 로드
-model_name = "monologg/koelectra-base-v3-discriminator"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
+# 리랭커는 query_document에서 처음 사용할 때 로드합니다. (app.utils.reranker 참고)
 
 # DB 및 데이터 파일 경로 설정
 DB_PATH = "chroma_db"
@@ -281,23 +277,10 @@ def query_document(prompt: str, n_results: int = 1,
 
 
     
-    inputs = tokenizer(
-    [f"{prompt} [SEP] {doc}" for doc in documents],
-    return_tensors="pt",
-    padding=True,
-    truncation=True)
-    # 모델을 사용하여 관련성 점수 계산
-    with torch.no_grad():
-        outputs = model(**inputs)
-        scores = outputs.logits.squeeze()
+    # 리랭커로 관련성 점수를 계산해 문서를 정렬
+    ranked_docs = get_reranker().rank([prompt], [documents])[0]
 
-    scores = scores.tolist()
-    # 점수와 문서를 함께 정렬
-    ranked_docs = sorted(zip(scores, documents), key=lambda x: x[0], reverse=True)
-
-# 가장 높은 점수를 받은 문서 선택
-
-    retrieved_docs = " ".join([doc for score, doc in ranked_docs])
+    retrieved_docs = " ".join(ranked_docs)
     # 검색된 콘텐츠를 기반으로 RAG 프롬프트 구성 후 답변 생성
     rag_prompt = f"Using this data: {retrieved_docs}. Respond in Korean to this prompt: {prompt}"
     gen_response = ollama.generate(model=generation_model, prompt=rag_prompt)
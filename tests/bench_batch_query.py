@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# 저장소 루트를 import 경로에 추가 (python tests/bench_batch_query.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import query_utils
+from app.utils.embedding_cache import EmbeddingCache
+from tuneDB import DEFAULT_LABELED_QUERIES, load_labeled_queries
+
+# Wall time of retrieving for the labeled GROUND_TRUTH queries one by one with query_document
+# versus one query_documents call (one embed request, one multi-vector search).
+# Each run gets its own empty embedding cache so both pay for the query embeddings.
+
+
+def timed(label: str, fn):
+    with tempfile.TemporaryDirectory() as workdir:
+        cache = EmbeddingCache(os.path.join(workdir, "cache.sqlite"))
+        query_utils.get_default_cache = lambda: cache
+        started = time.perf_counter()
+        results = fn()
+        elapsed = time.perf_counter() - started
+        cache.close()
+    print(f"{label:>12}: {elapsed:8.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-prompt vs batched query_document benchmark")
+    parser.add_argument("--embedding", type=str, default="mxbai-embed-large")
+    parser.add_argument("--labeled", type=str, default=DEFAULT_LABELED_QUERIES)
+    parser.add_argument("--n-results", type=int, default=15)
+    args = parser.parse_args()
+
+    prompts = [query for query, _ in load_labeled_queries(args.labeled)]
+    print(f"{len(prompts)} prompts, model {args.embedding}, n_results {args.n_results}")
+
+    single = timed("per-prompt", lambda: [
+        query_utils.query_document(prompt, n_results=args.n_results, embedding_model=args.embedding)
+        for prompt in prompts
+    ])
+    batch = timed("batched", lambda: query_utils.query_documents(
+        prompts, n_results=args.n_results, embedding_model=args.embedding))
+    print(f"same retrieved documents: {sum(a == b for a, b in zip(single, batch))}/{len(prompts)}")
@@ -0,0 +1,109 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+# 저장소 루트를 import 경로에 추가 (python tests/bench_cascade.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.lexical_index import get_lexical_index
+from app.utils.reranker import cascade_stages, get_reranker, get_stage_reranker, order_by_scores
+from tuneDB import DEFAULT_LABELED_QUERIES, load_labeled_queries, relevant_rows
+
+# Single-stage reranking (RERANKER_MODEL scores every candidate, as on the LLM page) versus
+# cascades where BM25 and/or a small cross-encoder prune the candidates first
+# (same stage logic as query_utils.rerank_documents, without the score cache).
+# Workload: BM25 top-k candidates for each labeled GROUND_TRUTH query, plus optional
+# "title queries" (an article title as the query, that article as the relevant record).
+# Reported per config: p50 latency of each stage, p50/p95 total per query, hit@1 / hit@5 / MRR
+# against the labels, and overlap@5 with the single-stage ranking.
+
+
+def build_workload(labeled_path: str, num_candidates: int, title_queries: int) -> list:
+    lexical = get_lexical_index()
+    queries = []
+    for query, chunk_ids in load_labeled_queries(labeled_path):
+        queries.append((query, {lexical.ids[row] for row in relevant_rows(chunk_ids, lexical.ids)}))
+    titled = [record_id for record_id in lexical.ids if re.search(r"조\([^)]+\)", lexical.text(record_id))]
+    step = max(len(titled) // max(title_queries, 1), 1)
+    for record_id in titled[::step][:title_queries]:
+        title = re.search(r"조\(([^)]+)\)", lexical.text(record_id)).group(1)
+        queries.append((f"{title}에 대해 알려줘", {record_id}))
+    workload = []
+    for query, relevant in queries:
+        ids = [record_id for record_id, _ in lexical.search(query, num_candidates)]
+        if ids:
+            workload.append((query, ids, [lexical.text(record_id) for record_id in ids], relevant))
+    return workload
+
+
+def run_cascade(spec: str, query: str, documents: list) -> tuple:
+    """
+    (최종 순서의 후보 번호 리스트, [단계별 초]) 를 반환합니다.
+    """
+    candidates = list(range(len(documents)))
+    pruned = []
+    timings = []
+    for stage, keep in cascade_stages(spec) + [(None, None)]:
+        started = time.perf_counter()
+        if keep is None or len(candidates) > keep:
+            scorer = get_stage_reranker(stage) if stage else get_reranker()
+            scores = scorer.score([(query, documents[i]) for i in candidates])
+            candidates = order_by_scores([candidates], scores)[0]
+            if keep is not None:
+                pruned = candidates[keep:] + pruned
+                candidates = candidates[:keep]
+        timings.append(time.perf_counter() - started)
+    return candidates + pruned, timings
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cascade reranking latency / quality benchmark")
+    parser.add_argument("--labeled", type=str, default=DEFAULT_LABELED_QUERIES)
+    parser.add_argument("--candidates", type=int, default=15, help="retrieved documents per query (LLM page: 15)")
+    parser.add_argument("--title-queries", type=int, default=50)
+    parser.add_argument("--cascade", type=str, nargs="+",
+                        default=["lexical:8", "lexical:5", "cross-encoder/ms-marco-MiniLM-L-6-v2:5",
+                                 "lexical:10,cross-encoder/ms-marco-MiniLM-L-6-v2:4"],
+                        help="RERANKER_CASCADE specs to compare with single-stage reranking")
+    args = parser.parse_args()
+
+    workload = build_workload(args.labeled, args.candidates, args.title_queries)
+    print(f"{len(workload)} queries x {args.candidates} candidates")
+
+    configs = [""] + args.cascade
+    # 모델 로드 시간이 지연 시간에 섞이지 않도록 모든 단계를 먼저 한 번 실행합니다.
+    query, _, documents, _ = workload[0]
+    for spec in configs:
+        run_cascade(spec, query, documents)
+
+    reference = {}
+    print(f"{'cascade':>50} {'stage p50 ms':>24} {'p50 ms':>8} {'p95 ms':>8} {'hit@1':>6} {'hit@5':>6} "
+          f"{'MRR':>6} {'ovl@5':>6}")
+    for spec in configs:
+        totals, stage_times, hit1, hit5, mrr, overlap = [], [], [], [], [], []
+        for query, ids, documents, relevant in workload:
+            order, timings = run_cascade(spec, query, documents)
+            ranked = [ids[i] for i in order]
+            totals.append(sum(timings))
+            stage_times.append(timings)
+            if not spec:
+                reference[query] = ranked
+            overlap.append(len(set(ranked[:5]) & set(reference[query][:5])) / min(5, len(ranked)))
+            if relevant:
+                first = next((rank for rank, record_id in enumerate(ranked, 1) if record_id in relevant), None)
+                hit1.append(first == 1)
+                hit5.append(first is not None and first <= 5)
+                mrr.append(1 / first if first else 0.0)
+        stages = " / ".join(f"{percentile([t[i] for t in stage_times], 0.5):.1f}"
+                            for i in range(len(stage_times[0])))
+        labeled = max(len(hit1), 1)
+        print(f"{spec or 'single-stage':>50} {stages:>24} {percentile(totals, 0.5):8.1f} "
+              f"{percentile(totals, 0.95):8.1f} {sum(hit1) / labeled:6.2f} {sum(hit5) / labeled:6.2f} "
+              f"{sum(mrr) / labeled:6.2f} {sum(overlap) / len(overlap):6.2f}")
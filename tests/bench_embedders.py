@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# 저장소 루트를 import 경로에 추가 (python tests/bench_embedders.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.chunker import chunk_records
+from app.utils.embedders import ONNX_MAX_LENGTH, make_embedder
+from app.utils.skeleton import iter_article_skeletons, load_documents
+
+# Compares the Ollama HTTP embedding path with the in-process ONNX Runtime backend
+# (fp32 and int8) on the same regulation corpus: throughput, batch latency and how
+# close the vectors are to the Ollama ones (cosine similarity, top-10 neighbour overlap).
+
+
+def run_backend(embedder, texts: list, batch_size: int):
+    vectors = []
+    latencies = []
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        batch_started = time.perf_counter()
+        vectors.extend(embedder.embed(texts[start:start + batch_size]))
+        latencies.append(time.perf_counter() - batch_started)
+    elapsed = time.perf_counter() - started
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix, elapsed, sorted(latencies)
+
+
+def neighbour_overlap(a: np.ndarray, b: np.ndarray, k: int = 10, queries: int = 100) -> float:
+    overlaps = []
+    for i in range(min(queries, len(a))):
+        top_a = set(np.argsort(-(a @ a[i]))[1:k + 1])
+        top_b = set(np.argsort(-(b @ b[i]))[1:k + 1])
+        overlaps.append(len(top_a & top_b) / k)
+    return float(np.mean(overlaps))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ollama vs ONNX embedding backend benchmark")
+    parser.add_argument("--model", type=str, default="mxbai-embed-large")
+    parser.add_argument("--onnx-dir", type=str, default=None)
+    parser.add_argument("--limit", type=int, default=500, help="number of article chunks to embed")
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    # 모든 백엔드가 같은 청크를 임베딩하도록 ONNX 최대 입력 길이에 맞춰 나눕니다.
+    records = list(chunk_records(iter_article_skeletons(load_documents()), args.model,
+                                 ONNX_MAX_LENGTH))[:args.limit]
+    texts = [text for _, text in records]
+    print(f"{len(texts)} chunks, model {args.model}")
+
+    backends = [
+        ("ollama", make_embedder(args.model, backend="ollama")),
+        ("onnx-fp32", make_embedder(args.model, backend="onnx", onnx_dir=args.onnx_dir)),
+        ("onnx-int8", make_embedder(args.model, backend="onnx", onnx_dir=args.onnx_dir, quantize=True)),
+    ]
+    reference = None
+    print(f"{'backend':<10} {'docs/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'cos vs ollama':>14} {'top10 overlap':>14}")
+    for name, embedder in backends:
+        matrix, elapsed, latencies = run_backend(embedder, texts, args.batch_size)
+        if reference is None:
+            reference = matrix
+        cosine = float(np.mean(np.sum(matrix * reference, axis=1)))
+        overlap = neighbour_overlap(reference, matrix)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000
+        print(f"{name:<10} {len(texts) / elapsed:8.1f} {p50:8.1f} {p95:8.1f} {cosine:14.4f} {overlap:14.3f}")
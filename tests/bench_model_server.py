@@ -0,0 +1,111 @@
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# 저장소 루트를 import 경로에 추가 (python tests/bench_model_server.py 로 실행할 때)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.utils import model_server
+from app.utils.lexical_index import get_lexical_index
+from app.utils.reranker import load_reranker
+
+# Rerank throughput with N concurrent users (threads, like Streamlit sessions in one server
+# process) each reranking the BM25 top-k candidates of a query:
+#   in-process:  one reranker in this process (the default without MODEL_SERVER)
+#   server w=N:  modelServer.py with N worker processes, requests micro-batched over local IPC
+# Reports queries/s, p50/p95 latency per query and the server's mean batch size.
+
+
+def make_queries(num_queries: int, num_candidates: int) -> list:
+    lexical = get_lexical_index()
+    step = max(len(lexical.ids) // num_queries, 1)
+    queries = []
+    for record_id in lexical.ids[::step][:num_queries]:
+        query = lexical.text(record_id).splitlines()[0][:60]
+        documents = [lexical.text(hit) for hit, _ in lexical.search(query, num_candidates)]
+        queries.append([(query, doc) for doc in documents])
+    return queries
+
+
+def run_users(score, queries: list, users: int, seconds: float) -> dict:
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def _user(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            score(queries[i % len(queries)])
+            with lock:
+                latencies.append(time.perf_counter() - started)
+            i += users
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=_user, args=(u,)) for u in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "qps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+    }
+
+
+def start_server(address: str, workers: int, batch_window_ms: float) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "modelServer.py"), "--address", address, "--workers", str(workers),
+         "--batch-window-ms", str(batch_window_ms)],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    for line in process.stdout:
+        if "준비 완료" in line:
+            # 이후 출력(경고 등)이 파이프를 채워 서버가 멈추지 않도록 계속 비웁니다.
+            threading.Thread(target=process.stdout.read, daemon=True).start()
+            return process
+    raise RuntimeError("model server did not start")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model server throughput benchmark")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--candidates", type=int, default=15)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-window-ms", type=float, default=model_server.DEFAULT_BATCH_WINDOW_MS)
+    parser.add_argument("--address", type=str, default=os.path.join(ROOT, ".cache", "bench_model_server.sock"))
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries, args.candidates)
+    print(f"{args.users} users, {len(queries)} queries x {args.candidates} candidates, {os.cpu_count()} cores")
+    print(f"{'config':>14} {'q/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+
+    reranker = load_reranker()
+    reranker.score(queries[0])  # warm-up
+    result = run_users(reranker.score, queries, args.users, args.seconds)
+    print(f"{'in-process':>14} {result['qps']:8.1f} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {'-':>6}")
+
+    os.makedirs(os.path.dirname(args.address), exist_ok=True)
+    for workers in args.workers:
+        server = start_server(args.address, workers, args.batch_window_ms)
+        try:
+            client = model_server.ModelClient(args.address)
+            client.request("rerank", None, queries[0])  # warm-up
+            result = run_users(lambda pairs: client.request("rerank", None, pairs), queries, args.users,
+                               args.seconds)
+            stats = client.stats()
+            client.close()
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{'server w=' + str(workers):>14} {result['qps']:8.1f} {result['p50_ms']:8.1f} "
+              f"{result['p95_ms']:8.1f} {stats['mean_batch']:6.1f}")
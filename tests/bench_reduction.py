@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 저장소 루트를 import 경로에 추가 (python tests/bench_reduction.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.vector_index import NumpyIndex, write_numpy_index
+
+# Recall vs latency/memory table for embedding dimension reduction, per model.
+# Full-precision vectors are read from the model's active Chroma index. Each
+# (method, dim) variant is written as a numpy index with that reduction and
+# queried with full-dimension query vectors (the index projects them).
+# Queries are corpus vectors plus a little noise. Recall@k is measured against
+# exact search on the unreduced vectors.
+
+
+def load_model_embeddings(model: str) -> np.ndarray:
+    from app.utils import index_versions
+
+    collection = index_versions.open_collection(index_versions.active_path(model))
+    return np.asarray(collection.get(include=["embeddings"])["embeddings"], dtype=np.float32)
+
+
+def measure(matrix, queries, truth, k, method=None, dim=None):
+    with tempfile.TemporaryDirectory() as workdir:
+        ids = [str(i) for i in range(len(matrix))]
+        write_numpy_index(workdir, ids, matrix, ["" for _ in ids], reduction_method=method, reduction_dim=dim)
+        index = NumpyIndex(workdir)
+        latencies = []
+        found = []
+        for query in queries:
+            started = time.perf_counter()
+            top, _ = index.search(query, k)
+            latencies.append(time.perf_counter() - started)
+            found.append(set(top[0].tolist()))
+        latencies.sort()
+        recall = np.mean([len(a & set(b)) / k for a, b in zip(found, truth.tolist())])
+        return index.bytes_per_vector(), latencies[len(latencies) // 2] * 1000, recall
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Matryoshka truncation / PCA dimension reduction benchmark")
+    parser.add_argument("--models", type=str, nargs="+", default=["snowflake-arctic-embed2", "mxbai-embed-large"])
+    parser.add_argument("--dims", type=int, nargs="+", default=[768, 512, 256, 128, 64])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for model in args.models:
+        matrix = load_model_embeddings(model)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        queries = matrix[rng.integers(0, len(matrix), args.queries)]
+        queries = queries + 0.02 * rng.standard_normal(queries.shape).astype(np.float32)
+        truth = np.argsort(-(queries @ matrix.T), axis=1)[:, :args.k]
+
+        print(f"\n{model}: {len(matrix)} vectors × {matrix.shape[1]} dims")
+        print(f"{'method':<9} {'dim':>5} {'bytes/vec':>10} {'p50 ms':>8} {'recall@k':>9}")
+        size, p50, recall = measure(matrix, queries, truth, args.k)
+        print(f"{'full':<9} {matrix.shape[1]:>5} {size:>10} {p50:8.3f} {recall:9.3f}")
+        for method in ("truncate", "pca"):
+            for dim in args.dims:
+                if dim >= matrix.shape[1] or (method == "pca" and dim > len(matrix)):
+                    continue
+                size, p50, recall = measure(matrix, queries, truth, args.k, method, dim)
+                print(f"{method:<9} {dim:>5} {size:>10} {p50:8.3f} {recall:9.3f}")
@@ -0,0 +1,113 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+# 저장소 루트를 import 경로에 추가 (python tests/bench_reranker.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.lexical_index import get_lexical_index
+from app.utils.reranker import DEFAULT_MODEL, make_reranker
+from tuneDB import DEFAULT_LABELED_QUERIES, load_labeled_queries
+
+# Per-query rerank latency and peak RSS of the original reranking path (KoELECTRA loaded
+# eagerly, "query [SEP] doc" strings, one padded fp32 batch, no max length, torch.no_grad)
+# versus the lazy Reranker component (length-bucketed pairs capped at max_length,
+# inference_mode, optional int8 dynamic quantization, or ONNX Runtime).
+# Each configuration runs in a fresh process so RSS numbers do not mix.
+# Candidates are the BM25 top-k for each labeled GROUND_TRUTH query (no Ollama needed).
+
+
+def baseline_rank(model_name: str):
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+
+    def rank(prompt, documents):
+        inputs = tokenizer([f"{prompt} [SEP] {doc}" for doc in documents],
+                           return_tensors="pt", padding=True, truncation=True)
+        with torch.no_grad():
+            scores = model(**inputs).logits[:, -1].tolist()
+        return [doc for _, doc in sorted(zip(scores, documents), key=lambda x: x[0], reverse=True)]
+    return rank
+
+
+def run_config(config: dict, workload: list, queue):
+    rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    load_started = time.perf_counter()
+    if config["backend"] == "baseline":
+        import torch
+        torch.set_num_threads(config["threads"])
+        rank = baseline_rank(config["model"])
+    else:
+        reranker = make_reranker(config["backend"], model=config["model"], quantize=config["quantize"],
+                                 max_length=config["max_length"], num_threads=config["threads"])
+        rank = lambda prompt, documents: reranker.rank([prompt], [documents])[0]
+    load_seconds = time.perf_counter() - load_started
+    rank(*workload[0])  # warm-up
+    latencies, top1 = [], []
+    for prompt, documents in workload:
+        started = time.perf_counter()
+        ranked = rank(prompt, documents)
+        latencies.append(time.perf_counter() - started)
+        top1.append(ranked[0])
+    latencies.sort()
+    queue.put({
+        "load_seconds": load_seconds,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_start_mb": rss_start / 1024,
+        "top1": top1,
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reranker latency / RSS benchmark")
+    parser.add_argument("--model", type=str, default=DEFAULT_MODEL)
+    parser.add_argument("--onnx-dir", type=str, default=None, help="optimum-exported reranker dir (adds onnx rows)")
+    parser.add_argument("--labeled", type=str, default=DEFAULT_LABELED_QUERIES)
+    parser.add_argument("--candidates", type=int, default=15)
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    lexical = get_lexical_index()
+    workload = []
+    for query, _ in load_labeled_queries(args.labeled):
+        hits = lexical.search(query, args.candidates)
+        if hits:
+            workload.append((query, [lexical.text(record_id) for record_id, _ in hits]))
+    print(f"{len(workload)} queries x {args.candidates} candidates, model {args.model}")
+
+    configs = []
+    for threads in args.threads:
+        configs.append({"label": "baseline-fp32", "backend": "baseline", "model": args.model, "threads": threads})
+        for quantize in (False, True):
+            configs.append({"label": "torch-" + ("int8" if quantize else "fp32"), "backend": "torch",
+                            "model": args.model, "quantize": quantize, "threads": threads,
+                            "max_length": args.max_length})
+            if args.onnx_dir:
+                configs.append({"label": "onnx-" + ("int8" if quantize else "fp32"), "backend": "onnx",
+                                "model": args.onnx_dir, "quantize": quantize, "threads": threads,
+                                "max_length": args.max_length})
+
+    context = multiprocessing.get_context("spawn")
+    reference = None
+    print(f"{'config':>14} {'threads':>7} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>7} {'top1 = fp32':>11}")
+    for config in configs:
+        queue = context.Queue()
+        process = context.Process(target=run_config, args=(config, workload, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        if config["label"] == "torch-fp32" and reference is None:
+            reference = result["top1"]
+        agreement = "-" if reference is None else \
+            f"{sum(a == b for a, b in zip(result['top1'], reference)) / len(reference):.2f}"
+        print(f"{config['label']:>14} {config['threads']:>7} {result['load_seconds']:7.2f} {result['p50_ms']:8.1f} "
+              f"{result['p95_ms']:8.1f} {result['rss_mb']:7.0f} {agreement:>11}")
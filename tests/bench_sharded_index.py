@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 저장소 루트를 import 경로에 추가 (python tests/bench_sharded_index.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.sharded_index import ShardedIndex, write_shards
+from app.utils.vector_index import NumpyIndex, write_numpy_index
+
+# Per-query latency of one in-process NumpyIndex vs scatter-gather over N shard worker
+# processes, on synthetic corpora of growing size (documents of ~150 articles each).
+# Also checks that the merged sharded top-k matches the single-index top-k.
+
+
+def p50_ms(index, queries, k) -> float:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.query([query], n_results=k)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded scatter-gather retrieval benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 100000])
+    parser.add_argument("--shards", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=15)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>8} {'shards':>7} {'p50 ms':>8} {'same top-k':>11}")
+    for size in args.sizes:
+        matrix = rng.standard_normal((size, args.dim), dtype=np.float32)
+        ids = [f"doc_{i // 150}_art_{i % 150}조" for i in range(size)]
+        documents = ["" for _ in ids]
+        queries = matrix[rng.integers(0, size, args.queries)] + 0.05 * rng.standard_normal(
+            (args.queries, args.dim), dtype=np.float32)
+        with tempfile.TemporaryDirectory() as workdir:
+            write_numpy_index(workdir, ids, matrix, documents)
+            single = NumpyIndex(workdir)
+            expected = single.query(queries, n_results=args.k)["ids"]
+            print(f"{size:>8} {1:>7} {p50_ms(single, queries, args.k):8.2f} {'-':>11}")
+            for num_shards in args.shards:
+                write_shards(workdir, ids, matrix, documents, None, num_shards)
+                sharded = ShardedIndex(workdir)
+                same = sharded.query(queries, n_results=args.k)["ids"] == expected
+                print(f"{size:>8} {num_shards:>7} {p50_ms(sharded, queries, args.k):8.2f} {str(same):>11}")
+                sharded.close()
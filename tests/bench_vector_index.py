@@ -0,0 +1,168 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 저장소 루트를 import 경로에 추가 (python tests/bench_vector_index.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.vector_index import RESCORE_MULTIPLIERS, NumpyIndex, write_numpy_index
+
+# Compares exact search over a memory-mapped float32 matrix (NumpyIndex) with Chroma's
+# HNSW collection query (embedding → HNSW → SQLite document fetch) and raw hnswlib,
+# on synthetic normalized vectors of growing corpus size. The int8/binary quantized
+# first pass with float rescoring is included. Every approximate backend is tuned
+# (HNSW ef, quantized rescore multiplier) until recall@k against the exact result
+# reaches --min-recall, and latency is reported at that setting. A backend only
+# counts as faster than exact search when it meets the recall bar.
+EF_STEPS = [16, 32, 64, 128, 256, 512, 1024, 2048]
+RESCORE_STEPS = [4, 10, 20, 40, 80]
+MIN_RECALL = 0.95
+
+
+def timed_queries(search, queries: np.ndarray) -> list:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - started)
+    return sorted(latencies)
+
+
+def percentile_ms(latencies: list, q: float) -> float:
+    return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+
+def recall_at_k(exact: list, results: list, k: int) -> float:
+    return float(np.mean([len(a & b) / k for a, b in zip(exact, results)]))
+
+
+def tune(steps: list, search_all, exact, k: int, min_recall: float):
+    """
+    steps의 설정을 작은 값부터 시도해 recall@k가 min_recall 이상이 되는 첫 설정을 고릅니다.
+    끝까지 못 미치면 마지막 설정을 돌려줍니다. (설정, 결과)
+    """
+    for step in steps:
+        results = search_all(step)
+        if exact is None or recall_at_k(exact, results, k) >= min_recall:
+            break
+    return step, results
+
+
+def bench_numpy(matrix, queries, k, workdir, exact=None, min_recall=MIN_RECALL, quantization="none"):
+    ids = [str(i) for i in range(len(matrix))]
+    write_numpy_index(workdir, ids, matrix, ["" for _ in ids])
+    if quantization == "none":
+        index = NumpyIndex(workdir)
+        results = [set(row) for row in index.search(queries, k)[0].tolist()]
+        return timed_queries(lambda q: index.query([q], n_results=k), queries), results, "exact"
+
+    def _search_all(multiplier):
+        return [set(row) for row in NumpyIndex(workdir, quantization, multiplier).search(queries, k)[0].tolist()]
+
+    steps = [step for step in RESCORE_STEPS if step >= RESCORE_MULTIPLIERS[quantization]]
+    multiplier, results = tune(steps, _search_all, exact, k, min_recall)
+    index = NumpyIndex(workdir, quantization, multiplier)
+    return timed_queries(lambda q: index.query([q], n_results=k), queries), results, f"rescore x{multiplier}"
+
+
+def bench_hnswlib(matrix, queries, k, workdir, exact=None, min_recall=MIN_RECALL):
+    import hnswlib
+
+    index = hnswlib.Index(space="cosine", dim=matrix.shape[1])
+    index.init_index(max_elements=len(matrix), ef_construction=100, M=16)
+    index.add_items(matrix)
+
+    def _search_all(ef):
+        index.set_ef(ef)
+        return [set(row) for row in index.knn_query(queries, k=k)[0].tolist()]
+
+    ef, results = tune([ef for ef in EF_STEPS if ef >= k], _search_all, exact, k, min_recall)
+    index.set_ef(ef)
+    return timed_queries(lambda q: index.knn_query(q, k=k), queries), results, f"ef={ef}"
+
+
+def bench_chroma(matrix, queries, k, workdir, exact=None, min_recall=MIN_RECALL, start_ef=None):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+    ids = [str(i) for i in range(len(matrix))]
+    collections = {}
+
+    def _search_all(ef):
+        # Chroma의 search_ef는 컬렉션을 만들 때만 정할 수 있어 설정마다 컬렉션을 새로 만듭니다.
+        collection = client.create_collection(name=f"docs_ef{ef}", metadata={
+            "hnsw:space": "cosine", "hnsw:construction_ef": 100, "hnsw:M": 16, "hnsw:search_ef": ef})
+        for start in range(0, len(ids), 5000):
+            collection.add(ids=ids[start:start + 5000], embeddings=matrix[start:start + 5000].tolist(),
+                           documents=["" for _ in ids[start:start + 5000]])
+        collections[ef] = collection
+        return [set(int(i) for i in collection.query(query_embeddings=[q.tolist()], n_results=k)["ids"][0])
+                for q in queries]
+
+    # 같은 M/construction_ef의 hnswlib에서 찾은 ef부터 시작해 다시 만드는 횟수를 줄입니다.
+    steps = [ef for ef in EF_STEPS if ef >= max(k, start_ef or 0)]
+    ef, results = tune(steps, _search_all, exact, k, min_recall)
+    collection = collections[ef]
+    return (timed_queries(lambda q: collection.query(query_embeddings=[q.tolist()], n_results=k), queries),
+            results, f"ef={ef}")
+
+
+BACKENDS = [
+    ("numpy", bench_numpy),
+    ("numpy-int8", lambda *a: bench_numpy(*a, quantization="int8")),
+    ("numpy-binary", lambda *a: bench_numpy(*a, quantization="binary")),
+    ("hnswlib", bench_hnswlib),
+    ("chroma-hnsw", bench_chroma),
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NumPy exact search vs HNSW benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 50000, 100000])
+    parser.add_argument("--dim", type=int, default=1024, help="embedding dimension (mxbai/snowflake: 1024)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--min-recall", type=float, default=MIN_RECALL,
+                        help="recall@k an approximate backend must reach to count as faster")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>8} {'backend':<12} {'setting':<12} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9}")
+    for size in args.sizes:
+        matrix = rng.standard_normal((size, args.dim), dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        # 질의는 코퍼스 벡터 근처에서 뽑아 실제 검색처럼 뚜렷한 최근접 이웃이 있게 합니다.
+        queries = matrix[rng.integers(0, size, args.queries)] + 0.05 * rng.standard_normal(
+            (args.queries, args.dim), dtype=np.float32)
+
+        exact = None
+        p50 = {}
+        hnsw_ef = None
+        for name, bench in BACKENDS:
+            kwargs = {"start_ef": hnsw_ef} if name == "chroma-hnsw" else {}
+            with tempfile.TemporaryDirectory() as workdir:
+                try:
+                    latencies, results, setting = bench(matrix, queries, args.k, workdir, exact, args.min_recall,
+                                                        **kwargs)
+                except ImportError as e:
+                    print(f"{size:>8} {name:<12} skipped ({e.name} not installed)")
+                    continue
+            if exact is None:
+                exact = results
+            if name == "hnswlib":
+                hnsw_ef = int(setting.split("=")[1])
+            recall = recall_at_k(exact, results, args.k)
+            meets = recall >= args.min_recall
+            if meets:
+                p50[name] = percentile_ms(latencies, 0.5)
+            print(f"{size:>8} {name:<12} {setting:<12} {percentile_ms(latencies, 0.5):8.2f} "
+                  f"{percentile_ms(latencies, 0.95):8.2f} {recall:9.3f}"
+                  + ("" if meets else f"  (below recall {args.min_recall}, not compared)"))
+        faster = [name for name in p50 if name != "numpy" and p50[name] < p50["numpy"]]
+        if faster:
+            print(f"{size:>8} → faster than exact search at recall@{args.k} >= {args.min_recall}: "
+                  f"{', '.join(faster)}")
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 저장소 루트를 import 경로에 추가 (python tests/ollama_pool_standin.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.ollama_pool import OllamaPool
+
+# Stand-in Ollama servers: each answers /api/embed with a vector that encodes its port.
+# One server is slow and one fails every request, to exercise routing and failover.
+BASE_PORT = 18434
+SERVERS = [
+    {"delay": 0.01, "fail": False},
+    {"delay": 0.05, "fail": False},
+    {"delay": 0.01, "fail": True},
+]
+
+
+def make_handler(port: int, delay: float, fail: bool):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(delay)
+            if fail:
+                self.send_response(503)
+                self.end_headers()
+                self.wfile.write(b'{"error": "unavailable"}')
+                return
+            inputs = body.get("input")
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            payload = {"model": body.get("model"), "embeddings": [[float(port), float(len(t))] for t in inputs]}
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class StandInServer(ThreadingHTTPServer):
+    request_queue_size = 256
+
+
+def start_servers():
+    hosts = []
+    for i, config in enumerate(SERVERS):
+        port = BASE_PORT + i
+        server = StandInServer(("127.0.0.1", port), make_handler(port, config["delay"], config["fail"]))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        hosts.append(f"http://127.0.0.1:{port}")
+    return hosts
+
+
+async def run_async(pool: OllamaPool, requests: int):
+    client = pool.async_client()
+    results = await asyncio.gather(*[
+        client.embed(model="stand-in", input=[f"text {i}"]) for i in range(requests)
+    ])
+    return results
+
+
+if __name__ == "__main__":
+    hosts = start_servers()
+    pool = OllamaPool(hosts, max_failures=2, cooldown=5.0)
+
+    # Sync calls (query-time path)
+    for i in range(20):
+        pool.embed(model="stand-in", input=f"query {i}")
+
+    # Concurrent async calls (ingestion path)
+    started = time.perf_counter()
+    results = asyncio.run(run_async(pool, 200))
+    elapsed = time.perf_counter() - started
+    served_by = {}
+    for result in results:
+        port = int(result["embeddings"][0][0])
+        served_by[port] = served_by.get(port, 0) + 1
+
+    print(f"200 async requests in {elapsed:.2f}s, served by port: {served_by}")
+    for endpoint in pool.stats():
+        print(endpoint)
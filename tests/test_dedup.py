@@ -0,0 +1,50 @@
+import os
+import sys
+
+# 저장소 루트를 import 경로에 추가 (python -m pytest tests/test_dedup.py 로 실행할 때)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.utils.dedup import filter_records, is_deleted_marker, is_empty_or_deleted
+from app.utils.skeleton import JSON_FILE_PATH, iter_article_skeletons, load_documents
+
+# Deleted articles in the corpus are rendered as "① <삭 제>" (with a space). They must be dropped
+# before indexing rather than clustered as near-duplicates, while real sentences that merely start
+# with "삭제" stay indexed.
+DELETED_ARTICLE = """국방 정보화업무 훈령
+제2946호
+제2장 정보화업무 기획관리 절차
+  ├─ 제2절 소요 기획 및 결정
+      ├─ 제22조(소요 제기 지침 시달):
+          └─ ① <삭 제>"""
+REAL_ARTICLE = """국방 정보화업무 훈령
+제2946호
+제2장 정보화업무 기획관리 절차
+  ├─ 제2절 소요 기획 및 결정
+      ├─ 제23조(자료 관리):
+          └─ ① 삭제된 자료는 정보자원관리시스템에 이력을 남긴다."""
+
+
+def test_deleted_markers():
+    for marker in ["<삭 제>", "<삭제>", "(삭제)", "[ 삭 제 ]", "삭제"]:
+        assert is_deleted_marker(marker), marker
+    assert not is_deleted_marker("삭제된 자료는 정보자원관리시스템에 이력을 남긴다.")
+
+
+def test_deleted_article_is_dropped():
+    assert is_empty_or_deleted(DELETED_ARTICLE)
+    assert not is_empty_or_deleted(REAL_ARTICLE)
+
+
+def test_corpus_deleted_articles_are_not_indexed(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    records = list(iter_article_skeletons(load_documents(JSON_FILE_PATH)))
+    kept, duplicate_map, report = filter_records(records)
+    kept_ids = {record_id for record_id, _ in kept}
+    for article in ["22조", "33조의2", "38조", "59조", "60조", "61조"]:
+        record_ids = [record_id for record_id, _ in records
+                      if record_id.startswith("doc_4_") and record_id.endswith(f"_art_{article}")]
+        assert record_ids, article
+        assert not kept_ids & set(record_ids), article
+        assert not set(duplicate_map) & set(record_ids), article
+    assert report["dropped_empty_or_deleted"] > 0
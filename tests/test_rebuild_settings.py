@@ -0,0 +1,75 @@
+import os
+import sys
+
+import numpy as np
+
+# 저장소 루트를 import 경로에 추가 (python -m pytest tests/test_rebuild_settings.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import index_versions
+from app.utils.sharded_index import write_shards
+from app.utils.vector_index import write_numpy_index
+
+# A background rebuild (index admin page → start_rebuild) must build the new version with the
+# active version's HNSW profile, numpy reduction and shard count instead of the defaults.
+MODEL = "test-embed"
+
+
+def make_active_version(hnsw_profile: str, reduction_method: str, reduction_dim: int, num_shards: int) -> str:
+    version, path = index_versions.create_version(MODEL)
+    rng = np.random.default_rng(0)
+    ids = [f"doc_{doc}_chap_1장_sec_default_art_{art}조" for doc in range(1, 5) for art in range(1, 6)]
+    embeddings = rng.standard_normal((len(ids), 32)).astype(np.float32)
+    documents = [f"조 {record_id}" for record_id in ids]
+    metadatas = [{} for _ in ids]
+    write_numpy_index(path, ids, embeddings, documents, metadatas, reduction_method, reduction_dim)
+    write_shards(path, ids, embeddings, documents, metadatas, num_shards, reduction_method, reduction_dim)
+    index_versions.write_manifest(path, {"hnsw_profile": hnsw_profile})
+    index_versions.activate(MODEL, version)
+    return version
+
+
+def run_rebuild(monkeypatch, **kwargs) -> tuple:
+    calls = {"profiles": [], "fanout": []}
+
+    def fake_open_collection(db_path, profile=None):
+        calls["profiles"].append(profile)
+        return object()
+
+    def fake_ingest_fanout(records, targets, **fanout_kwargs):
+        calls["fanout"].append(fanout_kwargs)
+        return {model: {} for model, _, _ in targets}
+
+    monkeypatch.setattr(index_versions, "open_collection", fake_open_collection)
+    monkeypatch.setattr(index_versions.ingest_pipeline, "ingest_fanout", fake_ingest_fanout)
+    monkeypatch.setattr(index_versions, "load_documents", lambda path: [])
+    job = index_versions.start_rebuild(MODEL, cache=None, embedders={}, **kwargs)
+    job.join()
+    assert job.state == "done", job.error
+    return job, calls
+
+
+def test_rebuild_keeps_active_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_versions, "INDEX_ROOT", str(tmp_path / "indexes"))
+    previous = make_active_version("fast", "truncate", 16, 2)
+
+    job, calls = run_rebuild(monkeypatch)
+
+    assert index_versions.active_version(MODEL) != previous
+    assert calls["profiles"] == ["fast"]
+    assert len(calls["fanout"]) == 1
+    fanout = calls["fanout"][0]
+    assert (fanout["reduction_method"], fanout["reduction_dim"], fanout["num_shards"]) == ("truncate", 16, 2)
+    assert job.settings[MODEL] == {"hnsw_profile": "fast", "reduction_method": "truncate",
+                                   "reduction_dim": 16, "num_shards": 2}
+
+
+def test_rebuild_overrides_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_versions, "INDEX_ROOT", str(tmp_path / "indexes"))
+    make_active_version("fast", "truncate", 16, 2)
+
+    _, calls = run_rebuild(monkeypatch, hnsw_profile="accurate", num_shards=4)
+
+    assert calls["profiles"] == ["accurate"]
+    fanout = calls["fanout"][0]
+    assert (fanout["reduction_method"], fanout["reduction_dim"], fanout["num_shards"]) == ("truncate", 16, 4)
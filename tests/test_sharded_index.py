@@ -0,0 +1,58 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# 저장소 루트를 import 경로에 추가 (python -m pytest tests/test_sharded_index.py 로 실행할 때)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import sharded_index
+
+# When a new version replaces the cached ShardedIndex, searches already running on the old index
+# must finish instead of failing with CancelledError; its workers stop once they have drained.
+
+
+def write_index(db_path: str, num_shards: int = 2):
+    rng = np.random.default_rng(0)
+    ids = [f"doc_{doc}_chap_1장_sec_default_art_{art}조" for doc in range(1, 5) for art in range(1, 6)]
+    embeddings = rng.standard_normal((len(ids), 16)).astype(np.float32)
+    documents = [f"조 {record_id}" for record_id in ids]
+    metadatas = [{} for _ in ids]
+    sharded_index.write_shards(db_path, ids, embeddings, documents, metadatas, num_shards)
+    return ids, embeddings
+
+
+def test_close_waits_for_in_flight_query(tmp_path):
+    db_path = str(tmp_path / "v1")
+    ids, embeddings = write_index(db_path)
+    index = sharded_index.ShardedIndex(db_path)
+    results = {}
+    thread = threading.Thread(target=lambda: results.update(index.query(embeddings, n_results=1)))
+    thread.start()
+    while not index._in_flight:
+        time.sleep(0.01)
+
+    index.close()
+    thread.join()
+
+    assert results["ids"] == [[record_id] for record_id in ids]
+    assert all(executor._shutdown_thread for executor in index.executors)
+
+
+def test_close_index_keeps_running_search(tmp_path):
+    db_path = str(tmp_path / "v1")
+    ids, embeddings = write_index(db_path)
+    index = sharded_index.load_sharded_index(db_path)
+    results = {}
+    thread = threading.Thread(target=lambda: results.update(index.query(embeddings[:1], n_results=3)))
+    thread.start()
+    while not index._in_flight:
+        time.sleep(0.01)
+
+    sharded_index.close_index(db_path)
+    thread.join()
+
+    assert results["ids"][0][0] == ids[0]
+    assert (db_path, "none") not in sharded_index._open_indexes
@@ -0,0 +1,120 @@
+import argparse
+import ast
+import json
+import os
+import re
+
+import numpy as np
+
+from app.utils import index_profiles, index_versions
+from app.utils.embedders import get_embedder
+
+# 라벨이 있는 질의 세트 (GROUND_TRUTH 형식: {"queries": [{"query", "content": [{"chunk_id", ...}]}]})
+DEFAULT_LABELED_QUERIES = os.path.join("tests", "bacup.py")
+CORPUS_QUERY_SAMPLE = 200  # 라벨 질의에 더해 사용할 코퍼스 벡터 표본 수
+CORPUS_QUERY_NOISE = 0.02
+
+
+def load_labeled_queries(path: str) -> list:
+    """
+    GROUND_TRUTH 형식의 .json 파일 또는 GROUND_TRUTH 딕셔너리가 정의된 .py 파일을 읽어
+    [(질의, [chunk_id, ...])] 리스트를 반환합니다. (.py 파일은 실행하지 않고 리터럴만 읽습니다.)
+    """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    if path.endswith(".py"):
+        data = None
+        for node in ast.parse(source).body:
+            if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "GROUND_TRUTH" for t in node.targets):
+                data = ast.literal_eval(node.value)
+        if data is None:
+            return []
+    else:
+        data = json.loads(source)
+    return [
+        (entry["query"], [item.get("chunk_id", "") for item in entry.get("content", [])])
+        for entry in data.get("queries", [])
+    ]
+
+
+def relevant_rows(chunk_ids: list, ids: list) -> set:
+    """
+    chunk_id("문서.조[.항]", 예: "1.22.3")에 해당하는 레코드(doc_1_..._art_22조...)의 행 인덱스 집합.
+    """
+    rows = set()
+    for chunk_id in chunk_ids:
+        parts = chunk_id.split(".")
+        if len(parts) < 2:
+            continue
+        pattern = re.compile(rf"^doc_{re.escape(parts[0])}_.*art_{re.escape(parts[1])}조(#|$)")
+        rows.update(i for i, record_id in enumerate(ids) if pattern.match(record_id))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HNSW 파라미터(M, construction_ef, search_ef) 자동 튜닝")
+    parser.add_argument("--embedding", type=str, required=True, help="튜닝할 임베딩 모델 (활성 인덱스의 벡터 사용)")
+    parser.add_argument("--labeled", type=str, default=DEFAULT_LABELED_QUERIES,
+                        help="라벨 질의 세트 (GROUND_TRUTH 형식 .json 또는 .py)")
+    parser.add_argument("--space", type=str, choices=["cosine", "l2", "ip"], default="cosine")
+    parser.add_argument("--k", type=int, default=15, help="recall@k의 k (LLM 질의응답 데모는 15개를 검색)")
+    parser.add_argument("--recall-target", type=float, default=index_profiles.DEFAULT_RECALL_TARGET)
+    parser.add_argument("--m", type=int, nargs="+", default=index_profiles.SWEEP_M)
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=index_profiles.SWEEP_CONSTRUCTION_EF)
+    parser.add_argument("--search-ef", type=int, nargs="+", default=index_profiles.SWEEP_SEARCH_EF)
+    parser.add_argument("--save-profile", type=str, default=None,
+                        help="추천 설정을 이 이름의 프로파일로 저장 (makeDB.py --rebuild --hnsw-profile <이름>으로 적용)")
+    parser.add_argument("--report", type=str, default=None, help="전체 결과(JSON) 저장 경로")
+    args = parser.parse_args()
+
+    db_path = index_versions.active_path(args.embedding)
+    stored = index_versions.open_collection(db_path).get(include=["embeddings"])
+    ids = stored["ids"]
+    matrix = np.asarray(stored["embeddings"], dtype=np.float32)
+    print(f"{args.embedding}: {len(ids)}개 벡터 ({db_path}, 현재 프로파일 "
+          f"'{index_versions.read_manifest(db_path).get('hnsw_profile', index_profiles.DEFAULT_PROFILE)}')")
+
+    # 질의: 라벨 질의(임베딩) + 코퍼스 벡터 표본에 작은 잡음을 더한 벡터
+    labeled = load_labeled_queries(args.labeled)
+    queries, relevant = [], []
+    if labeled:
+        embedder = get_embedder(args.embedding)
+        queries.extend(embedder.embed([query for query, _ in labeled]))
+        relevant.extend(relevant_rows(chunk_ids, ids) or None for _, chunk_ids in labeled)
+    rng = np.random.default_rng(0)
+    sample = matrix[rng.choice(len(matrix), size=min(CORPUS_QUERY_SAMPLE, len(matrix)), replace=False)]
+    queries.extend(sample + CORPUS_QUERY_NOISE * rng.standard_normal(sample.shape).astype(np.float32))
+    relevant.extend([None] * len(sample))
+    print(f"질의 {len(queries)}개 (라벨 질의 {len(labeled)}개 + 코퍼스 표본 {len(sample)}개), k={args.k}")
+
+    results = index_profiles.sweep(
+        matrix, np.asarray(queries, dtype=np.float32), k=args.k, space=args.space,
+        m_values=args.m, construction_efs=args.construction_ef, search_efs=args.search_ef,
+        relevant=relevant,
+    )
+    print(f"{'M':>4} {'c_ef':>5} {'s_ef':>5} {'recall':>7} {'label hit':>9} {'p50 ms':>7} {'p95 ms':>7} {'build s':>8} {'MB':>7}")
+    for r in results:
+        label_hit = "-" if r["label_hit_at_k"] is None else f"{r['label_hit_at_k']:.3f}"
+        print(
+            f"{r['M']:>4} {r['construction_ef']:>5} {r['search_ef']:>5} {r['recall_at_k']:7.3f} {label_hit:>9} "
+            f"{r['p50_ms']:7.3f} {r['p95_ms']:7.3f} {r['build_seconds']:8.2f} {r['memory_bytes'] / 2 ** 20:7.1f}"
+        )
+
+    best = index_profiles.recommend(results, args.recall_target)
+    if best is None:
+        print(f"recall {args.recall_target:.2f}을(를) 만족하는 설정이 없습니다. search_ef/M 범위를 넓혀 다시 실행하세요.")
+    else:
+        print(
+            f"추천: space={best['space']} M={best['M']} construction_ef={best['construction_ef']} "
+            f"search_ef={best['search_ef']} (recall@{args.k} {best['recall_at_k']:.3f}, p50 {best['p50_ms']:.3f}ms)"
+        )
+        if args.save_profile:
+            index_profiles.save_profile(args.save_profile, best)
+            print(f"프로파일 '{args.save_profile}' 저장: {index_profiles.PROFILES_FILE}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"model": args.embedding, "k": args.k, "recall_target": args.recall_target,
+                       "recommended": best, "results": results}, f, ensure_ascii=False, indent=2)